@@ -2,18 +2,27 @@ from fastapi import APIRouter, HTTPException, Body, Depends
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any, Set
 import os
-import json
 import uuid
 from datetime import datetime
 from app.services.llm_service import LLMService
+from app.services.session_manager import StaleStateError
+from app.services.region_store import WorldExpiredError
+from app.services.serialization import FastJSONResponse, dump_file, load_file
 from app.models.game import GameState as GameStateModel
 from app.models.game import World, Player
 
 router = APIRouter()
 llm_service = LLMService()
 
+def get_save_dir() -> str:
+    """Directory holding saved games; point SAVE_DIR at shared storage when running several workers"""
+    return os.getenv("SAVE_DIR") or os.path.join(os.getcwd(), "game_saves")
+
 class GenerateWorldRequest(BaseModel):
     prompt: str
+    procedural: bool = False  # Skip the LLM and use the seeded procedural generator
+    seed: Optional[int] = None
+    num_locations: Optional[int] = Field(default=None, ge=1, le=100000)
     
 class ProcessInputRequest(BaseModel):
     input: str
@@ -62,11 +71,23 @@ class LoadGameResponse(BaseModel):
     state: Dict[str, Any]
     chat_history: List[Dict[str, str]]
 
+class RouteRequest(BaseModel):
+    game_state: Dict[str, Any]
+    destination: str
+
+class RouteResponse(BaseModel):
+    found: bool
+    destination: Optional[str] = None
+    steps: List[Dict[str, str]] = Field(default_factory=list)
+
 @router.post("/generate-world", response_model=WorldResponse)
 async def generate_world(request: GenerateWorldRequest):
     """Generate a new game world based on the provided prompt"""
     try:
-        world_data = await llm_service.generate_world(request.prompt)
+        if request.procedural:
+            world_data = llm_service.generate_procedural_world(request.seed, request.num_locations)
+        else:
+            world_data = await llm_service.generate_world(request.prompt)
         return WorldResponse(world=world_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate world: {str(e)}")
@@ -81,20 +102,80 @@ async def process_input(request: ProcessInputRequest):
             request.chat_history
         )
         
-        # Update chat history
-        updated_chat_history = request.chat_history + [
+        # Update chat history, keeping only a recent window plus a summary
+        updated_chat_history = llm_service.chat_history_policy.apply(request.chat_history + [
             {"role": "user", "content": request.input},
             {"role": "assistant", "content": response}
-        ]
+        ])
         
-        return ProcessInputResponse(
-            response=response,
-            game_state=updated_state,
-            chat_history=updated_chat_history
-        )
+        # The state comes straight from GameState.dict(); encode it without re-validating
+        return FastJSONResponse({
+            "response": response,
+            "game_state": updated_state,
+            "chat_history": updated_chat_history
+        })
+    except StaleStateError as e:
+        raise HTTPException(status_code=409, detail=f"Game state is out of date: {str(e)}")
+    except WorldExpiredError as e:
+        raise HTTPException(status_code=410, detail=f"Game world has expired: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process input: {str(e)}")
 
+class DueReviewsRequest(BaseModel):
+    game_state: Dict[str, Any]
+    limit: int = Field(default=20, ge=1, le=500)
+
+class DueReviewsResponse(BaseModel):
+    due: List[Dict[str, Any]] = Field(default_factory=list)
+
+class ReviewAnswerRequest(BaseModel):
+    game_state: Dict[str, Any]
+    vocabulary_id: str
+    quality: int = Field(ge=0, le=5)  # SM-2 recall grade, 0 = forgotten, 5 = perfect
+
+class ReviewAnswerResponse(BaseModel):
+    vocabulary: Dict[str, Any]
+    game_state: Dict[str, Any]
+
+@router.post("/route", response_model=RouteResponse)
+async def get_route(request: RouteRequest):
+    """Get the shortest route from the player's location to a destination"""
+    try:
+        return RouteResponse(**llm_service.get_route(request.game_state, request.destination))
+    except WorldExpiredError as e:
+        raise HTTPException(status_code=410, detail=f"Game world has expired: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find route: {str(e)}")
+
+@router.post("/reviews/due", response_model=DueReviewsResponse)
+async def get_due_reviews(request: DueReviewsRequest):
+    """Get the vocabulary due for spaced-repetition review"""
+    try:
+        return DueReviewsResponse(due=llm_service.get_due_reviews(request.game_state, request.limit))
+    except WorldExpiredError as e:
+        raise HTTPException(status_code=410, detail=f"Game world has expired: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get due reviews: {str(e)}")
+
+@router.post("/reviews/answer", response_model=ReviewAnswerResponse)
+async def answer_review(request: ReviewAnswerRequest):
+    """Grade a vocabulary review and schedule the word's next review"""
+    try:
+        vocabulary, updated_state = await llm_service.record_review(
+            request.game_state,
+            request.vocabulary_id,
+            request.quality
+        )
+        return FastJSONResponse({"vocabulary": vocabulary, "game_state": updated_state})
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Vocabulary {request.vocabulary_id} has not been learned")
+    except StaleStateError as e:
+        raise HTTPException(status_code=409, detail=f"Game state is out of date: {str(e)}")
+    except WorldExpiredError as e:
+        raise HTTPException(status_code=410, detail=f"Game world has expired: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to record review: {str(e)}")
+
 @router.post("/validate-japanese", response_model=ValidateJapaneseResponse)
 async def validate_japanese(request: ValidateJapaneseRequest):
     """Validate Japanese text input"""
@@ -112,7 +193,7 @@ async def save_game_state(request: SaveGameRequest):
     """Save the current game state"""
     try:
         # Create a save directory if it doesn't exist
-        save_dir = os.path.join(os.getcwd(), "game_saves")
+        save_dir = get_save_dir()
         os.makedirs(save_dir, exist_ok=True)
         
         # Generate a unique ID for the save file
@@ -121,14 +202,13 @@ async def save_game_state(request: SaveGameRequest):
         # Create a save file with the state and chat history
         save_data = {
             "state": request.state,
-            "chat_history": request.chat_history,
+            "chat_history": llm_service.chat_history_policy.apply(request.chat_history),
             "timestamp": datetime.now().isoformat()
         }
         
         save_path = os.path.join(save_dir, f"{game_id}.json")
         
-        with open(save_path, "w") as f:
-            json.dump(save_data, f, indent=2)
+        dump_file(save_data, save_path)
         
         return SaveGameResponse(
             status="success",
@@ -143,22 +223,36 @@ async def load_game_state(request: LoadGameRequest):
     """Load a saved game state"""
     try:
         # Find the save file
-        save_dir = os.path.join(os.getcwd(), "game_saves")
+        save_dir = get_save_dir()
         save_path = os.path.join(save_dir, f"{request.game_id}.json")
         
         if not os.path.exists(save_path):
             raise HTTPException(status_code=404, detail=f"Save file with ID {request.game_id} not found")
         
         # Load the save file
-        with open(save_path, "r") as f:
-            save_data = json.load(f)
+        save_data = load_file(save_path)
         
-        return LoadGameResponse(
-            state=save_data["state"],
-            chat_history=save_data["chat_history"]
-        )
+        # A save of a sharded world is only playable while its region files are kept
+        world_key = save_data["state"].get("metadata", {}).get("region_world")
+        if world_key:
+            llm_service.game_engine.region_store.require_world(world_key)
+        
+        # The loaded state replaces whatever the session was at, so don't treat it as stale.
+        # Other workers need no notice: versions live in the shared store, and engine
+        # caches are keyed by digests carried in the state, so the older state rebuilds them.
+        world_id = save_data["state"].get("metadata", {}).get("world_id")
+        if world_id:
+            await llm_service.sessions.forget(world_id)
+            llm_service.hint_prefetcher.cancel(world_id)
+        
+        return FastJSONResponse({
+            "state": save_data["state"],
+            "chat_history": save_data["chat_history"]
+        })
     except HTTPException:
         raise
+    except WorldExpiredError as e:
+        raise HTTPException(status_code=410, detail=f"Game world has expired: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load game state: {str(e)}")
 
@@ -167,7 +261,7 @@ async def list_saved_games():
     """List all saved games"""
     try:
         # Find all save files
-        save_dir = os.path.join(os.getcwd(), "game_saves")
+        save_dir = get_save_dir()
         
         if not os.path.exists(save_dir):
             return {"saved_games": []}
@@ -179,9 +273,8 @@ async def list_saved_games():
                 save_path = os.path.join(save_dir, filename)
                 
                 try:
-                    with open(save_path, "r") as f:
-                        save_data = json.load(f)
-                        
+                    save_data = load_file(save_path)
+                    
                     game_id = filename.replace(".json", "")
                     
                     # Extract some basic info about the save
@@ -206,11 +299,25 @@ async def list_saved_games():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list saved games: {str(e)}")
 
+@router.get("/llm-metrics")
+async def get_llm_metrics():
+    """Queue depth, concurrency and queue-time statistics for each LLM job class"""
+    prefetcher = llm_service.hint_prefetcher
+    return {
+        "classes": llm_service.scheduler.metrics(),
+        "vocabulary_hints": {
+            "cached": len(prefetcher.cache),
+            "hits": prefetcher.hits,
+            "misses": prefetcher.misses,
+            "prefetching": len(prefetcher.inflight)
+        }
+    }
+
 @router.get("/commands", response_model=Dict[str, List[str]])
 async def get_available_commands():
     """Get a list of available game commands"""
     return {
         "movement": ["north", "south", "east", "west", "up", "down", "in", "out"],
-        "actions": ["look", "examine", "take", "drop", "inventory", "use", "talk", "help"],
-        "japanese_commands": ["見る", "調べる", "持つ", "取る", "拾う", "置く", "捨てる", "持ち物", "使う", "話す", "聞く", "質問", "助け", "ヘルプ"]
+        "actions": ["look", "examine", "take", "drop", "inventory", "use", "talk", "go to", "help"],
+        "japanese_commands": ["見る", "調べる", "持つ", "取る", "拾う", "置く", "捨てる", "持ち物", "使う", "話す", "聞く", "質問", "行く", "助け", "ヘルプ"]
     } 
\ No newline at end of file
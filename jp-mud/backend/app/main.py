@@ -31,10 +31,44 @@ app.include_router(game_router, prefix="/api", tags=["game"])
 async def root():
     return {"message": "Welcome to JP-MUD API. See /docs for API documentation."}
 
-if __name__ == "__main__":
+def run():
+    """
+    Start the server
+
+    Development (the default) runs one process with auto-reload. Production
+    (APP_ENV=production or --production) disables reload and can run several
+    worker processes (WORKERS or --workers, default one per CPU). Workers
+    share session versions and cached LLM results through a SQLite database
+    (SHARED_STATE_DB), so no session affinity is needed; saves go to SAVE_DIR.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the JP-MUD API server")
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("APP_ENV", "development").lower() == "production")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS") or "0") or None)
+    args = parser.parse_args()
+
+    workers = 1
+    if args.production:
+        workers = args.workers or os.cpu_count() or 1
+    elif args.workers:
+        workers = args.workers
+
+    if workers > 1:
+        # Read by each worker when it imports the app
+        if not os.getenv("SHARED_STATE_DB"):
+            os.environ["SHARED_STATE_DB"] = os.path.join(os.getcwd(), "data", "shared_state.db")
+        if not os.getenv("SAVE_DIR"):
+            os.environ["SAVE_DIR"] = os.path.join(os.getcwd(), "game_saves")
+
     uvicorn.run(
         "app.main:app",
         host=os.getenv("HOST", "0.0.0.0"),
         port=int(os.getenv("PORT", "8020")),
-        reload=True
-    ) 
\ No newline at end of file
+        reload=not args.production and workers == 1,
+        workers=workers
+    )
+
+if __name__ == "__main__":
+    run()
@@ -67,6 +67,7 @@ class Location(BaseModel):
     requires_key: Optional[str] = None  # Item ID required to enter
     quest_triggers: List[str] = Field(default_factory=list)  # Quest IDs triggered by visiting
     hidden: bool = False  # If true, not shown in connections until discovered
+    version: int = 0  # Advanced when items, characters, connections or neighbour visibility change
 
 
 class VocabularyEntry(BaseModel):
@@ -90,6 +91,10 @@ class LearnedVocabulary(BaseModel):
     next_review_time: Optional[str] = None
     review_count: int = 0
     context: Optional[str] = None  # Context where this vocabulary was encountered
+    # SM-2 scheduling state
+    ease_factor: float = 2.5
+    interval_days: float = 0
+    repetitions: int = 0  # Consecutive successful reviews
 
 
 class PlayerStats(BaseModel):
@@ -0,0 +1,122 @@
+"""
+Bounded chat history for JP-MUD.
+
+The client sends the whole chat history with every request and stores it in
+saves, so it is trimmed server-side to a rolling window of recent messages.
+Older messages are folded into a single compact summary message at the head
+of the history. Folding happens in chunks rather than on every request, so
+most requests only append.
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+SUMMARY_PREFIX = "[Summary of "
+_SUMMARY_HEADER = re.compile(r"^\[Summary of (\d+) earlier messages\] ")
+_CJK = re.compile(r'[\u3000-\u303f\u3040-\u309f\u30a0-\u30ff\uff00-\uff9f\u4e00-\u9faf\u3400-\u4dbf]')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate: one per Japanese character, one per four other characters"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class ChatHistoryPolicy:
+    """Keeps a rolling window of recent turns plus a compact summary of older ones"""
+
+    def __init__(
+        self,
+        window_turns: Optional[int] = None,
+        summary_chunk_turns: Optional[int] = None,
+        max_summary_chars: Optional[int] = None,
+    ):
+        # A turn is one user message plus one assistant response
+        self.window_messages = 2 * (window_turns or int(os.getenv("CHAT_HISTORY_WINDOW_TURNS", "25")))
+        self.chunk_messages = 2 * (summary_chunk_turns or int(os.getenv("CHAT_HISTORY_SUMMARY_CHUNK_TURNS", "10")))
+        self.max_summary_chars = max_summary_chars or int(os.getenv("CHAT_HISTORY_MAX_SUMMARY_CHARS", "1000"))
+
+    @staticmethod
+    def _split_summary(history: List[Dict[str, str]]) -> Tuple[Optional[Dict[str, str]], List[Dict[str, str]]]:
+        """Separate an existing summary message from the regular messages"""
+        if history and history[0].get("role") == "system" and history[0].get("content", "").startswith(SUMMARY_PREFIX):
+            return history[0], history[1:]
+        return None, history
+
+    def apply(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Trim a chat history to the window, folding overflow into the summary
+
+        Args:
+            history: Full chat history as sent by the client
+
+        Returns:
+            History of at most one summary message plus the recent window
+        """
+        summary, messages = self._split_summary(history)
+
+        # Only fold once a whole chunk has accumulated beyond the window
+        overflow = len(messages) - self.window_messages
+        if overflow < self.chunk_messages:
+            return history
+
+        folded, recent = messages[:overflow], messages[overflow:]
+        return [self._summarize(summary, folded)] + recent
+
+    def _summarize(self, summary: Optional[Dict[str, str]], folded: List[Dict[str, str]]) -> Dict[str, str]:
+        """Merge folded messages into the summary message"""
+        count = 0
+        commands = ""
+        if summary:
+            content = summary["content"]
+            match = _SUMMARY_HEADER.match(content)
+            if match:
+                count = int(match.group(1))
+                content = content[match.end():]
+            commands = content[len("Player commands: "):] if content.startswith("Player commands: ") else content
+
+        new_commands = [m.get("content", "").strip() for m in folded if m.get("role") == "user"]
+        new_commands = [c for c in new_commands if c]
+        if new_commands:
+            commands = "; ".join(([commands] if commands else []) + new_commands)
+
+        # Keep the most recent part of the summary when it grows too long
+        if len(commands) > self.max_summary_chars:
+            commands = "..." + commands[-(self.max_summary_chars - 3):]
+
+        count += len(folded)
+        return {
+            "role": "system",
+            "content": f"[Summary of {count} earlier messages] Player commands: {commands}"
+        }
+
+    def prompt_context(self, history: List[Dict[str, str]], token_budget: Optional[int] = None) -> str:
+        """
+        Format the most recent messages for an LLM prompt within a token budget
+
+        Recent messages are taken newest first until the budget is spent, and
+        the summary is prepended if it still fits.
+        """
+        if token_budget is None:
+            token_budget = int(os.getenv("CHAT_HISTORY_PROMPT_TOKENS", "800"))
+
+        summary, messages = self._split_summary(history)
+        lines: List[str] = []
+        used = 0
+
+        for message in reversed(messages[-self.window_messages:]):
+            line = f"{message.get('role', 'user')}: {message.get('content', '')}"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        lines.reverse()
+
+        if summary:
+            summary_line = summary["content"]
+            if used + estimate_tokens(summary_line) <= token_budget:
+                lines.insert(0, summary_line)
+
+        return "\n".join(lines)
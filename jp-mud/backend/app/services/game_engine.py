@@ -1,13 +1,67 @@
 from typing import Dict, List, Tuple, Any, Optional, Set
+from collections import OrderedDict
+import hashlib
+import os
 import re
+import uuid
 from app.models.game import (
     GameState, World, Player, Location, Item, Character,
     Direction, ItemType, VocabularyEntry, LearnedVocabulary
 )
 from app.services.quest_handler import QuestHandler
+from app.services.route_index import RouteIndex
+from app.services.region_store import RegionStore
+from app.services.state_loader import coerce_enum, load_world, load_quests
+from app.services.grammar_matcher import get_matcher
+from app.services.srs import SRSScheduler
+from app.models.quest import ObjectiveType, RewardType
 from datetime import datetime
 from loguru import logger
 
+# Built once; validate_world_structure looks these up for every connection
+OPPOSITE_DIRECTIONS = {
+    Direction.NORTH: Direction.SOUTH,
+    Direction.SOUTH: Direction.NORTH,
+    Direction.EAST: Direction.WEST,
+    Direction.WEST: Direction.EAST,
+    Direction.UP: Direction.DOWN,
+    Direction.DOWN: Direction.UP,
+    Direction.IN: Direction.OUT,
+    Direction.OUT: Direction.IN,
+}
+
+
+def _graph_entry(location: Location) -> str:
+    """The part of a location the route index depends on"""
+    connections = sorted((str(direction), target) for direction, target in location.connections.items())
+    return repr((location.id, bool(location.hidden), connections))
+
+
+def advance_location_version(location: Location, change: str) -> None:
+    """
+    Give a location a new description version derived from the old one and
+    the change, so forks of a save that change a location differently end up
+    on different versions. 52 bits keep the number exact in JavaScript.
+    """
+    seed = f"{location.version} {change}".encode("utf-8")
+    location.version = int(hashlib.sha256(seed).hexdigest()[:13], 16)
+
+
+def graph_digest(locations: Dict[str, Location]) -> str:
+    """Digest of every location's hidden flag and connections"""
+    digest = hashlib.sha256()
+    for location_id in sorted(locations):
+        digest.update(_graph_entry(locations[location_id]).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def vocabulary_digest(vocabulary: Dict[str, VocabularyEntry]) -> str:
+    """Digest of every word's ID and Japanese text"""
+    digest = hashlib.sha256()
+    for vocab_id in sorted(vocabulary):
+        digest.update(f"{vocab_id}:{vocabulary[vocab_id].japanese};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
 
 class GameEngine:
     def __init__(self):
@@ -40,10 +94,128 @@ class GameEngine:
             "talk": ["talk", "speak", "chat", "converse", "ask", "話す", "聞く", "質問"],
             "help": ["help", "commands", "助け", "ヘルプ", "コマンド"],
             "quests": ["quests", "quest", "missions", "tasks", "クエスト", "任務"],
-            "grammar": ["grammar", "practice", "文法", "練習"]
+            "grammar": ["grammar", "practice", "文法", "練習"],
+            "travel": ["go", "goto", "travel", "行く"]
         }
+        self.action_lookup = {
+            synonym: action
+            for action, synonyms in self.action_commands.items()
+            for synonym in synonyms
+        }
+        
+        self.quest_handler = QuestHandler(on_location_changed=self.mark_location_changed)
+        
+        # Route indexes shared across requests, keyed by (world_id, graph_version, graph_digest)
+        self.route_indexes: "OrderedDict[Tuple[str, int, str], RouteIndex]" = OrderedDict()
+        self.max_route_indexes = int(os.getenv("ROUTE_INDEX_CACHE_SIZE", "256"))
         
-        self.quest_handler = QuestHandler()
+        # Rendered location descriptions, keyed by (world_id, location ID, location version, graph_digest)
+        self.description_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.max_cached_descriptions = int(os.getenv("DESCRIPTION_CACHE_SIZE", "4096"))
+        
+        # Open grammar challenges per session, keyed by world_id
+        self.grammar_indexes: "OrderedDict[str, Tuple[Tuple, OrderedDict]]" = OrderedDict()
+        self.max_grammar_indexes = int(os.getenv("GRAMMAR_INDEX_CACHE_SIZE", "10000"))
+        
+        # (vocabulary_digest, Japanese text -> vocabulary ID) per session, keyed by world_id
+        self.vocabulary_indexes: "OrderedDict[str, Tuple[str, Dict[str, str]]]" = OrderedDict()
+        self.max_vocabulary_indexes = int(os.getenv("VOCABULARY_INDEX_CACHE_SIZE", "1000"))
+        
+        # Spaced-repetition review queues over learned vocabulary
+        self.srs = SRSScheduler()
+        
+        # Very large worlds are sharded into on-disk regions and paged in on demand
+        self.region_store = RegionStore()
+        self.shard_threshold = int(os.getenv("WORLD_SHARD_THRESHOLD", "5000"))
+        self.max_resident_locations = int(os.getenv("MAX_RESIDENT_LOCATIONS", "1000"))
+    
+    def ensure_world_id(self, game_state: GameState) -> str:
+        """Make sure the game state carries a stable world ID used as a cache key"""
+        world_id = game_state.metadata.get("world_id")
+        if not world_id:
+            world_id = uuid.uuid4().hex
+            game_state.metadata["world_id"] = world_id
+            game_state.metadata.setdefault("graph_version", 0)
+        return world_id
+    
+    def get_route_index(self, game_state: GameState) -> RouteIndex:
+        """Get the routing index for this world, building it on first use"""
+        world_id = game_state.metadata.get("world_id")
+        if not world_id:
+            return RouteIndex(game_state.world)
+        
+        # Forks of a saved game can reach the same graph version with different
+        # graphs, so the key also carries a digest of the graph itself
+        key = (world_id, game_state.metadata.get("graph_version", 0), self._graph_digest(game_state))
+        route_index = self.route_indexes.get(key)
+        if route_index is not None:
+            self.route_indexes.move_to_end(key)
+            return route_index
+        
+        route_index = RouteIndex(game_state.world)
+        self.route_indexes[key] = route_index
+        while len(self.route_indexes) > self.max_route_indexes:
+            self.route_indexes.popitem(last=False)
+        return route_index
+    
+    def _graph_digest(self, game_state: GameState) -> str:
+        """The state's graph digest, computed from the whole world if it has none yet"""
+        digest = game_state.metadata.get("graph_digest")
+        if not digest:
+            digest = graph_digest(game_state.world.locations)
+            game_state.metadata["graph_digest"] = digest
+        return digest
+    
+    def _advance_graph(self, game_state: GameState, change: str) -> Tuple[int, Optional[str]]:
+        """
+        Bump the graph version and fold a description of the change into the
+        graph digest, so diverging forks get diverging digests without
+        rehashing the world. Returns the previous (version, digest).
+        """
+        old_version = game_state.metadata.get("graph_version", 0)
+        old_digest = game_state.metadata.get("graph_digest")
+        game_state.metadata["graph_version"] = old_version + 1
+        if old_digest:
+            game_state.metadata["graph_digest"] = hashlib.sha256(
+                (old_digest + change).encode("utf-8")
+            ).hexdigest()[:16]
+        return old_version, old_digest
+    
+    def mark_location_changed(self, game_state: GameState, location_id: str) -> None:
+        """
+        Record that a location's connections or hidden flag changed.
+        
+        Bumps the world's graph version and carries the cached route index
+        forward incrementally instead of rebuilding it. Also advances the
+        description version of the location and of every location with an
+        exit to or from it.
+        """
+        world_id = game_state.metadata.get("world_id")
+        location = game_state.world.locations.get(location_id)
+        # Other locations' exits are unchanged, so the index from before this
+        # change still knows which locations lead here (one-way exits too)
+        route_index = self.get_route_index(game_state)
+        change = _graph_entry(location) if location is not None else f"removed {location_id}"
+        old_version, old_digest = self._advance_graph(game_state, change)
+        
+        neighbour_ids = set(route_index.sources_of(location_id))
+        if location is not None:
+            advance_location_version(location, change)
+            neighbour_ids.update(location.connections.values())
+        neighbour_ids.discard(location_id)
+        for neighbour_id in neighbour_ids:
+            neighbour = game_state.world.locations.get(neighbour_id)
+            if neighbour is not None:
+                advance_location_version(neighbour, f"neighbour {change}")
+        
+        if not world_id:
+            return
+        
+        self.route_indexes.pop((world_id, old_version, old_digest), None)
+        if location is not None:
+            route_index.update_location(location)
+            key = (world_id, old_version + 1, game_state.metadata["graph_digest"])
+            self.route_indexes[key] = route_index
     
     def create_fallback_location(self, location_id: str, game_state: GameState) -> Location:
         """Create a fallback location when the specified location ID is missing"""
@@ -78,14 +250,24 @@ class GameEngine:
         
         # Add it to the world
         game_state.world.locations[location_id] = fallback_location
+        self.mark_location_changed(game_state, location_id)
         logger.info(f"Added fallback location '{name}' to world")
         
         return fallback_location
     
     def ensure_valid_location(self, location_id: str, game_state: GameState) -> Location:
-        """Ensure a valid location exists for the given ID, creating a fallback if needed"""
+        """
+        Ensure a valid location exists for the given ID.
+        
+        In sharded worlds a missing location is usually in a region that is not
+        resident yet, so its region is paged in. Only locations that exist in
+        no region get a fallback.
+        """
         location = game_state.world.locations.get(location_id)
         
+        if not location:
+            location = self.page_in_location(location_id, game_state)
+        
         if not location:
             # Create a fallback location if it doesn't exist
             location = self.create_fallback_location(location_id, game_state)
@@ -97,6 +279,138 @@ class GameEngine:
         
         return location
     
+    def shard_world(self, game_state: GameState) -> None:
+        """
+        Move the world into the region store, keeping only the regions around
+        the player resident. The state then carries "region_world",
+        "resident_regions" (least recently used first) and, once it evicts a
+        region it may have changed, "region_overlays" in its metadata.
+        """
+        world_key = self.region_store.save_world(game_state.world)
+        game_state.metadata["region_world"] = world_key
+        game_state.metadata["resident_regions"] = list(range(self.region_store.manifest(world_key)["regions"]))
+        
+        # The base files hold exactly this state, so nothing needs saving
+        keep = self._pinned_regions(game_state)
+        for region in list(game_state.metadata["resident_regions"]):
+            if region not in keep:
+                self.evict_region(game_state, region, save=False)
+        
+        self._advance_graph(game_state, f"shard {world_key} {sorted(game_state.metadata['resident_regions'])}")
+        logger.info(f"Sharded world {world_key}; {len(game_state.world.locations)} locations resident")
+    
+    def _region_of(self, game_state: GameState, location_id: str) -> Optional[int]:
+        world_key = game_state.metadata.get("region_world")
+        if not world_key:
+            return None
+        return self.region_store.region_of(world_key, location_id)
+    
+    def _pinned_regions(self, game_state: GameState) -> Set[int]:
+        """Regions that must stay resident: the player's and its neighbours'"""
+        pinned = set()
+        current_id = game_state.player.current_location
+        current = game_state.world.locations.get(current_id)
+        for location_id in [current_id] + (list(current.connections.values()) if current else []):
+            region = self._region_of(game_state, location_id)
+            if region is not None:
+                pinned.add(region)
+        return pinned
+    
+    def page_in_location(self, location_id: str, game_state: GameState) -> Optional[Location]:
+        """Load the region containing a location, if the world is sharded and has one"""
+        region = self._region_of(game_state, location_id)
+        if region is None:
+            return None
+        self.page_in_region(game_state, region)
+        return game_state.world.locations.get(location_id)
+    
+    def page_in_region(self, game_state: GameState, region: int) -> None:
+        """Merge a region into the resident world, evicting others if over budget"""
+        resident = game_state.metadata.setdefault("resident_regions", [])
+        if region in resident:
+            resident.remove(region)
+            resident.append(region)
+            return
+        
+        world = game_state.world
+        # Raises WorldExpiredError if the stored world was collected after going unused
+        data, _ = self.region_store.load_region(
+            game_state.metadata["region_world"], region,
+            session_id=game_state.metadata.get("world_id") or "anonymous",
+            overlay_id=game_state.metadata.get("region_overlays", {}).get(str(region))
+        )
+        loaded = load_world(data)
+        
+        for location_id, location in loaded.locations.items():
+            world.locations.setdefault(location_id, location)
+            # Resident neighbours now have a named exit into this region
+            for target_id in location.connections.values():
+                neighbour = world.locations.get(target_id)
+                if neighbour is not None and target_id not in loaded.locations:
+                    advance_location_version(neighbour, f"page in {location_id}")
+        # Never clobber resident entities, e.g. items in the player's inventory
+        for item_id, item in loaded.items.items():
+            world.items.setdefault(item_id, item)
+        for character_id, character in loaded.characters.items():
+            world.characters.setdefault(character_id, character)
+        
+        resident.append(region)
+        self._advance_graph(game_state, f"page in {region} {graph_digest(loaded.locations)}")
+        logger.debug(f"Paged in region {region} ({len(loaded.locations)} locations)")
+        
+        self._enforce_resident_budget(game_state)
+    
+    def prefetch_neighbour_regions(self, game_state: GameState) -> None:
+        """Page in the regions of the current location's neighbours so the next move is local"""
+        if not game_state.metadata.get("region_world"):
+            return
+        current = game_state.world.locations.get(game_state.player.current_location)
+        if current is None:
+            return
+        for target_id in current.connections.values():
+            if target_id not in game_state.world.locations:
+                self.page_in_location(target_id, game_state)
+    
+    def evict_region(self, game_state: GameState, region: int, save: bool = True) -> None:
+        """Remove a region from the resident world, saving it to the session's overlay"""
+        world = game_state.world
+        location_ids = [
+            location_id for location_id in world.locations
+            if self._region_of(game_state, location_id) == region
+        ]
+        if save and location_ids:
+            # The state records its own overlay, so no other state (a stale request, an older save) reads it
+            overlay_id = self.region_store.save_overlay(
+                game_state.metadata["region_world"], region, game_state.metadata.get("world_id") or "anonymous",
+                self.region_store.region_data(world, location_ids)
+            )
+            game_state.metadata.setdefault("region_overlays", {})[str(region)] = overlay_id
+        
+        for location_id in location_ids:
+            location = world.locations.pop(location_id)
+            for item_id in location.items:
+                world.items.pop(item_id, None)
+            for character_id in location.characters:
+                world.characters.pop(character_id, None)
+        
+        resident = game_state.metadata.get("resident_regions", [])
+        if region in resident:
+            resident.remove(region)
+        
+        # Exits into the region are now dangling, so cached routes must not be reused
+        if location_ids:
+            self._advance_graph(game_state, f"evict {region}")
+    
+    def _enforce_resident_budget(self, game_state: GameState) -> None:
+        """Evict least recently used regions while too many locations are resident"""
+        pinned = self._pinned_regions(game_state)
+        resident = game_state.metadata.get("resident_regions", [])
+        for region in list(resident):
+            if len(game_state.world.locations) <= self.max_resident_locations:
+                break
+            if region not in pinned:
+                self.evict_region(game_state, region)
+    
     def validate_world_structure(self, world: World) -> World:
         """
         Validate and fix the world structure, ensuring connections are bidirectional,
@@ -282,8 +596,9 @@ class GameEngine:
                         logger.warning(f"Location '{location.id}' contains non-existent item ID '{item_id}'. Removing reference.")
                         items_to_remove.append(item_id)
                         fixed_issues += 1
-                # Remove invalid items safely
-                location.items = [item for item in location.items if item not in items_to_remove]
+                # Remove invalid items safely (only reassign when needed; assignment is not free on models)
+                if items_to_remove:
+                    location.items = [item for item in location.items if item not in items_to_remove]
             else:
                 location.items = [] # Ensure attribute exists
 
@@ -296,7 +611,8 @@ class GameEngine:
                         chars_to_remove.append(char_id)
                         fixed_issues += 1
                 # Remove invalid characters safely
-                location.characters = [char for char in location.characters if char not in chars_to_remove]
+                if chars_to_remove:
+                    location.characters = [char for char in location.characters if char not in chars_to_remove]
             else:
                  location.characters = [] # Ensure attribute exists
 
@@ -333,174 +649,183 @@ class GameEngine:
         logger.info(f"World structure validation completed. Issues fixed: {fixed_issues}")
         return world
     
-    def init_game_state(self, world_data: Dict[str, Any]) -> GameState:
-        """Initialize a new game state from world data"""
+    def init_game_state(self, world_data: Dict[str, Any], trusted: bool = False) -> GameState:
+        """
+        Initialize a new game state from world data
+        
+        Entities are collected as plain dictionaries and turned into models in
+        one bulk call rather than one pydantic construction per entity.
+        
+        Args:
+            world_data: World data as produced by the LLM or the procedural generator
+            trusted: Data we generated ourselves; may skip per-field validation
+        """
         # Convert the LLM-generated world data into our structured format
-        world = World()
+        locations: Dict[str, Dict[str, Any]] = {}
+        characters: Dict[str, Dict[str, Any]] = {}
+        items: Dict[str, Dict[str, Any]] = {}
+        vocabulary: Dict[str, Dict[str, Any]] = {}
         
         # Process locations
         for loc_data in world_data.get("locations", []):
-            loc_id = loc_data.get("id", f"loc_{len(world.locations)}")
-            location = Location(
-                id=loc_id,
-                name=loc_data.get("name", "Unknown Location"),
-                japanese_name=loc_data.get("japanese_name", ""),
-                description=loc_data.get("description", ""),
-                japanese_description=loc_data.get("japanese_description", ""),
-                connections={},
-                characters=[],
-                items=[],
-                vocabulary=loc_data.get("vocabulary", []),
-                visited=False,
-                quest_triggers=loc_data.get("quest_triggers", []),
-                hidden=loc_data.get("hidden", False)
-            )
+            loc_id = loc_data.get("id", f"loc_{len(locations)}")
             
             # Process connections
+            connections = {}
             for direction, target in loc_data.get("connections", {}).items():
                 if isinstance(target, str):
-                    location.connections[direction] = target
+                    connections[direction] = target
                 else:
                     # If it's a more complex connection object
                     target_id = target.get("location") if isinstance(target, dict) else str(target)
-                    location.connections[direction] = target_id
+                    connections[direction] = target_id
             
-            world.locations[loc_id] = location
+            locations[loc_id] = {
+                "id": loc_id,
+                "name": loc_data.get("name", "Unknown Location"),
+                "japanese_name": loc_data.get("japanese_name", ""),
+                "description": loc_data.get("description", ""),
+                "japanese_description": loc_data.get("japanese_description", ""),
+                "connections": connections,
+                "characters": [],
+                "items": [],
+                "vocabulary": loc_data.get("vocabulary", []),
+                "visited": False,
+                "quest_triggers": loc_data.get("quest_triggers", []),
+                "hidden": loc_data.get("hidden", False)
+            }
         
         # Ensure we have a start location
-        if "start" not in world.locations:
+        if "start" not in locations:
             logger.warning("No start location found in world data, creating default start location")
-            world.locations["start"] = Location(
-                id="start",
-                name="Starting Point",
-                japanese_name="開始地点",
-                description="You find yourself at the starting point of your adventure.",
-                japanese_description="あなたは冒険の出発点にいます。",
-                connections={},
-                characters=[],
-                items=[],
-                vocabulary=[],
-                visited=False
-            )
+            locations["start"] = {
+                "id": "start",
+                "name": "Starting Point",
+                "japanese_name": "開始地点",
+                "description": "You find yourself at the starting point of your adventure.",
+                "japanese_description": "あなたは冒険の出発点にいます。",
+                "connections": {},
+                "characters": [],
+                "items": [],
+                "vocabulary": [],
+                "visited": False
+            }
         
         # Process characters
         for char_data in world_data.get("characters", []):
-            char_id = char_data.get("id", f"char_{len(world.characters)}")
-            character = Character(
-                id=char_id,
-                name=char_data.get("name", "Unknown Character"),
-                japanese_name=char_data.get("japanese_name", ""),
-                description=char_data.get("description", ""),
-                japanese_description=char_data.get("japanese_description", ""),
-                dialogues=char_data.get("dialogues", {}),
-                vocabulary=char_data.get("vocabulary", []),
-                items=char_data.get("items", []),
-                quest_ids=char_data.get("quest_ids", []),
-                quest_dialogues=char_data.get("quest_dialogues", {})
-            )
+            char_id = char_data.get("id", f"char_{len(characters)}")
+            characters[char_id] = {
+                "id": char_id,
+                "name": char_data.get("name", "Unknown Character"),
+                "japanese_name": char_data.get("japanese_name", ""),
+                "description": char_data.get("description", ""),
+                "japanese_description": char_data.get("japanese_description", ""),
+                "dialogues": char_data.get("dialogues", {}),
+                "vocabulary": char_data.get("vocabulary", []),
+                "items": char_data.get("items", []),
+                "quest_ids": char_data.get("quest_ids", []),
+                "quest_dialogues": char_data.get("quest_dialogues", {})
+            }
             
             # Assign character to its location
+            # Character locations are tracked through their presence in location.characters lists
             location_id = char_data.get("location", "start")
-            if location_id in world.locations:
-                world.locations[location_id].characters.append(char_id)
-            
-            # DO NOT set character.location directly as it's not in the Character model
-            # Instead, character locations are tracked through their presence in location.characters lists
-            
-            world.characters[char_id] = character
+            if location_id in locations:
+                locations[location_id]["characters"].append(char_id)
         
         # Process items
         for item_data in world_data.get("items", []):
-            item_id = item_data.get("id", f"item_{len(world.items)}")
-            item = Item(
-                id=item_id,
-                name=item_data.get("name", "Unknown Item"),
-                japanese_name=item_data.get("japanese_name", ""),
-                description=item_data.get("description", ""),
-                japanese_description=item_data.get("japanese_description", ""),
-                item_type=item_data.get("type", ItemType.GENERAL),
-                properties=item_data.get("properties", {}),
-                vocabulary=item_data.get("vocabulary", []),
-                can_be_taken=item_data.get("can_be_taken", True),
-                hidden=item_data.get("hidden", False),
-                related_quest_id=item_data.get("related_quest_id")
-            )
+            item_id = item_data.get("id", f"item_{len(items)}")
+            items[item_id] = {
+                "id": item_id,
+                "name": item_data.get("name", "Unknown Item"),
+                "japanese_name": item_data.get("japanese_name", ""),
+                "description": item_data.get("description", ""),
+                "japanese_description": item_data.get("japanese_description", ""),
+                "item_type": coerce_enum(ItemType, item_data.get("type"), ItemType.GENERAL),
+                "properties": item_data.get("properties", {}),
+                "vocabulary": item_data.get("vocabulary", []),
+                "can_be_taken": item_data.get("can_be_taken", True),
+                "hidden": item_data.get("hidden", False),
+                "related_quest_id": item_data.get("related_quest_id")
+            }
             
             # Assign item to its location
             location_id = item_data.get("location", "start")
-            if location_id in world.locations:
-                world.locations[location_id].items.append(item_id)
-            
-            world.items[item_id] = item
+            if location_id in locations:
+                locations[location_id]["items"].append(item_id)
         
         # Process vocabulary
         for vocab_data in world_data.get("vocabulary", []):
-            vocab_id = vocab_data.get("id", f"vocab_{len(world.vocabulary)}")
-            vocab = VocabularyEntry(
-                japanese=vocab_data.get("japanese", ""),
-                english=vocab_data.get("english", ""),
-                reading=vocab_data.get("reading", ""),
-                part_of_speech=vocab_data.get("part_of_speech", ""),
-                example_sentence=vocab_data.get("example_sentence", ""),
-                notes=vocab_data.get("notes", ""),
-                jlpt_level=vocab_data.get("jlpt_level")
-            )
-            world.vocabulary[vocab_id] = vocab
+            vocab_id = vocab_data.get("id", f"vocab_{len(vocabulary)}")
+            vocabulary[vocab_id] = {
+                "japanese": vocab_data.get("japanese", ""),
+                "english": vocab_data.get("english", ""),
+                "reading": vocab_data.get("reading", ""),
+                "part_of_speech": vocab_data.get("part_of_speech", ""),
+                "example_sentence": vocab_data.get("example_sentence", ""),
+                "notes": vocab_data.get("notes", ""),
+                "jlpt_level": vocab_data.get("jlpt_level")
+            }
+        
+        world = load_world(
+            {"locations": locations, "characters": characters, "items": items, "vocabulary": vocabulary},
+            trusted=trusted
+        )
         
         # Process quests
         try:
+            quests = {}
             for quest_data in world_data.get("quests", []):
-                from app.models.quest import Quest, QuestObjective, QuestReward, QuestState
-                quest_id = quest_data.get("id", f"quest_{len(world.quests)}")
+                quest_id = quest_data.get("id", f"quest_{len(quests)}")
                 
                 # Process objectives
                 objectives = []
                 for obj_data in quest_data.get("objectives", []):
-                    from app.models.quest import ObjectiveType
-                    objective = QuestObjective(
-                        id=obj_data.get("id", f"obj_{len(objectives)}"),
-                        type=obj_data.get("type", ObjectiveType.CUSTOM),
-                        description=obj_data.get("description", ""),
-                        japanese_description=obj_data.get("japanese_description", ""),
-                        target_id=obj_data.get("target_id", ""),
-                        count=obj_data.get("count", 1),
-                        vocabulary=obj_data.get("vocabulary", [])
-                    )
-                    objectives.append(objective)
+                    objectives.append({
+                        "id": obj_data.get("id", f"obj_{len(objectives)}"),
+                        "type": coerce_enum(ObjectiveType, obj_data.get("type"), ObjectiveType.CUSTOM),
+                        "description": obj_data.get("description", ""),
+                        "japanese_description": obj_data.get("japanese_description", ""),
+                        "target_id": obj_data.get("target_id", ""),
+                        "count": obj_data.get("count", 1),
+                        "vocabulary": obj_data.get("vocabulary", []),
+                        "hints": obj_data.get("hints", []),
+                        "japanese_hints": obj_data.get("japanese_hints", []),
+                        "properties": obj_data.get("properties", {})
+                    })
                 
                 # Process rewards
                 rewards = []
                 for reward_data in quest_data.get("rewards", []):
-                    from app.models.quest import RewardType
-                    reward = QuestReward(
-                        type=reward_data.get("type", RewardType.CUSTOM),
-                        description=reward_data.get("description", ""),
-                        japanese_description=reward_data.get("japanese_description", ""),
-                        target_id=reward_data.get("target_id"),
-                        quantity=reward_data.get("quantity", 1),
-                        vocabulary=reward_data.get("vocabulary", [])
-                    )
-                    rewards.append(reward)
-                
-                quest = Quest(
-                    id=quest_id,
-                    title=quest_data.get("title", "Untitled Quest"),
-                    japanese_title=quest_data.get("japanese_title", ""),
-                    description=quest_data.get("description", ""),
-                    japanese_description=quest_data.get("japanese_description", ""),
-                    objectives=objectives,
-                    rewards=rewards,
-                    prerequisite_quests=quest_data.get("prerequisite_quests", []),
-                    start_location=quest_data.get("start_location"),
-                    completion_location=quest_data.get("completion_location"),
-                    start_dialogue=quest_data.get("start_dialogue"),
-                    completion_dialogue=quest_data.get("completion_dialogue"),
-                    difficulty=quest_data.get("difficulty", 1),
-                    jlpt_level=quest_data.get("jlpt_level"),
-                    hidden=quest_data.get("hidden", False)
-                )
+                    rewards.append({
+                        "type": coerce_enum(RewardType, reward_data.get("type"), RewardType.CUSTOM),
+                        "description": reward_data.get("description", ""),
+                        "japanese_description": reward_data.get("japanese_description", ""),
+                        "target_id": reward_data.get("target_id"),
+                        "quantity": reward_data.get("quantity", 1),
+                        "vocabulary": reward_data.get("vocabulary", [])
+                    })
                 
-                world.quests[quest_id] = quest
+                quests[quest_id] = {
+                    "id": quest_id,
+                    "title": quest_data.get("title", "Untitled Quest"),
+                    "japanese_title": quest_data.get("japanese_title", ""),
+                    "description": quest_data.get("description", ""),
+                    "japanese_description": quest_data.get("japanese_description", ""),
+                    "objectives": objectives,
+                    "rewards": rewards,
+                    "prerequisite_quests": quest_data.get("prerequisite_quests", []),
+                    "start_location": quest_data.get("start_location"),
+                    "completion_location": quest_data.get("completion_location"),
+                    "start_dialogue": quest_data.get("start_dialogue"),
+                    "completion_dialogue": quest_data.get("completion_dialogue"),
+                    "difficulty": quest_data.get("difficulty", 1),
+                    "jlpt_level": quest_data.get("jlpt_level"),
+                    "hidden": quest_data.get("hidden", False)
+                }
+            
+            world.quests = load_quests(quests, trusted=trusted)
         except Exception as e:
             logger.warning(f"Error processing quest data: {str(e)}")
             # Continue with initialization even if quests fail to load
@@ -508,6 +833,15 @@ class GameEngine:
         # Validate and fix the world structure
         world = self.validate_world_structure(world)
         
+        # Compile grammar challenge matchers once, at load time
+        for quest in world.quests.values():
+            for objective in quest.objectives:
+                if objective.type == ObjectiveType.GRAMMAR_CHALLENGE:
+                    get_matcher(
+                        objective.properties.get("correct_pattern", ""),
+                        bool(objective.properties.get("use_pattern", False))
+                    )
+        
         # Create player state
         player = Player(
             current_location="start",
@@ -524,22 +858,17 @@ class GameEngine:
             player=player,
             visited_locations=set(),
             flags={},
-            metadata={"version": "0.1.0", "creation_time": datetime.now().isoformat()}
+            metadata={
+                "version": "0.1.0",
+                "creation_time": datetime.now().isoformat(),
+                "world_id": uuid.uuid4().hex,
+                "graph_version": 0
+            }
         )
     
     def get_opposite_direction(self, direction: str) -> str:
         """Get the opposite direction for creating bidirectional connections"""
-        opposites = {
-            Direction.NORTH: Direction.SOUTH,
-            Direction.SOUTH: Direction.NORTH,
-            Direction.EAST: Direction.WEST,
-            Direction.WEST: Direction.EAST,
-            Direction.UP: Direction.DOWN,
-            Direction.DOWN: Direction.UP,
-            Direction.IN: Direction.OUT,
-            Direction.OUT: Direction.IN,
-        }
-        return opposites.get(direction, Direction.SOUTH)  # Default to SOUTH if unknown
+        return OPPOSITE_DIRECTIONS.get(direction, Direction.SOUTH)  # Default to SOUTH if unknown
     
     def process_command(self, command: str, game_state: GameState) -> Tuple[str, GameState]:
         """Process a player command and update the game state"""
@@ -557,37 +886,49 @@ class GameEngine:
         game_state.player.last_command = command
         game_state.player.last_command_time = datetime.now().isoformat()
         
-        # Check for direction movement
-        for direction_word, direction in self.direction_synonyms.items():
-            if command.startswith(direction_word):
-                return self.move_player(direction, game_state)
+        # Check for Japanese travel phrasing, e.g. 森に行く
+        travel_match = re.match(r"^(.+?)[にへ]行く$", command)
+        if travel_match:
+            return self.travel_command(travel_match.group(1), game_state)
+        
+        words = command.split()
+        if not words:
+            return "What would you like to do?", game_state
+        first_word = words[0]
+        
+        # Check for direction movement. Only a whole first word is a direction:
+        # matching prefixes sent "drop", "use" and "examine" down, up and east.
+        direction = self.direction_synonyms.get(first_word)
+        if direction is not None:
+            return self.move_player(direction, game_state)
         
         # Check for action commands
-        first_word = command.split()[0]
-        for action, synonyms in self.action_commands.items():
-            if first_word in synonyms:
-                # Extract the object of the command (if any)
-                command_object = command[len(first_word):].strip()
-                
-                # Call the appropriate method based on the action
-                if action == "look":
-                    return self.look_command(game_state, command_object)
-                elif action == "take":
-                    return self.take_command(command_object, game_state)
-                elif action == "drop":
-                    return self.drop_command(command_object, game_state)
-                elif action == "inventory":
-                    return self.inventory_command(game_state)
-                elif action == "use":
-                    return self.use_command(command_object, game_state)
-                elif action == "talk":
-                    return self.talk_command(command_object, game_state)
-                elif action == "help":
-                    return self.help_command(game_state)
-                elif action == "quests":
-                    return self.quest_command(command_object, game_state)
-                elif action == "grammar":
-                    return self.grammar_challenge_command(command_object, game_state)
+        action = self.action_lookup.get(first_word)
+        if action is not None:
+            # Extract the object of the command (if any)
+            command_object = command[len(first_word):].strip()
+            
+            # Call the appropriate method based on the action
+            if action == "look":
+                return self.look_command(game_state, command_object)
+            elif action == "take":
+                return self.take_command(command_object, game_state)
+            elif action == "drop":
+                return self.drop_command(command_object, game_state)
+            elif action == "inventory":
+                return self.inventory_command(game_state)
+            elif action == "use":
+                return self.use_command(command_object, game_state)
+            elif action == "talk":
+                return self.talk_command(command_object, game_state)
+            elif action == "help":
+                return self.help_command(game_state)
+            elif action == "quests":
+                return self.quest_command(command_object, game_state)
+            elif action == "grammar":
+                return self.grammar_challenge_command(command_object, game_state)
+            elif action == "travel":
+                return self.travel_command(command_object, game_state)
         
         # Check if this is an answer to a grammar challenge
         if hasattr(game_state, 'active_grammar_challenge') and game_state.active_grammar_challenge:
@@ -602,12 +943,33 @@ class GameEngine:
     
     def move_player(self, direction: Direction, game_state: GameState) -> Tuple[str, GameState]:
         """Move the player in the specified direction"""
+        error, quest_messages = self._step_player(direction, game_state)
+        if error:
+            return error, game_state
+        
+        # Get the location description
+        location_description = self.get_location_description(game_state)
+        
+        # Combine any quest-related messages with the location description
+        if quest_messages:
+            location_description += "\n\n" + "\n".join(quest_messages)
+        
+        return location_description, game_state
+    
+    def _step_player(self, direction: str, game_state: GameState) -> Tuple[Optional[str], List[str]]:
+        """
+        Move the player one step, firing visit triggers for newly visited locations.
+        
+        Returns:
+            Error message if the move was not possible (None otherwise) and
+            any quest messages produced by entering the location
+        """
         current_loc_id = game_state.player.current_location
         current_loc = self.ensure_valid_location(current_loc_id, game_state)
         
         # Check if the direction is valid
         if direction not in current_loc.connections:
-            return f"You can't go {direction} from here.", game_state
+            return f"You can't go {direction} from here.", []
         
         # Get the target location
         target_loc_id = current_loc.connections[direction]
@@ -615,18 +977,23 @@ class GameEngine:
         
         # Check if the location is hidden
         if target_loc.hidden:
-            return f"That path seems to be blocked. You can't go {direction} from here.", game_state
+            return f"That path seems to be blocked. You can't go {direction} from here.", []
         
         # Check if the location requires a key
         if hasattr(target_loc, 'requires_key') and target_loc.requires_key:
             key_id = target_loc.requires_key
             if key_id not in game_state.player.inventory:
                 key_name = game_state.world.items.get(key_id, Item(id=key_id, name="a key", description="")).name
-                return f"You need {key_name} to enter this area.", game_state
+                return f"You need {key_name} to enter this area.", []
         
         # Move the player
         game_state.player.current_location = target_loc_id
         
+        # In sharded worlds, make sure every exit from here is resident
+        self.prefetch_neighbour_regions(game_state)
+        
+        messages = []
+        
         # Mark as visited
         if not target_loc.visited:
             target_loc.visited = True
@@ -645,40 +1012,113 @@ class GameEngine:
                 quest_messages, game_state = self.quest_handler.check_quest_triggers(
                     game_state, "visit_location", target_loc_id
                 )
+                messages.extend(quest_messages)
             except Exception as e:
                 logger.error(f"Error checking quest triggers: {str(e)}")
-                quest_messages = []
             
             # Update quest progress
             try:
                 progress_messages, game_state = self.quest_handler.update_quest_progress(
                     game_state, "visit_location", target_loc_id
                 )
+                messages.extend(progress_messages)
             except Exception as e:
                 logger.error(f"Error updating quest progress: {str(e)}")
-                progress_messages = []
         
-        # Get the location description
-        location_description = self.get_location_description(game_state)
+        return None, messages
+    
+    def predicted_move_responses(self, game_state: GameState) -> List[str]:
+        """
+        Responses the player would see by moving through each visible exit,
+        ignoring quest messages; used to prefetch LLM work for them
+        """
+        current = game_state.world.locations.get(game_state.player.current_location)
+        if current is None:
+            return []
+        responses = []
+        for target_id in current.connections.values():
+            target = game_state.world.locations.get(target_id)
+            if target is not None and not target.hidden and not target.requires_key:
+                responses.append(self.get_location_description(game_state, target_id))
+        return responses
+    
+    def travel_command(self, destination: str, game_state: GameState) -> Tuple[str, GameState]:
+        """Travel to a named location along the shortest known path"""
+        destination = destination.strip()
+        if destination.startswith("to "):
+            destination = destination[3:].strip()
+        if not destination:
+            return "Where do you want to go?", game_state
         
-        # Combine any quest-related messages with the location description
-        if locals().get('quest_messages') and quest_messages:
-            location_description += "\n\n" + "\n".join(quest_messages)
-        if locals().get('progress_messages') and progress_messages:
-            location_description += "\n\n" + "\n".join(progress_messages)
+        # "go north" is just a regular move
+        if destination in self.direction_synonyms:
+            return self.move_player(self.direction_synonyms[destination], game_state)
         
-        return location_description, game_state
+        route_index = self.get_route_index(game_state)
+        target_id = route_index.resolve(destination)
+        if not target_id or target_id in route_index.hidden:
+            return f"You don't know how to get to '{destination}'.", game_state
+        
+        source_id = game_state.player.current_location
+        route = route_index.find_route(source_id, target_id)
+        if route is None:
+            return f"You can't find a way to '{destination}' from here.", game_state
+        if not route:
+            return "You are already there.\n\n" + self.get_location_description(game_state), game_state
+        
+        travelled = []
+        messages = []
+        for direction, location_id in route:
+            error, step_messages = self._step_player(direction, game_state)
+            if error:
+                messages.append(error)
+                break
+            location = game_state.world.locations.get(location_id)
+            travelled.append(f"{direction} to {location.name if location else location_id}")
+            messages.extend(step_messages)
+        
+        response = ""
+        if travelled:
+            response = "You travel " + ", then ".join(travelled) + ".\n\n"
+        response += self.get_location_description(game_state)
+        if messages:
+            response += "\n\n" + "\n".join(messages)
+        
+        return response, game_state
     
-    def get_location_description(self, game_state: GameState) -> str:
-        """Generate a description of the player's current location, including items and characters."""
+    def get_location_description(self, game_state: GameState, location_id: Optional[str] = None) -> str:
+        """Generate a description of a location (the player's by default), including items and characters."""
         player = game_state.player
         world = game_state.world
-        location = world.locations.get(player.current_location)
+        location_id = location_id or player.current_location
+        location = world.locations.get(location_id)
 
         if not location:
-            logger.error(f"Player location ID '{player.current_location}' not found in world locations.")
+            logger.error(f"Player location ID '{location_id}' not found in world locations.")
             return "You are lost in a void. Something is terribly wrong."
 
+        # Every change to what the text is rendered from advances location.version; the
+        # graph digest also covers neighbours paged in or out of a sharded world
+        world_id = game_state.metadata.get("world_id")
+        cache_key = None
+        if world_id:
+            cache_key = (world_id, location.id, location.version, self._graph_digest(game_state))
+            cached = self.description_cache.get(cache_key)
+            if cached is not None:
+                self.description_cache.move_to_end(cache_key)
+                return cached
+
+        description = self._render_location_description(location, world)
+
+        if cache_key is not None:
+            self.description_cache[cache_key] = description
+            while len(self.description_cache) > self.max_cached_descriptions:
+                self.description_cache.popitem(last=False)
+
+        return description
+
+    def _render_location_description(self, location: Location, world: World) -> str:
+        """Build the location description text from scratch"""
         description_parts = []
         # Location Name and Description
         description_parts.append(f"You are in {location.name}" + (f" ({location.japanese_name})" if location.japanese_name else "") + ".")
@@ -703,43 +1143,36 @@ class GameEngine:
         else:
             description_parts.append("There are no obvious exits.")
 
-        logger.debug(f"Location {location.id} items: {getattr(location, 'items', '[Attribute missing]')}") # Log items
+        logger.debug(f"Location {location.id} items: {location.items}, characters: {location.characters}")
         # Format Visible Items
         visible_items_str_list = []
-        if hasattr(location, 'items') and location.items: # Check if items attribute exists and is not empty
-            for item_id in location.items:
-                item = world.items.get(item_id)
-                if item and not item.hidden:
-                    item_name = f"{item.name}" + (f" ({item.japanese_name})" if item.japanese_name else "")
-                    visible_items_str_list.append(item_name)
-                elif not item:
-                     logger.warning(f"Item ID '{item_id}' listed in location '{location.id}' not found in world items.")
+        for item_id in location.items:
+            item = world.items.get(item_id)
+            if item and not item.hidden:
+                item_name = f"{item.name}" + (f" ({item.japanese_name})" if item.japanese_name else "")
+                visible_items_str_list.append(item_name)
+            elif not item:
+                 logger.warning(f"Item ID '{item_id}' listed in location '{location.id}' not found in world items.")
 
         if visible_items_str_list:
             description_parts.append(f"You see: {', '.join(visible_items_str_list)}.")
         # Optional: Add 'You see nothing special.' if list is empty? Decide based on desired verbosity.
 
-        logger.debug(f"Location {location.id} characters: {getattr(location, 'characters', '[Attribute missing]')}") # Log characters
         # Format Present Characters
         present_characters_str_list = []
-        if hasattr(location, 'characters') and location.characters: # Check if characters attribute exists and is not empty
-            for char_id in location.characters:
-                character = world.characters.get(char_id)
-                # Assuming characters don't have a 'hidden' flag for now
-                if character:
-                    char_name = f"{character.name}" + (f" ({character.japanese_name})" if character.japanese_name else "")
-                    present_characters_str_list.append(char_name)
-                elif not character:
-                     logger.warning(f"Character ID '{char_id}' listed in location '{location.id}' not found in world characters.")
+        for char_id in location.characters:
+            character = world.characters.get(char_id)
+            # Assuming characters don't have a 'hidden' flag for now
+            if character:
+                char_name = f"{character.name}" + (f" ({character.japanese_name})" if character.japanese_name else "")
+                present_characters_str_list.append(char_name)
+            else:
+                 logger.warning(f"Character ID '{char_id}' listed in location '{location.id}' not found in world characters.")
 
         if present_characters_str_list:
             description_parts.append(f"Characters: {', '.join(present_characters_str_list)}.")
         # Optional: Add 'Nobody else is here.' if list is empty?
 
-        # Process vocabulary for the location description itself
-        # Consider if vocab should be processed *before* adding items/chars, or after
-        # self.process_vocabulary(game_state, " ".join(description_parts)) # Moved processing if needed
-
         return "\\n".join(description_parts)
 
     def look_command(self, game_state: GameState, target: Optional[str] = None) -> Tuple[str, GameState]:
@@ -813,6 +1246,7 @@ class GameEngine:
                 
                 # Remove from location and add to inventory
                 current_loc.items.remove(item_id)
+                advance_location_version(current_loc, f"take {item_id}")
                 game_state.player.inventory.append(item_id)
                 
                 # Update player stats
@@ -866,6 +1300,7 @@ class GameEngine:
                 # Remove from inventory and add to location
                 game_state.player.inventory.remove(item_id)
                 current_loc.items.append(item_id)
+                advance_location_version(current_loc, f"drop {item_id}")
                 
                 # Check for quest triggers for dropping an item
                 quest_messages = []
@@ -1045,6 +1480,7 @@ Available Commands:
 - inventory: Check what you're carrying (i for short)
 - use [item]: Use an item in your inventory
 - talk [character]: Talk to someone
+- go to [place]: Travel to a known place along the shortest path
 - quests: View your active quests
 - grammar [challenge_id]: Start a grammar challenge or list available challenges
 - help: Show this help message
@@ -1057,6 +1493,7 @@ Japanese Commands:
 - 持ち物: Check inventory
 - 使う [item]: Use an item
 - 話す [character]: Talk to someone
+- [place]に行く: Travel to a place
 - クエスト: View quests
 - 文法 [challenge_id]: Grammar practice
 - ヘルプ: Show help
@@ -1083,7 +1520,7 @@ Japanese Commands:
         if not vocabulary_list:
             return ""
         
-        now = datetime.now().isoformat()
+        now = datetime.now()
         vocab_info = "\n\n[Vocabulary]"
         new_words = 0
         
@@ -1095,48 +1532,172 @@ Japanese Commands:
             english = vocab_item.get("english", "")
             reading = vocab_item.get("reading", "")
             
-            # Generate a vocab ID
-            vocab_id = f"vocab_{len(game_state.world.vocabulary)}"
+            # Words already met keep their ID; new ones get the next free one
+            vocab_id = self.get_vocabulary_id(game_state, japanese)
             
-            # Check if this is a new vocabulary item for the player
-            if vocab_id not in game_state.player.learned_vocabulary:
-                # Add to player's learned vocabulary
-                game_state.player.learned_vocabulary[vocab_id] = LearnedVocabulary(
-                    vocabulary_id=vocab_id,
-                    first_encountered_location=game_state.player.current_location,
-                    first_encountered_time=now,
-                    mastery_level=1,
-                    context=f"From {source_id}"
-                )
-                
-                # Add to world vocabulary if not already there
-                if vocab_id not in game_state.world.vocabulary:
-                    game_state.world.vocabulary[vocab_id] = VocabularyEntry(
-                        japanese=japanese,
-                        english=english,
-                        reading=reading,
-                        part_of_speech=vocab_item.get("part_of_speech", ""),
-                        example_sentence=vocab_item.get("example_sentence", ""),
-                        notes=vocab_item.get("notes", "")
-                    )
-                
-                # Update player stats
-                if hasattr(game_state.player.stats, "vocabulary_learned"):
-                    game_state.player.stats.vocabulary_learned += 1
-                
-                new_words += 1
-                
-                # Add to vocabulary info
-                vocab_info += f"\n- {japanese}"
-                if reading:
-                    vocab_info += f" ({reading})"
-                vocab_info += f": {english}"
+            if vocab_id in game_state.player.learned_vocabulary:
+                # Meeting a known word again counts as an exposure for review scheduling
+                self.srs.record_exposure(game_state, vocab_id, now.timestamp())
+                continue
+            
+            # Add to world vocabulary if not already there
+            if vocab_id not in game_state.world.vocabulary:
+                self.add_vocabulary(game_state, vocab_id, VocabularyEntry(
+                    japanese=japanese,
+                    english=english,
+                    reading=reading,
+                    part_of_speech=vocab_item.get("part_of_speech", ""),
+                    example_sentence=vocab_item.get("example_sentence", ""),
+                    notes=vocab_item.get("notes", "")
+                ))
+            
+            # Add to player's learned vocabulary and schedule its first review
+            self.srs.introduce(game_state, LearnedVocabulary(
+                vocabulary_id=vocab_id,
+                first_encountered_location=game_state.player.current_location,
+                first_encountered_time=now.isoformat(),
+                mastery_level=1,
+                context=f"From {source_id}"
+            ), now.timestamp())
+            
+            # Update player stats
+            if hasattr(game_state.player.stats, "vocabulary_learned"):
+                game_state.player.stats.vocabulary_learned += 1
+            
+            new_words += 1
+            
+            # Add to vocabulary info
+            vocab_info += f"\n- {japanese}"
+            if reading:
+                vocab_info += f" ({reading})"
+            vocab_info += f": {english}"
         
         if new_words > 0:
             return vocab_info
         else:
             return ""
     
+    def get_vocabulary_id(self, game_state: GameState, japanese: str) -> str:
+        """
+        ID of a word in the world's vocabulary, or the ID it will get when added
+        
+        IDs used to be derived from the vocabulary size alone, so a word met
+        twice was recorded twice; looking words up by their Japanese keeps one
+        entry (and one review schedule) per word.
+        """
+        vocabulary = game_state.world.vocabulary
+        vocab_id = self._vocabulary_index(game_state).get(japanese)
+        if vocab_id is not None and vocab_id in vocabulary and vocabulary[vocab_id].japanese == japanese:
+            return vocab_id
+        
+        number = len(vocabulary)
+        while f"vocab_{number}" in vocabulary:
+            number += 1
+        return f"vocab_{number}"
+    
+    def add_vocabulary(self, game_state: GameState, vocab_id: str, entry: VocabularyEntry) -> None:
+        """Add a word to the world's vocabulary, carrying the cached index forward"""
+        index = self._vocabulary_index(game_state)
+        game_state.world.vocabulary[vocab_id] = entry
+        index.setdefault(entry.japanese, vocab_id)
+        
+        digest = game_state.metadata.get("vocabulary_digest")
+        if digest:
+            digest = hashlib.sha256(f"{digest}{vocab_id}:{entry.japanese};".encode("utf-8")).hexdigest()[:16]
+            game_state.metadata["vocabulary_digest"] = digest
+            self.vocabulary_indexes[game_state.metadata["world_id"]] = (digest, index)
+    
+    def _vocabulary_index(self, game_state: GameState) -> Dict[str, str]:
+        """
+        Japanese text -> vocabulary ID for the state's vocabulary
+        
+        Cached per session and keyed on the state's vocabulary digest, so forks
+        of a save that learned different words never share an index.
+        """
+        vocabulary = game_state.world.vocabulary
+        world_id = game_state.metadata.get("world_id")
+        digest = None
+        if world_id:
+            digest = game_state.metadata.get("vocabulary_digest")
+            if not digest:
+                digest = vocabulary_digest(vocabulary)
+                game_state.metadata["vocabulary_digest"] = digest
+            cached = self.vocabulary_indexes.get(world_id)
+            if cached is not None and cached[0] == digest:
+                self.vocabulary_indexes.move_to_end(world_id)
+                return cached[1]
+        
+        index = {}
+        for vocab_id, entry in vocabulary.items():
+            index.setdefault(entry.japanese, vocab_id)
+        if world_id:
+            self.vocabulary_indexes[world_id] = (digest, index)
+            self.vocabulary_indexes.move_to_end(world_id)
+            while len(self.vocabulary_indexes) > self.max_vocabulary_indexes:
+                self.vocabulary_indexes.popitem(last=False)
+        return index
+    
+    def review_batch(self, game_state: GameState, limit: int = 20) -> List[Dict[str, Any]]:
+        """Words due for review, most overdue first, with their dictionary entries"""
+        batch = []
+        for entry in self.srs.due_batch(game_state, limit):
+            word = game_state.world.vocabulary.get(entry.vocabulary_id)
+            batch.append({
+                "vocabulary_id": entry.vocabulary_id,
+                "japanese": word.japanese if word else "",
+                "reading": word.reading if word else None,
+                "english": word.english if word else "",
+                "mastery_level": entry.mastery_level,
+                "review_count": entry.review_count,
+                "next_review_time": entry.next_review_time
+            })
+        return batch
+    
+    def record_review(self, game_state: GameState, vocab_id: str, quality: int) -> LearnedVocabulary:
+        """Grade the player's recall of a word (0-5) and reschedule it"""
+        return self.srs.record_answer(game_state, vocab_id, quality)
+    
+    def get_grammar_index(self, game_state: GameState) -> "OrderedDict[str, Tuple[str, int]]":
+        """
+        Index of this session's grammar challenges in active quests,
+        as target_id -> (quest_id, objective position)
+        
+        Cached per world and quest version; entries are re-checked against the
+        live state on use, so a stale entry can only be skipped, never wrong.
+        """
+        active_quests = game_state.quest_log.active_quests
+        world_id = game_state.metadata.get("world_id")
+        key = (world_id, game_state.metadata.get("quest_version", 0), tuple(active_quests))
+        if world_id:
+            cached = self.grammar_indexes.get(world_id)
+            if cached is not None and cached[0] == key:
+                self.grammar_indexes.move_to_end(world_id)
+                return cached[1]
+        
+        index: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        for quest_id, quest in active_quests.items():
+            for position, objective in enumerate(quest.objectives):
+                if objective.type == ObjectiveType.GRAMMAR_CHALLENGE and not objective.completed:
+                    index.setdefault(objective.target_id, (quest_id, position))
+        
+        if world_id:
+            self.grammar_indexes[world_id] = (key, index)
+            while len(self.grammar_indexes) > self.max_grammar_indexes:
+                self.grammar_indexes.popitem(last=False)
+        return index
+    
+    def _active_grammar_challenges(self, game_state: GameState) -> List[Tuple[str, Any, Any]]:
+        """(quest_id, quest, objective) for each open grammar challenge, via the index"""
+        challenges = []
+        for quest_id, position in self.get_grammar_index(game_state).values():
+            quest = game_state.quest_log.active_quests.get(quest_id)
+            if quest is None or position >= len(quest.objectives):
+                continue
+            objective = quest.objectives[position]
+            if objective.type == ObjectiveType.GRAMMAR_CHALLENGE and not objective.completed:
+                challenges.append((quest_id, quest, objective))
+        return challenges
+    
     def grammar_challenge_command(self, challenge_id: str, game_state: GameState) -> Tuple[str, GameState]:
         """Handle grammar challenge commands"""
         # If no challenge ID specified, list available challenges
@@ -1144,15 +1705,12 @@ Japanese Commands:
             active_grammar_challenges = []
             
             # Find grammar challenges in active quests
-            for quest_id, quest in game_state.quest_log.active_quests.items():
-                for objective in quest.objectives:
-                    if (objective.type == ObjectiveType.GRAMMAR_CHALLENGE and 
-                        not objective.completed):
-                        active_grammar_challenges.append({
-                            "id": objective.target_id,
-                            "description": objective.description,
-                            "quest": quest.title
-                        })
+            for quest_id, quest, objective in self._active_grammar_challenges(game_state):
+                active_grammar_challenges.append({
+                    "id": objective.target_id,
+                    "description": objective.description,
+                    "quest": quest.title
+                })
             
             if not active_grammar_challenges:
                 return "You don't have any active grammar challenges.", game_state
@@ -1165,24 +1723,21 @@ Japanese Commands:
             return response, game_state
         
         # Find the specific grammar challenge
-        for quest_id, quest in game_state.quest_log.active_quests.items():
-            for objective in quest.objectives:
-                if (objective.type == ObjectiveType.GRAMMAR_CHALLENGE and 
-                    objective.target_id == challenge_id and
-                    not objective.completed):
-                    
-                    # Set this as the active challenge
-                    game_state.active_grammar_challenge = {
-                        "quest_id": quest_id,
-                        "objective_id": objective.id,
-                        "target_id": objective.target_id
-                    }
-                    
-                    # Return the prompt
-                    prompt = objective.properties.get("prompt", "Complete the grammar challenge")
-                    response = f"Grammar Challenge: {objective.description}\n\n{prompt}"
-                    
-                    return response, game_state
+        for quest_id, quest, objective in self._active_grammar_challenges(game_state):
+            if objective.target_id == challenge_id:
+                
+                # Set this as the active challenge
+                game_state.active_grammar_challenge = {
+                    "quest_id": quest_id,
+                    "objective_id": objective.id,
+                    "target_id": objective.target_id
+                }
+                
+                # Return the prompt
+                prompt = objective.properties.get("prompt", "Complete the grammar challenge")
+                response = f"Grammar Challenge: {objective.description}\n\n{prompt}"
+                
+                return response, game_state
         
         return f"Grammar challenge '{challenge_id}' not found or already completed.", game_state
     
@@ -0,0 +1,84 @@
+"""
+Answer matching for grammar challenges.
+
+Answers and expected patterns are folded before comparison: NFKC folds
+full-width ASCII and half-width katakana into their usual forms, and
+katakana is folded to hiragana. An exact answer additionally ignores case,
+whitespace and sentence punctuation. A regex pattern is searched in the
+folded answer with re.IGNORECASE; only its non-ASCII literal text is folded,
+so escapes, classes, anchors and group syntax keep their meaning, and
+whitespace and punctuation in the answer are kept for \\s, \\b and the like. A
+challenge's matcher is compiled once per (pattern, use_pattern) and shared by
+every session; GameEngine warms the cache when a world is loaded.
+"""
+
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Optional, Pattern
+
+# Katakana ァ..ヶ sit exactly 0x60 above their hiragana counterparts
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+_IGNORED = re.compile(r"[\s。、．，.,!！?？「」『』]+")
+# An escape (kept with its escaped character) or a run of non-ASCII literal text
+_FOLDABLE = re.compile(r"(\\.)|([^\x00-\x7f]+)", re.S)
+
+
+def fold_text(text: str) -> str:
+    """Fold width and kana variants, keeping everything else as written"""
+    return unicodedata.normalize("NFKC", text).translate(_KATAKANA_TO_HIRAGANA)
+
+
+def normalize_answer(text: str) -> str:
+    """Fold width, kana and case variants and drop whitespace and sentence punctuation"""
+    return _IGNORED.sub("", fold_text(text).lower())
+
+
+def _fold_pattern_text(match) -> str:
+    escape, text = match.groups()
+    if escape is not None:
+        if escape[1].isascii():
+            return escape
+        text = escape[1]
+    # A folded character may be regex syntax, e.g. a full-width parenthesis
+    return re.escape(fold_text(text))
+
+
+def fold_pattern(pattern: str) -> str:
+    """
+    Fold the literal text of a regex the way fold_text folds answers
+
+    Runs of non-ASCII characters are folded together, so half-width kana
+    with their voicing marks fold like they do in answers. Everything ASCII,
+    including escapes such as \\s or \\b, is copied unchanged.
+    """
+    return _FOLDABLE.sub(_fold_pattern_text, pattern)
+
+
+class GrammarMatcher:
+    """Precompiled matcher for one challenge's expected answer"""
+
+    __slots__ = ("expected", "regex")
+
+    def __init__(self, pattern: str, use_pattern: bool = False):
+        self.expected = normalize_answer(pattern)
+        self.regex: Optional[Pattern[str]] = None
+        if use_pattern and pattern:
+            try:
+                self.regex = re.compile(fold_pattern(pattern), re.IGNORECASE)
+            except re.error:
+                self.regex = re.compile(re.escape(fold_text(pattern)), re.IGNORECASE)
+
+    def matches(self, answer: str) -> bool:
+        if not self.expected:
+            return False
+        if normalize_answer(answer) == self.expected:
+            return True
+        return self.regex is not None and self.regex.search(fold_text(answer)) is not None
+
+
+@lru_cache(maxsize=int(os.getenv("GRAMMAR_MATCHER_CACHE_SIZE", "4096")))
+def get_matcher(pattern: str, use_pattern: bool = False) -> GrammarMatcher:
+    """Shared, compiled matcher for a challenge pattern"""
+    return GrammarMatcher(pattern, use_pattern)
@@ -0,0 +1,140 @@
+"""
+Cached and speculatively prefetched vocabulary hints for JP-MUD.
+
+Vocabulary hints are a japanese_model call on the exact response text, so
+they are cached by that text. After a move, the responses the player is most
+likely to see next (moving to each neighbouring location) are known in
+advance, and the prefetcher computes their hints in the background while the
+player reads. Prefetching is bounded by a semaphore, and a session's pending
+prefetches are cancelled when the player moves on.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from loguru import logger
+
+
+class HintPrefetcher:
+    """LRU cache of vocabulary hints with per-session background prefetch"""
+
+    def __init__(
+        self,
+        compute: Callable[[str], Awaitable[str]],
+        prefetch_compute: Optional[Callable[[str], Awaitable[str]]] = None,
+        max_concurrency: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.compute = compute
+        # Speculative work may run at a lower priority than a request someone waits on
+        self.prefetch_compute = prefetch_compute or compute
+        self.max_concurrency = max_concurrency or int(os.getenv("HINT_PREFETCH_CONCURRENCY", "2"))
+        self.cache_size = cache_size or int(os.getenv("VOCAB_HINT_CACHE_SIZE", "2048"))
+        if enabled is None:
+            enabled = os.getenv("VOCAB_HINT_PREFETCH", "false").lower() == "true"
+        self.enabled = enabled
+        self.cache: "OrderedDict[str, str]" = OrderedDict()
+        # Hints being computed, shared by prefetches and interactive requests
+        self.inflight: Dict[str, "asyncio.Task[str]"] = {}
+        # Pending prefetch tasks per session, keyed by text
+        self.session_tasks: Dict[str, Dict[str, "asyncio.Task[str]"]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _store(self, text: str, hint: str) -> None:
+        # An empty reply (e.g. a cut-off stream) would otherwise hide the hint for good
+        if not hint or not hint.strip():
+            return
+        self.cache[text] = hint
+        self.cache.move_to_end(text)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def get(self, text: str) -> str:
+        """Vocabulary hint for a response, from cache, an in-flight prefetch, or a fresh call"""
+        hint = self.cache.get(text)
+        if hint is not None:
+            self.cache.move_to_end(text)
+            self.hits += 1
+            return hint
+
+        task = self.inflight.get(text)
+        if task is not None:
+            try:
+                # Shield so a session moving on does not cancel a hint someone is waiting for
+                hint = await asyncio.shield(task)
+                self.hits += 1
+                return hint
+            except asyncio.CancelledError:
+                # Only swallow the prefetch being cancelled, not this request
+                if not task.cancelled():
+                    raise
+            except Exception:
+                pass
+
+        self.misses += 1
+        hint = await self.compute(text)
+        self._store(text, hint)
+        return hint
+
+    async def _prefetch(self, text: str) -> str:
+        async with self.semaphore:
+            if text in self.cache:
+                return self.cache[text]
+            hint = await self.prefetch_compute(text)
+            self._store(text, hint)
+            return hint
+
+    def schedule(self, session_id: str, texts: Iterable[str]) -> None:
+        """
+        Prefetch hints for a session's likely next responses
+
+        Pending prefetches for texts the session no longer needs are cancelled.
+        """
+        if not self.enabled:
+            return
+
+        wanted = [text for text in dict.fromkeys(texts) if text and text not in self.cache]
+        pending = self.session_tasks.get(session_id, {})
+        for text, task in list(pending.items()):
+            if text not in wanted:
+                task.cancel()
+
+        tasks: Dict[str, "asyncio.Task[str]"] = {}
+        for text in wanted:
+            task = pending.get(text)
+            if task is None or task.done():
+                if text in self.inflight:
+                    # Another session is already fetching it; that session owns the task
+                    continue
+                task = asyncio.ensure_future(self._prefetch(text))
+                self.inflight[text] = task
+                task.add_done_callback(lambda done, text=text: self._finished(text, done))
+            tasks[text] = task
+
+        if tasks:
+            self.session_tasks[session_id] = tasks
+        else:
+            self.session_tasks.pop(session_id, None)
+
+    def _finished(self, text: str, task: "asyncio.Task[str]") -> None:
+        if self.inflight.get(text) is task:
+            del self.inflight[text]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Vocabulary hint prefetch failed: {task.exception()}")
+
+    def cancel(self, session_id: str) -> None:
+        """Cancel all pending prefetches for a session"""
+        for task in self.session_tasks.pop(session_id, {}).values():
+            task.cancel()
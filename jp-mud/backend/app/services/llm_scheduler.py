@@ -0,0 +1,158 @@
+"""
+Priority scheduling of LLM calls for JP-MUD.
+
+Every LLM call goes to the same backend, so a burst of world generation can
+make every player's command wait. LLMScheduler admits calls by priority class
+(interactive commands first, background work last) within a global
+concurrency limit and a per-class cap, records how long each class waited in
+the queue, and sheds low-priority work outright when its queue is too long.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Deque, Dict, Optional
+
+
+class Priority(IntEnum):
+    """LLM job classes, most urgent first"""
+    INTERACTIVE = 0  # Interpreting a player's command
+    VALIDATION = 1   # Checking the player's Japanese
+    HINTS = 2        # Vocabulary hints appended to responses
+    BACKGROUND = 3   # World generation and speculative prefetch
+
+
+class LoadShedError(Exception):
+    """Raised when a low-priority LLM job is rejected because its queue is full"""
+
+    def __init__(self, priority: Priority, queued: int):
+        self.priority = priority
+        self.queued = queued
+        super().__init__(f"LLM queue for {priority.name.lower()} jobs is full ({queued} waiting)")
+
+
+# Defaults: (concurrency cap, queue length at which new jobs are shed; 0 = never)
+DEFAULT_LIMITS = {
+    Priority.INTERACTIVE: (4, 0),
+    Priority.VALIDATION: (2, 32),
+    Priority.HINTS: (2, 16),
+    Priority.BACKGROUND: (1, 4),
+}
+
+
+class ClassStats:
+    """Queue and wait-time counters for one priority class"""
+
+    __slots__ = ("completed", "shed", "total_wait", "max_wait", "recent_waits")
+
+    def __init__(self, window: int = 256):
+        self.completed = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=window)
+
+    def record_wait(self, wait: float) -> None:
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    def p95_wait(self) -> float:
+        if not self.recent_waits:
+            return 0.0
+        waits = sorted(self.recent_waits)
+        return waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+
+
+class LLMScheduler:
+    """Admits LLM jobs by priority within global and per-class concurrency limits"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, limits: Optional[Dict[Priority, tuple]] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.caps: Dict[Priority, int] = {}
+        self.shed_thresholds: Dict[Priority, int] = {}
+        for priority in Priority:
+            if limits and priority in limits:
+                cap, shed_at = limits[priority]
+            else:
+                cap, shed_at = DEFAULT_LIMITS[priority]
+                cap = int(os.getenv(f"LLM_{priority.name}_CONCURRENCY", str(cap)))
+                shed_at = int(os.getenv(f"LLM_{priority.name}_SHED_QUEUE", str(shed_at)))
+            self.caps[priority] = cap
+            self.shed_thresholds[priority] = shed_at
+
+        self.queues: Dict[Priority, Deque[asyncio.Future]] = {priority: deque() for priority in Priority}
+        self.running: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self.stats: Dict[Priority, ClassStats] = {priority: ClassStats() for priority in Priority}
+
+    def queued(self, priority: Priority) -> int:
+        return sum(1 for waiter in self.queues[priority] if not waiter.done())
+
+    def _dispatch(self) -> None:
+        """Start waiting jobs, most urgent class first, while slots are free"""
+        total_running = sum(self.running.values())
+        for priority in Priority:
+            queue = self.queues[priority]
+            while queue and total_running < self.max_concurrency and self.running[priority] < self.caps[priority]:
+                waiter = queue.popleft()
+                if waiter.done():
+                    # Cancelled while waiting
+                    continue
+                waiter.set_result(None)
+                self.running[priority] += 1
+                total_running += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        """
+        Wait for a slot for one LLM job
+
+        Raises:
+            LoadShedError: if the class's queue is over its shedding threshold
+        """
+        stats = self.stats[priority]
+        shed_at = self.shed_thresholds[priority]
+        if shed_at and self.queued(priority) >= shed_at:
+            stats.shed += 1
+            raise LoadShedError(priority, self.queued(priority))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.queues[priority].append(waiter)
+        enqueued = time.perf_counter()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled; give the slot back
+                self.running[priority] -= 1
+                self._dispatch()
+            raise
+
+        stats.record_wait(time.perf_counter() - enqueued)
+        try:
+            yield
+        finally:
+            self.running[priority] -= 1
+            self._dispatch()
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-class queue depth, concurrency and queue-time statistics (milliseconds)"""
+        result = {}
+        for priority in Priority:
+            stats = self.stats[priority]
+            result[priority.name.lower()] = {
+                "queued": self.queued(priority),
+                "running": self.running[priority],
+                "cap": self.caps[priority],
+                "completed": stats.completed,
+                "shed": stats.shed,
+                "avg_wait_ms": 1000 * stats.total_wait / stats.completed if stats.completed else 0.0,
+                "p95_wait_ms": 1000 * stats.p95_wait(),
+                "max_wait_ms": 1000 * stats.max_wait,
+            }
+        return result
@@ -1,3 +1,5 @@
+import copy
+import hashlib
 import json
 import os
 import re
@@ -8,6 +10,14 @@ from loguru import logger
 import aiohttp
 import ast  # For literal_eval as a last-resort parser
 from app.services.game_engine import GameEngine
+from app.services.session_manager import SessionManager, StaleStateError
+from app.services.region_store import WorldExpiredError
+from app.services.shared_store import SharedStore
+from app.services.chat_history import ChatHistoryPolicy
+from app.services.world_generator import ProceduralWorldGenerator
+from app.services.state_loader import load_game_state
+from app.services.hint_prefetcher import HintPrefetcher
+from app.services.llm_scheduler import LLMScheduler, LoadShedError, Priority
 from app.models.game import GameState
 from app.services.world_templates import DEFAULT_WORLD
 from app.services.quest_templates import DEFAULT_QUESTS, QUEST_ITEMS, HIDDEN_LOCATIONS
@@ -159,12 +169,64 @@ class LLMService:
         self.game_model = os.getenv("GAME_MODEL", "qwen2.5:14b")
         self.japanese_model = os.getenv("JAPANESE_MODEL", "qwen2.5:14b")
         self.game_engine = GameEngine()
+        # Set when several workers serve the same sessions (see app.main)
+        self.shared_store = SharedStore.from_env()
+        self.sessions = SessionManager(
+            max_sessions=int(os.getenv("MAX_TRACKED_SESSIONS", "10000")),
+            store=self.shared_store
+        )
+        self.chat_history_policy = ChatHistoryPolicy()
+        self.world_generator = ProceduralWorldGenerator()
+        self.scheduler = LLMScheduler()
+        self.hint_prefetcher = HintPrefetcher(self._vocabulary_hints, prefetch_compute=self._prefetch_vocabulary_hint)
+        self.fast_state_hydration = os.getenv("FAST_STATE_HYDRATION", "true").lower() == "true"
         logger.info(f"LLM Service initialized with base URL: {self.base_url}")
         
-    async def _call_llm(self, prompt: str, model: str, system_prompt: Optional[str] = None) -> str:
+    async def _call_llm(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        cache: bool = False
+    ) -> str:
         """
         Call the LLM with proper streaming response handling
+        
+        Calls wait for a scheduler slot of their priority class first, and
+        low-priority calls may be shed with LoadShedError when busy. With
+        cache=True, results are shared across workers through the shared
+        store; only use it where any answer to the same prompt will do.
         """
+        cache_key = None
+        if cache and self.shared_store is not None:
+            cache_key = hashlib.sha256(
+                json.dumps([model, system_prompt, prompt], ensure_ascii=False).encode("utf-8")
+            ).hexdigest()
+            try:
+                cached = await asyncio.to_thread(self.shared_store.cache_get, cache_key)
+                if cached is not None:
+                    return cached
+            except Exception as e:
+                logger.warning(f"Shared LLM cache lookup failed: {str(e)}")
+        
+        content = await self._request_llm(prompt, model, system_prompt, priority)
+        
+        if cache_key is not None and content:
+            try:
+                await asyncio.to_thread(self.shared_store.cache_set, cache_key, content)
+            except Exception as e:
+                logger.warning(f"Shared LLM cache write failed: {str(e)}")
+        return content
+    
+    async def _request_llm(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str],
+        priority: Priority
+    ) -> str:
+        """Send one streaming chat completion request and collect the reply"""
         try:
             messages = []
             if system_prompt:
@@ -179,44 +241,45 @@ class LLMService:
             
             logger.info(f"Calling LLM model {model} with prompt: {prompt[:100]}...")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"LLM API error: {error_text}")
-                        raise Exception(f"LLM API returned status {response.status}: {error_text}")
-                    
-                    content = ""
-                    buffer = ""
-                    
-                    # Process the streaming response
-                    async for chunk in response.content:
-                        chunk_str = chunk.decode('utf-8')
-                        logger.debug(f"Raw chunk: {chunk_str!r}")
+            async with self.scheduler.slot(priority):
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(self.base_url, json=payload) as response:
+                        if response.status != 200:
+                            error_text = await response.text()
+                            logger.error(f"LLM API error: {error_text}")
+                            raise Exception(f"LLM API returned status {response.status}: {error_text}")
                         
-                        # Add to buffer and process complete messages
-                        buffer += chunk_str
-                        # Process all complete SSE messages in buffer
-                        while '\n\n' in buffer:
-                            message, buffer = buffer.split('\n\n', 1)
-                            # Process each line in the message
-                            for line in message.split('\n'):
-                                if line.startswith('data: '):
-                                    data = line[6:].strip()
-                                    if data == "[DONE]":
-                                        continue  # Skip [DONE] marker but keep processing
-                                    
-                                    try:
-                                        json_data = json.loads(data)
-                                        if 'choices' in json_data and len(json_data['choices']) > 0:
-                                            delta = json_data['choices'][0].get('delta', {})
-                                            if 'content' in delta and delta['content']:
-                                                content += delta['content']
-                                                logger.debug(f"Current content: {content[:100]}...")
-                                    except json.JSONDecodeError:
-                                        logger.warning(f"Failed to parse JSON: {data}")
-                                        # Continue processing rather than breaking
-                                        continue
+                        content = ""
+                        buffer = ""
+                        
+                        # Process the streaming response
+                        async for chunk in response.content:
+                            chunk_str = chunk.decode('utf-8')
+                            logger.debug(f"Raw chunk: {chunk_str!r}")
+                            
+                            # Add to buffer and process complete messages
+                            buffer += chunk_str
+                            # Process all complete SSE messages in buffer
+                            while '\n\n' in buffer:
+                                message, buffer = buffer.split('\n\n', 1)
+                                # Process each line in the message
+                                for line in message.split('\n'):
+                                    if line.startswith('data: '):
+                                        data = line[6:].strip()
+                                        if data == "[DONE]":
+                                            continue  # Skip [DONE] marker but keep processing
+                                        
+                                        try:
+                                            json_data = json.loads(data)
+                                            if 'choices' in json_data and len(json_data['choices']) > 0:
+                                                delta = json_data['choices'][0].get('delta', {})
+                                                if 'content' in delta and delta['content']:
+                                                    content += delta['content']
+                                                    logger.debug(f"Current content: {content[:100]}...")
+                                        except json.JSONDecodeError:
+                                            logger.warning(f"Failed to parse JSON: {data}")
+                                            # Continue processing rather than breaking
+                                            continue
             
             logger.info(f"LLM response completed: {content[:100]}...")
             return content
@@ -336,7 +399,7 @@ class LLMService:
             
             try:
                 # Try to call the LLM
-                response = await self._call_llm(enhanced_prompt, self.world_model, system_prompt)
+                response = await self._call_llm(enhanced_prompt, self.world_model, system_prompt, Priority.BACKGROUND)
                 
                 # Clean the response
                 clean_response = clean_json_string(response)
@@ -411,6 +474,10 @@ class LLMService:
                     logger.warning("Using default world template due to parsing failure")
                     return self.add_template_content(DEFAULT_WORLD)
             
+            except LoadShedError as e:
+                # The LLM is busy with players' commands; generate a world without it
+                logger.warning(f"World generation shed ({str(e)}), using the procedural generator")
+                return self.generate_procedural_world()
             except Exception as e:
                 logger.error(f"LLM call failed: {str(e)}")
                 # If the LLM call fails, use the default world
@@ -422,31 +489,48 @@ class LLMService:
             # Final fallback
             return self.add_template_content(DEFAULT_WORLD)
     
+    def generate_procedural_world(
+        self,
+        seed: Optional[int] = None,
+        num_locations: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a world without calling the LLM, using the seeded procedural generator
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(4), "big")
+        if num_locations is None:
+            num_locations = int(os.getenv("PROCEDURAL_WORLD_SIZE", "100"))
+        
+        logger.info(f"Generating procedural world with {num_locations} locations (seed {seed})")
+        world_data = self.world_generator.generate(num_locations=num_locations, seed=seed)
+        return self.add_template_content(world_data)
+    
     def add_template_content(self, world_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Add template quests and hidden locations to the world data
         """
-        # Make a copy to avoid modifying the original
-        world_data = world_data.copy()
+        # Deep copy so the shared templates are never mutated by concurrent requests
+        world_data = copy.deepcopy(world_data)
         
         # Initialize quests list if it doesn't exist
         if "quests" not in world_data:
             world_data["quests"] = []
         
         # Add template quests
-        world_data["quests"].extend(DEFAULT_QUESTS)
+        world_data["quests"].extend(copy.deepcopy(DEFAULT_QUESTS))
         
         # Add quest items to the items list
         if "items" not in world_data:
             world_data["items"] = []
         
-        world_data["items"].extend(QUEST_ITEMS)
+        world_data["items"].extend(copy.deepcopy(QUEST_ITEMS))
         
         # Add hidden locations to the locations list
         if "locations" not in world_data:
             world_data["locations"] = []
         
-        world_data["locations"].extend(HIDDEN_LOCATIONS)
+        world_data["locations"].extend(copy.deepcopy(HIDDEN_LOCATIONS))
         
         # Ensure the starting location has the map quest trigger
         start_location_found = False
@@ -577,6 +661,104 @@ class LLMService:
         
         return world_data
     
+    def _build_game_state(self, game_state_dict: Dict[str, Any]) -> GameState:
+        """Rebuild a GameState model from the dictionary sent by the client"""
+        # Check if we have a properly initialized GameState
+        if "world" not in game_state_dict or "player" not in game_state_dict:
+            logger.warning("Game state not properly initialized, attempting to rebuild")
+            # Try to convert the dictionary to our GameState model
+            game_state = self.game_engine.init_game_state(game_state_dict.get("world", {}))
+            game_state.player.current_location = game_state_dict.get("current_location", "start")
+            game_state.player.inventory = game_state_dict.get("inventory", [])
+        elif self.fast_state_hydration and game_state_dict.get("metadata", {}).get("world_id"):
+            # States carrying a world ID were produced by this server on an earlier
+            # request, so skip re-validating every location, item and quest
+            game_state = load_game_state(game_state_dict)
+        else:
+            # We have a proper state, use it directly
+            # Note: This is a simplification and should be replaced with proper parsing
+            game_state = GameState(
+                world=game_state_dict["world"],
+                player=game_state_dict["player"],
+                visited_locations=set(game_state_dict.get("visited_locations", [])),
+                flags=game_state_dict.get("flags", {}),
+                metadata=game_state_dict.get("metadata", {}),
+                quest_log=game_state_dict.get("quest_log", {})
+            )
+        
+        # Worlds built by the frontend have no ID yet; it is used to key engine caches
+        self.game_engine.ensure_world_id(game_state)
+        
+        # Very large worlds are moved to the region store and paged in as the player explores
+        world_key = game_state.metadata.get("region_world")
+        threshold = self.game_engine.shard_threshold
+        if world_key:
+            # Fail up front rather than paging in placeholders for a collected world
+            self.game_engine.region_store.require_world(world_key)
+        elif threshold and len(game_state.world.locations) > threshold:
+            self.game_engine.shard_world(game_state)
+        return game_state
+    
+    def get_route(self, game_state_dict: Dict[str, Any], destination: str) -> Dict[str, Any]:
+        """
+        Find the shortest route from the player's location to a destination
+        without changing the game state
+        """
+        game_state = self._build_game_state(game_state_dict)
+        route_index = self.game_engine.get_route_index(game_state)
+        
+        target_id = route_index.resolve(destination)
+        if not target_id or target_id in route_index.hidden:
+            return {"found": False, "destination": None, "steps": []}
+        
+        route = route_index.find_route(game_state.player.current_location, target_id)
+        if route is None:
+            return {"found": False, "destination": target_id, "steps": []}
+        
+        steps = []
+        for direction, location_id in route:
+            location = game_state.world.locations.get(location_id)
+            steps.append({
+                "direction": direction,
+                "location_id": location_id,
+                "name": location.name if location else location_id
+            })
+        return {"found": True, "destination": target_id, "steps": steps}
+    
+    def get_due_reviews(self, game_state_dict: Dict[str, Any], limit: int = 20) -> List[Dict[str, Any]]:
+        """Vocabulary due for review, most overdue first, without changing the game state"""
+        game_state = self._build_game_state(game_state_dict)
+        return self.game_engine.review_batch(game_state, limit)
+    
+    async def record_review(
+        self,
+        game_state_dict: Dict[str, Any],
+        vocabulary_id: str,
+        quality: int
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Grade a vocabulary review and reschedule the word
+        
+        Applied under the session lock like a command, so it bumps the state
+        version and a stale state raises StaleStateError.
+        
+        Returns:
+            The updated vocabulary entry and the updated game state
+        """
+        game_state = self._build_game_state(game_state_dict)
+        session_id = game_state.metadata["world_id"]
+        
+        async with self.sessions.lock(session_id):
+            state_version = game_state.metadata.get("state_version", 0)
+            await self.sessions.check_version(session_id, state_version)
+            
+            entry = self.game_engine.record_review(game_state, vocabulary_id, quality)
+            
+            game_state.metadata["state_version"] = state_version + 1
+            await self.sessions.commit_version(session_id, state_version + 1)
+        
+        return entry.dict(), game_state.dict()
+    
     async def process_game_input(
         self, 
         user_input: str, 
@@ -585,98 +767,135 @@ class LLMService:
     ) -> Tuple[str, Dict[str, Any]]:
         """
         Process user input for the game
+        
+        Commands for the same session are applied one at a time, and a state
+        older than the session's latest raises StaleStateError.
         """
         try:
-            # Check if we have a properly initialized GameState
-            if "world" not in game_state_dict or "player" not in game_state_dict:
-                logger.warning("Game state not properly initialized, attempting to rebuild")
-                # Try to convert the dictionary to our GameState model
-                game_state = self.game_engine.init_game_state(game_state_dict.get("world", {}))
-                game_state.player.current_location = game_state_dict.get("current_location", "start")
-                game_state.player.inventory = game_state_dict.get("inventory", [])
-            else:
-                # We have a proper state, use it directly
-                # Note: This is a simplification and should be replaced with proper parsing
-                game_state = GameState(
-                    world=game_state_dict["world"],
-                    player=game_state_dict["player"],
-                    visited_locations=set(game_state_dict.get("visited_locations", [])),
-                    flags=game_state_dict.get("flags", {}),
-                    metadata=game_state_dict.get("metadata", {}),
-                    quest_log=game_state_dict.get("quest_log", {})
-                )
+            game_state = self._build_game_state(game_state_dict)
+            session_id = game_state.metadata["world_id"]
             
-            # First try to process the command with our game engine
-            response, updated_game_state = self.game_engine.process_command(user_input, game_state)
-            
-            # If the command wasn't recognized or needs more context, use the LLM to enhance the response
-            if "I don't understand" in response:
-                # Let the LLM try to interpret the command
-                system_prompt = """You are a Japanese text adventure game assistant.
-                The player has entered a command that wasn't recognized by the standard
-                parser. Try to interpret what they meant and provide a helpful response
-                that stays in character for the game world. Include some Japanese phrases
-                where appropriate to enhance language learning."""
-                
-                # Prepare the prompt with game context
-                current_loc_id = game_state.player.current_location
-                current_loc = game_state.world.locations.get(current_loc_id)
-                context = f"""
-                The player is currently at: {current_loc.name} ({current_loc.japanese_name})
+            async with self.sessions.lock(session_id):
+                state_version = game_state.metadata.get("state_version", 0)
+                await self.sessions.check_version(session_id, state_version)
                 
-                Location description: {current_loc.description}
+                response, updated_game_state = await self._run_command(user_input, game_state, chat_history)
                 
-                Characters present: {[game_state.world.characters.get(c).name for c in current_loc.characters if game_state.world.characters.get(c)]}
-                
-                Items visible: {[game_state.world.items.get(i).name for i in current_loc.items if game_state.world.items.get(i) and not game_state.world.items.get(i).hidden]}
-                
-                The player typed: "{user_input}"
-                
-                Interpret what they might have meant and provide a helpful response
-                that teaches them how to play while staying in character for the game.
-                Include at least one relevant Japanese phrase with its English translation.
-                """
-                
-                try:
-                    llm_response = await self._call_llm(context, self.game_model, system_prompt)
-                    # Combine the responses
-                    response = f"Command not recognized. {llm_response}"
-                except Exception as e:
-                    logger.error(f"Failed to get LLM interpretation: {str(e)}")
-                    # Fallback to a generic response with some Japanese
-                    response = "そのコマンドは分かりません (I don't understand that command). Try simple commands like 'look', 'north', or 'take map'."
+                updated_game_state.metadata["state_version"] = state_version + 1
+                await self.sessions.commit_version(session_id, state_version + 1)
             
-            # Enhance the response with Japanese vocabulary where appropriate
-            elif "Look" in response or "You see" in response or "Inventory" in response:
-                # Let's add some vocabulary hints for key words
-                system_prompt = """You are a Japanese language assistant. 
-                Identify 1-3 important words in the given text that would be useful vocabulary
-                for a Japanese language learner. Provide the Japanese translation, 
-                reading, and a brief note for each. Format your response like this:
-                
-                [New Words]
-                - word: 「日本語」 (にほんご) - a brief note about usage
-                """
-                
-                try:
-                    vocab_response = await self._call_llm(response, self.japanese_model, system_prompt)
-                    
-                    # Add vocabulary to the response if we got some
-                    if "[New Words]" in vocab_response:
-                        response = f"{response}\n\n{vocab_response}"
-                except Exception as e:
-                    logger.error(f"Failed to get vocabulary hints: {str(e)}")
-                    # Just continue without vocabulary hints
+            # Use idle time until the next command to prepare its likely LLM work
+            self._prefetch_vocabulary_hints(session_id, updated_game_state)
             
             # Convert the updated game state back to a dictionary
             game_state_dict = updated_game_state.dict()
             
             return response, game_state_dict
-            
+        
+        except (StaleStateError, WorldExpiredError):
+            raise
         except Exception as e:
             logger.error(f"Error processing game input: {str(e)}")
             return "申し訳ありません (I'm sorry), there was an error processing your command. Please try again.", game_state_dict
     
+    async def _run_command(
+        self,
+        user_input: str,
+        game_state: GameState,
+        chat_history: List[Dict[str, str]]
+    ) -> Tuple[str, GameState]:
+        """Apply a command with the game engine and enhance the response with the LLM"""
+        # First try to process the command with our game engine
+        response, updated_game_state = self.game_engine.process_command(user_input, game_state)
+        
+        # If the command wasn't recognized or needs more context, use the LLM to enhance the response
+        if "I don't understand" in response:
+            # Let the LLM try to interpret the command
+            system_prompt = """You are a Japanese text adventure game assistant.
+            The player has entered a command that wasn't recognized by the standard
+            parser. Try to interpret what they meant and provide a helpful response
+            that stays in character for the game world. Include some Japanese phrases
+            where appropriate to enhance language learning."""
+            
+            # Prepare the prompt with game context
+            current_loc_id = game_state.player.current_location
+            current_loc = game_state.world.locations.get(current_loc_id)
+            context = f"""
+            The player is currently at: {current_loc.name} ({current_loc.japanese_name})
+            
+            Location description: {current_loc.description}
+            
+            Characters present: {[game_state.world.characters.get(c).name for c in current_loc.characters if game_state.world.characters.get(c)]}
+            
+            Items visible: {[game_state.world.items.get(i).name for i in current_loc.items if game_state.world.items.get(i) and not game_state.world.items.get(i).hidden]}
+            
+            Recent conversation:
+            {self.chat_history_policy.prompt_context(chat_history)}
+            
+            The player typed: "{user_input}"
+            
+            Interpret what they might have meant and provide a helpful response
+            that teaches them how to play while staying in character for the game.
+            Include at least one relevant Japanese phrase with its English translation.
+            """
+            
+            try:
+                llm_response = await self._call_llm(context, self.game_model, system_prompt)
+                # Combine the responses
+                response = f"Command not recognized. {llm_response}"
+            except Exception as e:
+                logger.error(f"Failed to get LLM interpretation: {str(e)}")
+                # Fallback to a generic response with some Japanese
+                response = "そのコマンドは分かりません (I don't understand that command). Try simple commands like 'look', 'north', or 'take map'."
+        
+        # Enhance the response with Japanese vocabulary where appropriate
+        elif self._wants_vocabulary_hints(response):
+            try:
+                vocab_response = await self.hint_prefetcher.get(response)
+                
+                # Add vocabulary to the response if we got some
+                if "[New Words]" in vocab_response:
+                    response = f"{response}\n\n{vocab_response}"
+            except Exception as e:
+                logger.error(f"Failed to get vocabulary hints: {str(e)}")
+                # Just continue without vocabulary hints
+        
+        return response, updated_game_state
+    
+    @staticmethod
+    def _wants_vocabulary_hints(response: str) -> bool:
+        """Whether a command response gets LLM vocabulary hints appended"""
+        return "Look" in response or "You see" in response or "Inventory" in response
+    
+    async def _vocabulary_hints(self, text: str, priority: Priority = Priority.HINTS) -> str:
+        """Ask the Japanese model for vocabulary hints on a response"""
+        system_prompt = """You are a Japanese language assistant. 
+        Identify 1-3 important words in the given text that would be useful vocabulary
+        for a Japanese language learner. Provide the Japanese translation, 
+        reading, and a brief note for each. Format your response like this:
+        
+        [New Words]
+        - word: 「日本語」 (にほんご) - a brief note about usage
+        """
+        return await self._call_llm(text, self.japanese_model, system_prompt, priority, cache=True)
+    
+    async def _prefetch_vocabulary_hint(self, text: str) -> str:
+        """Speculative hints only use capacity left over by everything else"""
+        return await self._vocabulary_hints(text, Priority.BACKGROUND)
+    
+    def _prefetch_vocabulary_hints(self, session_id: str, game_state: GameState) -> None:
+        """Speculatively compute hints for the responses of moving to each neighbour"""
+        if not self.hint_prefetcher.enabled:
+            return
+        try:
+            texts = [
+                text for text in self.game_engine.predicted_move_responses(game_state)
+                if self._wants_vocabulary_hints(text)
+            ]
+            self.hint_prefetcher.schedule(session_id, texts)
+        except Exception as e:
+            logger.warning(f"Failed to schedule vocabulary hint prefetch: {str(e)}")
+    
     async def validate_japanese(self, text: str) -> Tuple[bool, str]:
         """
         Validate if the Japanese text input is grammatically correct
@@ -706,7 +925,7 @@ class LLMService:
         
         try:
             try:
-                response = await self._call_llm(prompt, self.japanese_model, system_prompt)
+                response = await self._call_llm(prompt, self.japanese_model, system_prompt, Priority.VALIDATION, cache=True)
                 
                 # Parse the response
                 is_valid = "VALID: true" in response.upper()
@@ -1,8 +1,8 @@
-from typing import Dict, List, Tuple, Any, Optional, Set
+from typing import Dict, List, Tuple, Any, Optional, Set, Callable
 from datetime import datetime
 from loguru import logger
-import re
 
+from app.services.grammar_matcher import get_matcher
 from app.models.game import GameState, Player, World, Location, Character, Item
 from app.models.quest import (
     Quest, QuestObjective, QuestReward, QuestState, 
@@ -15,8 +15,14 @@ class QuestHandler:
     Handles all quest-related functionality in the game
     """
     
-    def __init__(self):
-        pass
+    def __init__(self, on_location_changed: Optional[Callable[[GameState, str], None]] = None):
+        # Called when a quest changes a location's connections or visibility
+        self.on_location_changed = on_location_changed
+    
+    @staticmethod
+    def mark_quests_changed(game_state: GameState) -> None:
+        """Bump the quest version, which keys per-session indexes of active objectives"""
+        game_state.metadata["quest_version"] = game_state.metadata.get("quest_version", 0) + 1
     
     def check_quest_triggers(self, game_state: GameState, trigger_type: str, entity_id: str) -> Tuple[List[str], GameState]:
         """
@@ -72,6 +78,7 @@ class QuestHandler:
                         quest.state = QuestState.IN_PROGRESS
                         game_state.quest_log.active_quests[quest_id] = quest
                         game_state.quest_log.available_quests.pop(quest_id)
+                        self.mark_quests_changed(game_state)
                         
                         # Prepare quest start message
                         start_message = f"Quest started: {quest.title} - {quest.japanese_title}\n\n"
@@ -179,15 +186,12 @@ class QuestHandler:
                       objective.target_id == entity_id and 
                       input_text):
                     
-                    # Check if the input matches the expected pattern
-                    correct_answer = objective.properties.get("correct_pattern", "")
-                    if correct_answer and (
-                        # Exact match
-                        input_text.strip() == correct_answer or 
-                        # Pattern match
-                        (objective.properties.get("use_pattern", False) and 
-                         re.search(correct_answer, input_text))
-                    ):
+                    # Check if the input matches the expected pattern (compiled once, shared)
+                    matcher = get_matcher(
+                        objective.properties.get("correct_pattern", ""),
+                        bool(objective.properties.get("use_pattern", False))
+                    )
+                    if matcher.matches(input_text):
                         objective.completed = True
                         quest_updated = True
                         messages.append(f"Grammar challenge completed: {objective.description}")
@@ -208,6 +212,7 @@ class QuestHandler:
             # Check if all objectives are completed
             if quest_updated:
                 updated = True
+                self.mark_quests_changed(game_state)
                 all_completed = True
                 for objective in quest.objectives:
                     if not objective.completed:
@@ -242,6 +247,8 @@ class QuestHandler:
                                     location = game_state.world.locations[reward.target_id]
                                     location.hidden = False
                                     reward.claimed = True
+                                    if self.on_location_changed:
+                                        self.on_location_changed(game_state, reward.target_id)
                                     completion_message += f"  Unlocked new location: {location.name}.\n"
                             
                             elif reward.type == RewardType.VOCABULARY_BOOST and reward.vocabulary:
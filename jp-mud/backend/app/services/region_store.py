@@ -0,0 +1,291 @@
+"""
+On-disk, region-sharded storage for very large JP-MUD worlds.
+
+A world is split into regions of nearby locations (breadth-first chunks from
+the start, so regions are mostly connected) and each region is written to its
+own JSON file together with the items and characters placed in it. A game
+state then only keeps a few regions resident; the engine pages regions in as
+the player approaches them and evicts the least recently used ones when the
+resident budget is exceeded.
+
+The base files are shared by every session playing the world: a world is
+stored under a digest of its content, so sharding the same world again reuses
+the files. When a session evicts a region it may have changed (items taken or
+dropped, locations visited), the region is written to an overlay named by its
+content instead. The game state records which overlay holds each evicted
+region, so it only ever reads its own: a request rejected as stale or an
+older save never picks up changes written for another state.
+
+Worlds and session overlays not used for REGION_STORE_MAX_AGE_DAYS are
+deleted. A game state that still references them raises WorldExpiredError.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.models.game import World
+
+# World keys, session IDs and overlay IDs become path components
+_SAFE_NAME = re.compile(r"[\w-]+")
+
+
+class WorldExpiredError(Exception):
+    """A game state references stored world files that no longer exist"""
+
+    def __init__(self, world_key: str, detail: str = ""):
+        self.world_key = world_key
+        super().__init__(
+            f"Stored world {world_key} is no longer available{f' ({detail})' if detail else ''}; start a new game"
+        )
+
+
+def _dump(model) -> Dict[str, Any]:
+    return model.model_dump(mode="json") if hasattr(model, "model_dump") else json.loads(model.json())
+
+
+class RegionStore:
+    """Reads and writes world regions under a directory, caching manifests"""
+
+    def __init__(self, root: Optional[str] = None, region_size: Optional[int] = None):
+        self.root = root or os.getenv("REGION_STORE_DIR", os.path.join("data", "regions"))
+        self.region_size = region_size or int(os.getenv("WORLD_REGION_SIZE", "64"))
+        self.manifests: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_manifests = int(os.getenv("REGION_MANIFEST_CACHE_SIZE", "32"))
+        self.max_age = float(os.getenv("REGION_STORE_MAX_AGE_DAYS", "30")) * 86400
+        self.gc_interval = float(os.getenv("REGION_STORE_GC_INTERVAL", "3600"))
+        self._last_gc = 0.0
+
+    @staticmethod
+    def _checked(name: str) -> str:
+        if not _SAFE_NAME.fullmatch(name):
+            raise ValueError(f"Invalid region store name: {name!r}")
+        return name
+
+    def _world_dir(self, world_key: str) -> str:
+        return os.path.join(self.root, self._checked(world_key))
+
+    def _region_path(self, world_key: str, region: int) -> str:
+        return os.path.join(self._world_dir(world_key), f"region_{int(region)}.json")
+
+    def _session_dir(self, world_key: str, session_id: str) -> str:
+        return os.path.join(self._world_dir(world_key), "sessions", self._checked(session_id))
+
+    def _overlay_path(self, world_key: str, session_id: str, overlay_id: str) -> str:
+        return os.path.join(self._session_dir(world_key, session_id), f"{self._checked(overlay_id)}.json")
+
+    @staticmethod
+    def _write_json(path: str, data: Any) -> None:
+        """Write atomically so concurrent readers never see a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def partition(self, world: World, start: str = "start") -> List[List[str]]:
+        """Group location IDs into regions by breadth-first order from the start"""
+        order: List[str] = []
+        seen = set()
+        for root in [start] + list(world.locations):
+            if root in seen or root not in world.locations:
+                continue
+            seen.add(root)
+            queue = deque([root])
+            while queue:
+                location_id = queue.popleft()
+                order.append(location_id)
+                for target_id in world.locations[location_id].connections.values():
+                    if target_id not in seen and target_id in world.locations:
+                        seen.add(target_id)
+                        queue.append(target_id)
+        return [order[i:i + self.region_size] for i in range(0, len(order), self.region_size)]
+
+    def _touch(self, world_key: str, session_id: Optional[str] = None) -> None:
+        """Record that a world (and a session's overlays) were just used, for collect_garbage"""
+        paths = [self._world_dir(world_key)]
+        if session_id:
+            paths.append(self._session_dir(world_key, session_id))
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def save_world(self, world: World, world_key: Optional[str] = None) -> str:
+        """
+        Write a world as region files plus a manifest
+
+        Without a world_key the world is stored under a digest of its regions,
+        and a world already stored under that digest is reused as it is.
+
+        Returns:
+            Key under which the world was stored
+        """
+        self.maybe_collect_garbage()
+        regions = self.partition(world)
+        region_data = [self.region_data(world, location_ids) for location_ids in regions]
+
+        if not world_key:
+            digest = hashlib.sha256()
+            for data in region_data:
+                digest.update(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            world_key = digest.hexdigest()[:32]
+            if self.manifest(world_key) is not None:
+                self._touch(world_key)
+                logger.info(f"Reusing stored world {world_key}")
+                return world_key
+
+        region_of: Dict[str, int] = {}
+        for region, location_ids in enumerate(regions):
+            self._write_json(self._region_path(world_key, region), region_data[region])
+            for location_id in location_ids:
+                region_of[location_id] = region
+
+        manifest = {"region_of": region_of, "regions": len(regions)}
+        self._write_json(os.path.join(self._world_dir(world_key), "manifest.json"), manifest)
+        self._remember_manifest(world_key, manifest)
+        logger.info(f"Stored world {world_key} as {len(regions)} regions of up to {self.region_size} locations")
+        return world_key
+
+    @staticmethod
+    def region_data(world: World, location_ids: List[str]) -> Dict[str, Any]:
+        """Serialize some locations with the items and characters placed in them"""
+        locations, items, characters = {}, {}, {}
+        for location_id in location_ids:
+            location = world.locations[location_id]
+            locations[location_id] = _dump(location)
+            for item_id in location.items:
+                if item_id in world.items:
+                    items[item_id] = _dump(world.items[item_id])
+            for character_id in location.characters:
+                if character_id in world.characters:
+                    characters[character_id] = _dump(world.characters[character_id])
+        return {"locations": locations, "items": items, "characters": characters}
+
+    def _remember_manifest(self, world_key: str, manifest: Dict[str, Any]) -> None:
+        self.manifests[world_key] = manifest
+        self.manifests.move_to_end(world_key)
+        while len(self.manifests) > self.max_manifests:
+            self.manifests.popitem(last=False)
+
+    def manifest(self, world_key: str) -> Optional[Dict[str, Any]]:
+        manifest = self.manifests.get(world_key)
+        if manifest is not None:
+            self.manifests.move_to_end(world_key)
+            return manifest
+        path = os.path.join(self._world_dir(world_key), "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self._remember_manifest(world_key, manifest)
+        return manifest
+
+    def require_world(self, world_key: str) -> Dict[str, Any]:
+        """
+        A stored world's manifest
+
+        Raises:
+            WorldExpiredError: if the world was never stored here or has been collected
+        """
+        manifest = self.manifest(world_key)
+        if manifest is None:
+            raise WorldExpiredError(world_key)
+        return manifest
+
+    def region_of(self, world_key: str, location_id: str) -> Optional[int]:
+        return self.require_world(world_key)["region_of"].get(location_id)
+
+    def load_region(self, world_key: str, region: int, session_id: Optional[str] = None,
+                    overlay_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Read a region from the given overlay, or from the base files without one
+
+        Returns:
+            Region data and whether it came from the overlay
+
+        Raises:
+            WorldExpiredError: if the file has been collected
+        """
+        self._touch(world_key, session_id)
+        if overlay_id:
+            path = self._overlay_path(world_key, session_id or "anonymous", overlay_id)
+        else:
+            path = self._region_path(world_key, region)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f), bool(overlay_id)
+        except FileNotFoundError:
+            # The manifest may still be cached here after another worker collected the world
+            self.manifests.pop(world_key, None)
+            raise WorldExpiredError(world_key, f"region {region} is gone")
+
+    def save_overlay(self, world_key: str, region: int, session_id: str, data: Dict[str, Any]) -> str:
+        """
+        Write a session's copy of a region and return its overlay ID
+
+        Overlays are named by their content and never overwritten, so every
+        game state that recorded an overlay ID keeps reading what it wrote.
+        """
+        encoded = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        overlay_id = f"region_{int(region)}_{hashlib.sha256(encoded).hexdigest()[:16]}"
+        path = self._overlay_path(world_key, session_id, overlay_id)
+        if not os.path.exists(path):
+            self._write_json(path, data)
+        self._touch(world_key, session_id)
+        self.maybe_collect_garbage()
+        return overlay_id
+
+    @staticmethod
+    def _last_used(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    def maybe_collect_garbage(self) -> None:
+        """Run collect_garbage if it has not run for gc_interval seconds"""
+        if time.time() - self._last_gc >= self.gc_interval:
+            self.collect_garbage()
+
+    def collect_garbage(self, max_age: Optional[float] = None) -> int:
+        """
+        Delete session overlays, then whole worlds, not used for max_age seconds
+
+        Returns:
+            Number of directories deleted
+        """
+        self._last_gc = time.time()
+        cutoff = self._last_gc - (self.max_age if max_age is None else max_age)
+        if not os.path.isdir(self.root):
+            return 0
+
+        removed = 0
+        for world_key in os.listdir(self.root):
+            world_dir = self._world_dir(world_key)
+            if not os.path.isdir(world_dir):
+                continue
+            sessions_dir = os.path.join(world_dir, "sessions")
+            if os.path.isdir(sessions_dir):
+                for session_id in os.listdir(sessions_dir):
+                    session_dir = os.path.join(sessions_dir, session_id)
+                    if self._last_used(session_dir) < cutoff:
+                        shutil.rmtree(session_dir, ignore_errors=True)
+                        removed += 1
+            # Using a session's overlays also counts as using its world
+            if self._last_used(world_dir) < cutoff:
+                shutil.rmtree(world_dir, ignore_errors=True)
+                self.manifests.pop(world_key, None)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unused world and session directories from {self.root}")
+        return removed
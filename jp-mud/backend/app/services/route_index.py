@@ -0,0 +1,134 @@
+"""
+Shortest-path routing over the JP-MUD location graph.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.models.game import World, Location
+
+
+class RouteIndex:
+    """
+    Adjacency index over the world's locations that answers route queries.
+
+    Single-source BFS trees are computed on first use and memoized, so repeated
+    queries from the same location only walk parent pointers. Hidden locations
+    are never routed through. The index also records which locations have an
+    exit into each location. When a location's connections or hidden flag
+    change, call update_location() instead of rebuilding the whole index.
+    """
+
+    def __init__(self, world: World):
+        self.adjacency: Dict[str, List[Tuple[str, str]]] = {}
+        self.inbound: Dict[str, Set[str]] = {}  # location ID -> IDs of locations with an exit to it
+        self.hidden: Set[str] = set()
+        self.name_index: Dict[str, str] = {}  # lowercased id/name/japanese_name -> location ID
+        self._location_names: Dict[str, List[str]] = {}
+        self._trees: Dict[str, Dict[str, Tuple[str, str]]] = {}
+
+        for location in world.locations.values():
+            self._index_location(location)
+
+    def _index_location(self, location: Location) -> None:
+        """Add or refresh a single location's adjacency row, hidden flag and names"""
+        for _direction, target in self.adjacency.get(location.id, []):
+            self.inbound.get(target, set()).discard(location.id)
+        self.adjacency[location.id] = list(location.connections.items())
+        for _direction, target in self.adjacency[location.id]:
+            self.inbound.setdefault(target, set()).add(location.id)
+
+        if location.hidden:
+            self.hidden.add(location.id)
+        else:
+            self.hidden.discard(location.id)
+
+        for old_name in self._location_names.get(location.id, []):
+            if self.name_index.get(old_name) == location.id:
+                del self.name_index[old_name]
+
+        names = [name.lower() for name in (location.id, location.name, location.japanese_name) if name]
+        for name in names:
+            self.name_index[name] = location.id
+        self._location_names[location.id] = names
+
+    def update_location(self, location: Location) -> None:
+        """Incrementally apply a change to one location's connections or hidden flag"""
+        self._index_location(location)
+        # Any cached tree may have routed through (or around) this location
+        self._trees.clear()
+
+    def sources_of(self, location_id: str) -> Set[str]:
+        """IDs of the locations with an exit to location_id"""
+        return self.inbound.get(location_id, set())
+
+    def resolve(self, place: str) -> Optional[str]:
+        """Resolve a place name (ID, English or Japanese name) to a location ID"""
+        place = place.lower().strip()
+        if not place:
+            return None
+
+        if place in self.name_index:
+            return self.name_index[place]
+
+        # Fall back to the shortest name containing the query
+        candidates = [name for name in self.name_index if place in name]
+        if not candidates:
+            return None
+        return self.name_index[min(candidates, key=len)]
+
+    def _tree(self, source: str) -> Dict[str, Tuple[str, str]]:
+        """BFS parent pointers from source: location ID -> (previous ID, direction)"""
+        tree = self._trees.get(source)
+        if tree is not None:
+            return tree
+
+        tree = {source: ("", "")}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for direction, target in self.adjacency.get(current, []):
+                if target in tree or target in self.hidden:
+                    continue
+                tree[target] = (current, direction)
+                queue.append(target)
+
+        self._trees[source] = tree
+        return tree
+
+    def find_route(self, source: str, target: str) -> Optional[List[Tuple[str, str]]]:
+        """
+        Find the shortest route between two locations
+
+        Args:
+            source: Starting location ID
+            target: Destination location ID
+
+        Returns:
+            List of (direction, location_id) steps, empty if already there,
+            or None if the destination is unreachable
+        """
+        if source == target:
+            return []
+
+        tree = self._tree(source)
+        if target not in tree:
+            return None
+
+        steps = []
+        current = target
+        while current != source:
+            previous, direction = tree[current]
+            steps.append((direction, current))
+            current = previous
+        steps.reverse()
+        return steps
+
+    def distances_from(self, source: str) -> Dict[str, int]:
+        """Number of moves from source to every reachable location"""
+        tree = self._tree(source)
+        distances = {}
+        # BFS insertion order guarantees parents appear before their children
+        for location_id, (previous, _direction) in tree.items():
+            distances[location_id] = distances[previous] + 1 if previous else 0
+        return distances
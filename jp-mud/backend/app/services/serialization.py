@@ -0,0 +1,95 @@
+"""
+JSON serialization for JP-MUD responses and save files.
+
+Every /process-input response carries the whole game state, and encoding it
+with the standard library (after FastAPI re-validates it against the response
+model and walks it through jsonable_encoder) is measurable CPU time on each
+request. orjson encodes the GameState.dict() tree directly to bytes: enums and
+datetimes natively, and sets (visited_locations) through a default hook that
+emits them sorted so saves and responses are stable. When orjson is not
+installed the standard library is used with the same conversions.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def _default(obj: Any) -> Any:
+    """Convert the non-JSON types that appear in game states"""
+    if isinstance(obj, (set, frozenset)):
+        try:
+            return sorted(obj)
+        except TypeError:
+            return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump() if hasattr(obj, "model_dump") else obj.dict()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode an object (typically a game state dictionary) as UTF-8 JSON"""
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, indent=2 if indent else None,
+        separators=None if indent else (",", ":")
+    ).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or str"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(obj: Any, path: str) -> None:
+    """
+    Write an object to a JSON file, indented so saves stay readable
+
+    The file is written under a temporary name and renamed into place, so
+    another worker listing or loading saves never reads a partial file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(dumps(obj, indent=True))
+    os.replace(temp_path, path)
+
+
+def load_file(path: str) -> Any:
+    """Read a JSON file written by dump_file (or by json.dump)"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with dumps()
+
+    Return it directly from an endpoint to skip FastAPI's response-model
+    validation and jsonable_encoder pass; the declared response_model still
+    documents the schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
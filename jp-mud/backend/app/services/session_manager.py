@@ -0,0 +1,110 @@
+"""
+Per-session command ordering for JP-MUD.
+
+Game state travels with every request, so the server cannot merge two
+commands that were both applied to the same base state. Instead each session
+(identified by the world ID in the state metadata) gets an asyncio lock that
+serializes command application, plus a state version counter used to reject
+requests built on a state that has already been superseded.
+
+Locks are per process. When several workers serve the same sessions, the
+version counter lives in a SharedStore and is committed with a
+compare-and-set, so of two workers applying commands to the same state only
+the first to commit succeeds and the other request is rejected as stale.
+Store calls run in a worker thread so a busy database never blocks the
+event loop.
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+from app.services.shared_store import SharedStore
+
+
+class StaleStateError(Exception):
+    """Raised when a request carries a game state older than the session's latest"""
+
+    def __init__(self, session_id: str, state_version: int, current_version: int):
+        self.session_id = session_id
+        self.state_version = state_version
+        self.current_version = current_version
+        super().__init__(
+            f"Game state version {state_version} is stale; session {session_id} is at version {current_version}"
+        )
+
+
+class SessionManager:
+    """
+    Tracks per-session locks and the latest committed state version.
+
+    Locks only live while a request holds or waits on them, and the version
+    table is a bounded LRU, so memory stays proportional to active sessions.
+    """
+
+    def __init__(self, max_sessions: int = 10000, store: Optional[SharedStore] = None):
+        self.max_sessions = max_sessions
+        self.store = store
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+
+    @asynccontextmanager
+    async def lock(self, session_id: str):
+        """Hold the session's lock for the duration of a command"""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[session_id] -= 1
+            if self._waiters[session_id] == 0:
+                del self._waiters[session_id]
+                del self._locks[session_id]
+
+    async def current_version(self, session_id: str) -> Optional[int]:
+        """Latest committed state version for a session, if known"""
+        if self.store is not None:
+            return await asyncio.to_thread(self.store.get_version, session_id)
+        return self._versions.get(session_id)
+
+    async def check_version(self, session_id: str, state_version: int) -> None:
+        """
+        Reject a state that is older than the latest one this server produced.
+
+        Unknown sessions and newer versions (e.g. after a restart) are accepted.
+        """
+        current = await self.current_version(session_id)
+        if current is not None and state_version < current:
+            logger.warning(f"Rejecting stale state for session {session_id}: {state_version} < {current}")
+            raise StaleStateError(session_id, state_version, current)
+
+    async def commit_version(self, session_id: str, state_version: int) -> None:
+        """
+        Record the version of the state returned to the client
+
+        Raises:
+            StaleStateError: if another worker committed this version first
+        """
+        if self.store is not None and not await asyncio.to_thread(self.store.commit_version, session_id, state_version):
+            current = await asyncio.to_thread(self.store.get_version, session_id)
+            logger.warning(f"Lost commit race for session {session_id}: {state_version} <= {current}")
+            raise StaleStateError(session_id, state_version - 1, current)
+        self._versions[session_id] = state_version
+        self._versions.move_to_end(session_id)
+        while len(self._versions) > self.max_sessions:
+            self._versions.popitem(last=False)
+
+    async def forget(self, session_id: str) -> None:
+        """Drop the version record, e.g. when a saved game is loaded over a session"""
+        self._versions.pop(session_id, None)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.forget, session_id)
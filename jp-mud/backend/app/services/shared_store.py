@@ -0,0 +1,118 @@
+"""
+State shared between JP-MUD worker processes.
+
+With several uvicorn workers, a player's requests can land on any of them, so
+anything that must agree across requests lives in one SQLite database in WAL
+mode (concurrent readers, one writer, no server to run):
+  - the latest committed state version of each session, updated with a
+    compare-and-set so two workers cannot both commit on top of one state
+  - a cache of deterministic LLM results (vocabulary hints, Japanese
+    validation), so one worker's call serves every worker
+
+The methods are blocking; async callers run them with asyncio.to_thread.
+
+Engine caches stay per process. Route indexes, location descriptions and
+review queues are keyed by digests of the state's content, so they are never
+reused for a different state of a session, whichever worker produced it.
+Grammar and vocabulary indexes are keyed by counters in the state and their
+hits are checked against it. A worker that has not seen a state simply
+rebuilds them.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+
+class SharedStore:
+    """SQLite-backed session versions and LLM result cache"""
+
+    def __init__(self, path: str, cache_ttl: Optional[float] = None, max_cache_entries: Optional[int] = None):
+        self.path = path
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("LLM_CACHE_TTL", "86400"))
+        self.max_cache_entries = max_cache_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+        self._local = threading.local()
+        self._writes = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedStore"]:
+        """The store configured by SHARED_STATE_DB, or None when running a single worker"""
+        path = os.getenv("SHARED_STATE_DB")
+        return cls(path) if path else None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # One connection per thread; opened lazily so forked workers never share one
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_versions ("
+                "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get_version(self, session_id: str) -> Optional[int]:
+        row = self.connection.execute(
+            "SELECT version FROM session_versions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def commit_version(self, session_id: str, state_version: int) -> bool:
+        """
+        Record a session's new state version if it is newer than the stored one
+
+        Returns False if another worker already committed this or a later version.
+        """
+        cursor = self.connection.execute(
+            "INSERT INTO session_versions (session_id, version, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET version = excluded.version, updated = excluded.updated "
+            "WHERE session_versions.version < excluded.version",
+            (session_id, state_version, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def forget(self, session_id: str) -> None:
+        self.connection.execute("DELETE FROM session_versions WHERE session_id = ?", (session_id,))
+
+    def cache_get(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def cache_set(self, key: str, value: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, value, time.time() + self.cache_ttl)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.prune_cache()
+
+    def prune_cache(self) -> None:
+        """Drop expired entries, then the soonest-expiring ones over the size limit"""
+        try:
+            connection = self.connection
+            connection.execute("DELETE FROM llm_cache WHERE expires <= ?", (time.time(),))
+            connection.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.max_cache_entries,)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune shared LLM cache: {str(e)}")
@@ -0,0 +1,266 @@
+"""
+Spaced-repetition review scheduling for JP-MUD.
+
+Each LearnedVocabulary entry carries SM-2 state (ease factor, interval and
+repetition count) and its next review time. A ReviewQueue is a binary heap of
+(due timestamp, vocabulary id), so finding what is due and rescheduling an
+answered word cost O(log n) however many words a player has learned.
+Rescheduled words are pushed again rather than moved; the superseded heap
+entries are skipped when they surface and compacted away when they pile up.
+
+Queues are kept per session (world_id) between requests, tagged with the
+"srs_digest" the state carries in its metadata. Every change goes through
+SRSScheduler, which folds the rescheduled (word, due time) into both digests,
+so a cached queue is only reused for the exact schedule it was built from;
+any other state (an older save, another worker's update, a diverging fork)
+has a different digest and the queue is rebuilt from it in O(n).
+
+Words met in the world count as exposures: a new word is scheduled for a
+first review shortly after, and meeting a word that is already due counts as
+a passing review.
+"""
+
+import hashlib
+import heapq
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.models.game import GameState, LearnedVocabulary
+
+DAY = 24 * 60 * 60
+MIN_EASE = 1.3
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Timestamp for an ISO time string, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def set_due(entry: LearnedVocabulary, due: float) -> float:
+    """Store an entry's next review time and return it as the state will read back"""
+    entry.next_review_time = format_time(due)
+    return parse_time(entry.next_review_time)
+
+
+def due_time(entry: LearnedVocabulary) -> float:
+    """When an entry is due; entries never scheduled are due from their first encounter"""
+    due = parse_time(entry.next_review_time)
+    if due is None:
+        due = parse_time(entry.first_encountered_time) or 0.0
+    return due
+
+
+def sm2_review(entry: LearnedVocabulary, quality: int, now: float) -> float:
+    """
+    Apply one SM-2 review to an entry and return its next due time
+
+    Args:
+        entry: Vocabulary entry, updated in place
+        quality: Recall quality, 0 (blackout) to 5 (perfect)
+        now: Review time as a timestamp
+    """
+    if not 0 <= quality <= 5:
+        raise ValueError(f"Review quality must be between 0 and 5, got {quality}")
+
+    if quality < 3:
+        # Lapse: start the word over, keeping its ease
+        entry.repetitions = 0
+        entry.interval_days = 1.0
+    else:
+        if entry.repetitions == 0:
+            entry.interval_days = 1.0
+        elif entry.repetitions == 1:
+            entry.interval_days = 6.0
+        else:
+            entry.interval_days = round(entry.interval_days * entry.ease_factor, 2)
+        entry.repetitions += 1
+
+    entry.ease_factor = max(
+        MIN_EASE,
+        entry.ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    )
+    entry.mastery_level = min(5, 1 + entry.repetitions)
+    entry.review_count += 1
+    entry.last_review_time = format_time(now)
+
+    return set_due(entry, now + entry.interval_days * DAY)
+
+
+def schedule_digest(learned: Dict[str, LearnedVocabulary]) -> str:
+    """Digest of every word's due time"""
+    digest = hashlib.sha256()
+    for vocab_id in sorted(learned):
+        digest.update(f"{vocab_id}:{due_time(learned[vocab_id])!r};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def chain_digest(digest: str, vocab_id: str, due: float) -> str:
+    """Digest after rescheduling one word"""
+    return hashlib.sha256(f"{digest}{vocab_id}:{due!r}".encode("utf-8")).hexdigest()[:16]
+
+
+class ReviewQueue:
+    """Heap of vocabulary ids ordered by due time, with lazy removal"""
+
+    def __init__(self):
+        self.heap: List[Tuple[float, str]] = []
+        self.due: Dict[str, float] = {}
+        # The srs_digest of the state this queue matches
+        self.digest: Optional[str] = None
+
+    @classmethod
+    def from_vocabulary(cls, learned: Dict[str, LearnedVocabulary]) -> "ReviewQueue":
+        queue = cls()
+        queue.due = {vocab_id: due_time(entry) for vocab_id, entry in learned.items()}
+        queue.heap = [(due, vocab_id) for vocab_id, due in queue.due.items()]
+        heapq.heapify(queue.heap)
+        return queue
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def __contains__(self, vocab_id: str) -> bool:
+        return vocab_id in self.due
+
+    def schedule(self, vocab_id: str, due: float) -> None:
+        """Add a word or move it to a new due time"""
+        self.due[vocab_id] = due
+        heapq.heappush(self.heap, (due, vocab_id))
+        if len(self.heap) > 2 * len(self.due) + 64:
+            self.heap = [(due, vocab_id) for vocab_id, due in self.due.items()]
+            heapq.heapify(self.heap)
+
+    def _is_current(self, item: Tuple[float, str]) -> bool:
+        return self.due.get(item[1]) == item[0]
+
+    def next_due(self) -> Optional[Tuple[float, str]]:
+        """Earliest (due time, vocabulary id), or None if the queue is empty"""
+        while self.heap and not self._is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def due_items(self, now: float, limit: int) -> List[Tuple[float, str]]:
+        """Up to `limit` words due by `now`, most overdue first, left in the queue"""
+        found: List[Tuple[float, str]] = []
+        while len(found) < limit:
+            item = self.next_due()
+            if item is None or item[0] > now:
+                break
+            found.append(heapq.heappop(self.heap))
+        for item in found:
+            heapq.heappush(self.heap, item)
+        return found
+
+
+class SRSScheduler:
+    """Per-session review queues over players' learned vocabulary"""
+
+    def __init__(self, cache_size: Optional[int] = None, learning_step: Optional[float] = None,
+                 exposure_quality: Optional[int] = None):
+        self.max_queues = cache_size or int(os.getenv("SRS_QUEUE_CACHE_SIZE", "1000"))
+        # Delay before a newly met word's first review, in seconds
+        self.learning_step = learning_step if learning_step is not None else float(os.getenv("SRS_LEARNING_STEP", "600"))
+        # Meeting a due word in the world is a passive recall: correct, with effort
+        self.exposure_quality = exposure_quality if exposure_quality is not None else int(os.getenv("SRS_EXPOSURE_QUALITY", "3"))
+        self.queues: "OrderedDict[str, ReviewQueue]" = OrderedDict()
+
+    def queue_for(self, game_state: GameState) -> ReviewQueue:
+        """The session's review queue, rebuilt if it no longer matches the state"""
+        learned = game_state.player.learned_vocabulary
+        world_id = game_state.metadata.get("world_id")
+        if not world_id:
+            return ReviewQueue.from_vocabulary(learned)
+
+        digest = game_state.metadata.get("srs_digest")
+        if not digest:
+            digest = schedule_digest(learned)
+            game_state.metadata["srs_digest"] = digest
+
+        queue = self.queues.get(world_id)
+        if queue is not None and queue.digest == digest:
+            self.queues.move_to_end(world_id)
+            return queue
+
+        queue = ReviewQueue.from_vocabulary(learned)
+        queue.digest = digest
+        self.queues[world_id] = queue
+        self.queues.move_to_end(world_id)
+        while len(self.queues) > self.max_queues:
+            self.queues.popitem(last=False)
+        return queue
+
+    def forget(self, world_id: str) -> None:
+        self.queues.pop(world_id, None)
+
+    @staticmethod
+    def _schedule(game_state: GameState, queue: ReviewQueue, vocab_id: str, due: float) -> None:
+        """Reschedule a word in the queue and advance the state's and queue's digest together"""
+        queue.schedule(vocab_id, due)
+        digest = game_state.metadata.get("srs_digest")
+        if digest:
+            queue.digest = chain_digest(digest, vocab_id, due)
+            game_state.metadata["srs_digest"] = queue.digest
+
+    def introduce(self, game_state: GameState, entry: LearnedVocabulary, now: Optional[float] = None) -> None:
+        """Add a word the player has just met and schedule its first review"""
+        # Look the queue up before the entry is added, so a missing digest describes the schedule before it
+        queue = self.queue_for(game_state)
+        now = datetime.now().timestamp() if now is None else now
+        game_state.player.learned_vocabulary[entry.vocabulary_id] = entry
+        self._schedule(game_state, queue, entry.vocabulary_id, set_due(entry, now + self.learning_step))
+
+    def record_exposure(self, game_state: GameState, vocab_id: str, now: Optional[float] = None) -> bool:
+        """
+        Count meeting a known word in the world; returns True if it was due and counted as a review
+        """
+        entry = game_state.player.learned_vocabulary.get(vocab_id)
+        if entry is None:
+            return False
+        now = datetime.now().timestamp() if now is None else now
+        if due_time(entry) > now:
+            return False
+        self.record_answer(game_state, vocab_id, self.exposure_quality, now)
+        return True
+
+    def record_answer(self, game_state: GameState, vocab_id: str, quality: int,
+                      now: Optional[float] = None) -> LearnedVocabulary:
+        """
+        Grade a review of a word and reschedule it
+
+        Raises:
+            KeyError: if the player has not learned the word
+            ValueError: if quality is not between 0 and 5
+        """
+        entry = game_state.player.learned_vocabulary[vocab_id]
+        queue = self.queue_for(game_state)
+        now = datetime.now().timestamp() if now is None else now
+        self._schedule(game_state, queue, vocab_id, sm2_review(entry, quality, now))
+        return entry
+
+    def due_batch(self, game_state: GameState, limit: int = 20,
+                  now: Optional[float] = None) -> List[LearnedVocabulary]:
+        """Up to `limit` words due for review, most overdue first"""
+        now = datetime.now().timestamp() if now is None else now
+        learned = game_state.player.learned_vocabulary
+        for attempt in range(2):
+            queue = self.queue_for(game_state)
+            items = queue.due_items(now, limit)
+            if all(vocab_id in learned and due_time(learned[vocab_id]) == due for due, vocab_id in items):
+                return [learned[vocab_id] for _, vocab_id in items]
+            # The state was changed behind the cached queue's back
+            world_id = game_state.metadata.get("world_id")
+            if world_id:
+                self.forget(world_id)
+        # Never fail the whole batch over a word the state no longer has
+        return [learned[vocab_id] for _, vocab_id in items if vocab_id in learned]
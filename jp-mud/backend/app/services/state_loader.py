@@ -0,0 +1,173 @@
+"""
+Bulk construction of game models from dictionaries.
+
+Game state is rebuilt from a dictionary on every request, and building every
+location, item, character and quest as its own pydantic model dominates that
+cost for large worlds. The loaders here build a whole world in one call.
+
+On pydantic v2, one validation call over the whole tree runs in the compiled
+core and is faster than any Python-level construction, so that is used even
+for trusted data. On pydantic v1, trusted data is built with construct(),
+skipping per-field validation and coercing only what the engine relies on:
+nested models, enum members and sets. Only mark data as trusted if this
+server produced it, e.g. a previous GameState.dict() sent back by the client.
+Nested lists and dicts may be shared with the input rather than copied, so the
+caller hands over ownership.
+"""
+
+from enum import Enum
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.models.game import (
+    GameState, World, Player, PlayerStats, Location, Item, Character,
+    ItemType, VocabularyEntry, LearnedVocabulary
+)
+from app.models.quest import (
+    Quest, QuestObjective, QuestReward, QuestLog,
+    QuestState, ObjectiveType, RewardType
+)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+EnumT = TypeVar("EnumT", bound=Enum)
+
+PYDANTIC_V2 = hasattr(BaseModel, "model_validate")
+
+
+def validate(model_cls: Type[ModelT], data: Any) -> ModelT:
+    """Fully validate a dictionary into a model"""
+    if PYDANTIC_V2:
+        return model_cls.model_validate(data)
+    return model_cls.parse_obj(data)
+
+
+def construct(model_cls: Type[ModelT], **fields: Any) -> ModelT:
+    """Create a model instance without validation, filling in defaults"""
+    if hasattr(model_cls, "model_construct"):
+        return model_cls.model_construct(**fields)
+    return model_cls.construct(**fields)
+
+
+def coerce_enum(enum_cls: Type[EnumT], value: Any, default: EnumT) -> EnumT:
+    """Convert a raw value to an enum member, falling back to a default"""
+    if isinstance(value, enum_cls):
+        return value
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return default
+
+
+def _model(model_cls: Type[ModelT], data: Any, **overrides: Any) -> ModelT:
+    """Construct a flat model from a dict, passing through existing instances"""
+    if isinstance(data, model_cls):
+        return data
+    fields = dict(data)
+    fields.update(overrides)
+    return construct(model_cls, **fields)
+
+
+def load_location(data: Any) -> Location:
+    return _model(Location, data)
+
+
+def load_item(data: Any) -> Item:
+    if isinstance(data, Item):
+        return data
+    return _model(Item, data, item_type=coerce_enum(ItemType, data.get("item_type"), ItemType.GENERAL))
+
+
+def load_character(data: Any) -> Character:
+    return _model(Character, data)
+
+
+def load_quest(data: Any) -> Quest:
+    if isinstance(data, Quest):
+        return data
+    objectives = [
+        objective if isinstance(objective, QuestObjective) else _model(
+            QuestObjective, objective,
+            type=coerce_enum(ObjectiveType, objective.get("type"), ObjectiveType.CUSTOM)
+        )
+        for objective in data.get("objectives", [])
+    ]
+    rewards = [
+        reward if isinstance(reward, QuestReward) else _model(
+            QuestReward, reward,
+            type=coerce_enum(RewardType, reward.get("type"), RewardType.CUSTOM)
+        )
+        for reward in data.get("rewards", [])
+    ]
+    return _model(
+        Quest, data,
+        state=coerce_enum(QuestState, data.get("state"), QuestState.NOT_STARTED),
+        objectives=objectives,
+        rewards=rewards
+    )
+
+
+def load_world(data: Any, trusted: bool = True) -> World:
+    """Build a World from its dictionary form in one bulk call"""
+    if isinstance(data, World):
+        return data
+    if PYDANTIC_V2 or not trusted:
+        return validate(World, data)
+    return construct(
+        World,
+        locations={key: load_location(value) for key, value in data.get("locations", {}).items()},
+        characters={key: load_character(value) for key, value in data.get("characters", {}).items()},
+        items={key: load_item(value) for key, value in data.get("items", {}).items()},
+        vocabulary={key: _model(VocabularyEntry, value) for key, value in data.get("vocabulary", {}).items()},
+        quests={key: load_quest(value) for key, value in data.get("quests", {}).items()}
+    )
+
+
+def load_quests(data: Dict[str, Any], trusted: bool = True) -> Dict[str, Quest]:
+    """Build a mapping of quest ID to Quest in one bulk call"""
+    if PYDANTIC_V2 or not trusted:
+        return validate(World, {"quests": data}).quests
+    return {key: load_quest(value) for key, value in data.items()}
+
+
+def load_player(data: Any) -> Player:
+    if isinstance(data, Player):
+        return data
+    stats_data = data.get("stats") or {}
+    if isinstance(stats_data, PlayerStats):
+        stats = stats_data
+    else:
+        stats = _model(PlayerStats, stats_data, locations_visited=set(stats_data.get("locations_visited", [])))
+    learned = {
+        key: _model(LearnedVocabulary, value)
+        for key, value in data.get("learned_vocabulary", {}).items()
+    }
+    return _model(Player, data, stats=stats, learned_vocabulary=learned)
+
+
+def load_quest_log(data: Any) -> QuestLog:
+    if isinstance(data, QuestLog):
+        return data
+    return construct(
+        QuestLog,
+        **{
+            section: {key: load_quest(value) for key, value in data.get(section, {}).items()}
+            for section in ("active_quests", "completed_quests", "failed_quests", "available_quests")
+        }
+    )
+
+
+def load_game_state(data: Dict[str, Any]) -> GameState:
+    """Build a GameState from a trusted dictionary, e.g. a previous GameState.dict()"""
+    if PYDANTIC_V2:
+        return validate(GameState, data)
+    return construct(
+        GameState,
+        world=load_world(data.get("world", {})),
+        player=load_player(data["player"]),
+        visited_locations=set(data.get("visited_locations", [])),
+        flags=dict(data.get("flags", {})),
+        metadata=dict(data.get("metadata", {})),
+        quest_log=load_quest_log(data.get("quest_log") or {}),
+        active_grammar_challenge=data.get("active_grammar_challenge")
+    )
@@ -0,0 +1,209 @@
+"""
+Deterministic procedural world generation for JP-MUD.
+
+Builds world data in the same shape the LLM produces (lists of locations,
+characters and items with "location" keys), so the result can go through
+add_template_content and GameEngine.init_game_state unchanged. Used for load
+tests, offline play and instant starts when the LLM is unavailable or busy.
+"""
+
+import copy
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.world_templates import DEFAULT_WORLD
+
+# Grid offsets for the compass directions; other directions are not laid out
+DIRECTION_OFFSETS = {
+    "north": (0, 1),
+    "south": (0, -1),
+    "east": (1, 0),
+    "west": (-1, 0),
+}
+OPPOSITE_DIRECTIONS = {"north": "south", "south": "north", "east": "west", "west": "east"}
+
+
+def default_word_list() -> List[Dict[str, str]]:
+    """All vocabulary entries used by the default world, deduplicated by Japanese text"""
+    words: Dict[str, Dict[str, str]] = {}
+    for section in ("locations", "characters", "items"):
+        for entity in DEFAULT_WORLD.get(section, []):
+            for word in entity.get("vocabulary", []):
+                words.setdefault(word["japanese"], word)
+    for word in DEFAULT_WORLD.get("vocabulary", []):
+        words.setdefault(word["japanese"], word)
+    return list(words.values())
+
+
+class ProceduralWorldGenerator:
+    """
+    Grows a seeded grid world outward from the default world.
+
+    The default world's locations, characters and items keep their IDs so the
+    template quests stay completable. New locations are attached to free grid
+    cells next to existing ones, which keeps every connection consistent with
+    its opposite direction.
+    """
+
+    def __init__(self, word_list: Optional[List[Dict[str, str]]] = None):
+        self.word_list = word_list or default_word_list()
+        self.location_templates = DEFAULT_WORLD["locations"]
+        self.character_templates = DEFAULT_WORLD["characters"]
+        self.item_templates = DEFAULT_WORLD["items"]
+
+    def generate(
+        self,
+        num_locations: int = 100,
+        seed: int = 0,
+        branching: int = 2,
+        loop_chance: float = 0.1,
+        item_density: float = 0.2,
+        npc_density: float = 0.05,
+        words_per_location: int = 2,
+    ) -> Dict[str, Any]:
+        """
+        Generate world data
+
+        Args:
+            num_locations: Total number of locations, including the default world's
+            seed: Random seed; the same arguments always produce the same world
+            branching: Maximum new neighbours grown from a location at a time (1-4)
+            loop_chance: Chance of connecting to an already occupied neighbour cell
+            item_density: Extra items per generated location
+            npc_density: Extra characters per generated location
+            words_per_location: Vocabulary entries attached to each generated location
+
+        Returns:
+            World data dictionary accepted by init_game_state
+        """
+        rng = random.Random(seed)
+        branching = max(1, min(branching, 4))
+
+        world_data = {
+            "locations": copy.deepcopy(self.location_templates),
+            "characters": copy.deepcopy(self.character_templates),
+            "items": copy.deepcopy(self.item_templates),
+            "vocabulary": copy.deepcopy(DEFAULT_WORLD.get("vocabulary", [])),
+        }
+        locations = world_data["locations"]
+        by_id = {location["id"]: location for location in locations}
+        positions = self._layout_core(by_id)
+        occupied = {position: location_id for location_id, position in positions.items()}
+
+        frontier = list(positions)
+        generated: List[str] = []
+        directions = list(DIRECTION_OFFSETS)
+
+        while len(locations) < num_locations:
+            if not frontier:
+                # Everything reachable is boxed in; grow from any location again
+                frontier = list(positions)
+
+            index = rng.randrange(len(frontier))
+            source_id = frontier[index]
+            source = by_id[source_id]
+            sx, sy = positions[source_id]
+
+            rng.shuffle(directions)
+            grown = 0
+            has_free_cell = False
+            for direction in directions:
+                dx, dy = DIRECTION_OFFSETS[direction]
+                cell = (sx + dx, sy + dy)
+                neighbour_id = occupied.get(cell)
+
+                if neighbour_id is not None:
+                    # Occasionally close a loop to an existing neighbour
+                    if direction not in source["connections"] and rng.random() < loop_chance:
+                        opposite = OPPOSITE_DIRECTIONS[direction]
+                        if opposite not in by_id[neighbour_id]["connections"]:
+                            source["connections"][direction] = neighbour_id
+                            by_id[neighbour_id]["connections"][opposite] = source_id
+                    continue
+
+                has_free_cell = True
+                if grown >= branching or len(locations) >= num_locations:
+                    continue
+
+                location = self._make_location(len(generated), rng, words_per_location)
+                location["connections"][OPPOSITE_DIRECTIONS[direction]] = source_id
+                source["connections"][direction] = location["id"]
+
+                locations.append(location)
+                by_id[location["id"]] = location
+                positions[location["id"]] = cell
+                occupied[cell] = location["id"]
+                frontier.append(location["id"])
+                generated.append(location["id"])
+                grown += 1
+
+            if not has_free_cell:
+                # Swap-remove exhausted cells so picking stays O(1)
+                frontier[index] = frontier[-1]
+                frontier.pop()
+
+        self._place_entities(world_data, generated, rng, item_density, npc_density)
+        return world_data
+
+    def _layout_core(self, by_id: Dict[str, Dict[str, Any]]) -> Dict[str, Tuple[int, int]]:
+        """Assign grid cells to the default world's locations by walking their compass connections"""
+        positions = {"start": (0, 0)}
+        occupied = {(0, 0)}
+        queue = ["start"]
+        while queue:
+            location_id = queue.pop(0)
+            x, y = positions[location_id]
+            for direction, target_id in by_id[location_id].get("connections", {}).items():
+                if target_id in positions or target_id not in by_id or direction not in DIRECTION_OFFSETS:
+                    continue
+                dx, dy = DIRECTION_OFFSETS[direction]
+                cell = (x + dx, y + dy)
+                if cell in occupied:
+                    continue
+                positions[target_id] = cell
+                occupied.add(cell)
+                queue.append(target_id)
+        return positions
+
+    def _make_location(self, number: int, rng: random.Random, words_per_location: int) -> Dict[str, Any]:
+        """Create one generated location from a random template"""
+        template = rng.choice(self.location_templates)
+        vocabulary = rng.sample(self.word_list, min(words_per_location, len(self.word_list)))
+        return {
+            "id": f"loc_{number}",
+            "name": f"{template['name']} {number}",
+            "japanese_name": f"{template['japanese_name']}{number}",
+            "description": template["description"],
+            "japanese_description": template["japanese_description"],
+            "connections": {},
+            "vocabulary": [dict(word) for word in vocabulary],
+        }
+
+    def _place_entities(
+        self,
+        world_data: Dict[str, Any],
+        location_ids: List[str],
+        rng: random.Random,
+        item_density: float,
+        npc_density: float,
+    ) -> None:
+        """Scatter copies of the template items and characters over generated locations"""
+        if not location_ids:
+            return
+
+        for number in range(int(len(location_ids) * item_density)):
+            template = rng.choice(self.item_templates)
+            item = copy.deepcopy(template)
+            item["id"] = f"{template['id']}_{number}"
+            item["location"] = rng.choice(location_ids)
+            item.pop("related_quest_id", None)
+            world_data["items"].append(item)
+
+        for number in range(int(len(location_ids) * npc_density)):
+            template = rng.choice(self.character_templates)
+            character = copy.deepcopy(template)
+            character["id"] = f"{template['id']}_{number}"
+            character["location"] = rng.choice(location_ids)
+            character["items"] = []
+            character["quest_ids"] = []
+            world_data["characters"].append(character)
@@ -0,0 +1,87 @@
+"""
+Fixtures and defaults for the pytest-benchmark suite.
+
+Generated worlds are built once per size and session; every benchmark gets
+its own game state so mutations do not leak between benchmarks. Results are
+stored under benchmarks/baselines unless --benchmark-storage is given, and
+comparing against a baseline fails on a median regression above 25% (or
+BENCHMARK_REGRESSION_THRESHOLD, e.g. "mean:10%") unless
+--benchmark-compare-fail is given.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loguru import logger
+
+try:
+    from pytest_benchmark.utils import parse_compare_fail
+except ImportError:
+    # The benchmark modules skip themselves without pytest-benchmark
+    parse_compare_fail = None
+
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_STORAGE = "file://./.benchmarks"
+
+# Small, medium and huge generated worlds, in locations
+WORLD_SIZES = {
+    "small": 50,
+    "medium": 1000,
+    "huge": int(os.getenv("BENCHMARK_HUGE_WORLD", "10000")),
+}
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Runs before pytest-benchmark reads its options
+    if parse_compare_fail is None:
+        return
+    if config.getoption("benchmark_storage", None) == DEFAULT_STORAGE:
+        config.option.benchmark_storage = f"file://{BASELINE_DIR}"
+    if config.getoption("benchmark_compare", None) and not config.getoption("benchmark_compare_fail", None):
+        threshold = os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "median:25%")
+        config.option.benchmark_compare_fail = [parse_compare_fail(threshold)]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logging():
+    # World validation and quest handling log on every call
+    logger.remove()
+
+
+@pytest.fixture(scope="session")
+def world_data_by_size():
+    service = LLMService()
+    return {
+        label: service.generate_procedural_world(seed=size, num_locations=size)
+        for label, size in WORLD_SIZES.items()
+    }
+
+
+@pytest.fixture(params=list(WORLD_SIZES))
+def world_size(request):
+    return request.param
+
+
+@pytest.fixture
+def world_data(world_data_by_size, world_size):
+    return world_data_by_size[world_size]
+
+
+@pytest.fixture
+def engine():
+    return GameEngine()
+
+
+@pytest.fixture
+def game_state(engine, world_data):
+    game_state = engine.init_game_state(world_data, trusted=True)
+    engine.ensure_world_id(game_state)
+    return game_state
@@ -0,0 +1,89 @@
+"""
+Serialization benchmark for JP-MUD.
+
+Measures, for procedural worlds of 100, 1k and 10k locations, the cost of
+encoding a /process-input response and a save file:
+  - the previous response path: ProcessInputResponse validation,
+    jsonable_encoder and json.dumps (what FastAPI does with a response_model)
+  - FastJSONResponse rendering the state dictionary directly
+  - json.dump(indent=2) against dumps(indent=True) for saves
+  - json.loads against loads for reading saves back
+
+Run from jp-mud/backend:
+    python -m benchmarks.serialization [--sizes 100 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+
+from app.api.game import ProcessInputResponse
+from app.services.game_engine import GameEngine
+from app.services.serialization import HAS_ORJSON, FastJSONResponse, dumps, loads
+from app.services.world_generator import ProceduralWorldGenerator
+from benchmarks.world_load import best_of
+
+
+def standard_response(payload):
+    model = ProcessInputResponse(**payload)
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False).encode("utf-8")
+
+
+def fast_response(payload):
+    return FastJSONResponse(payload).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response and save serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove()
+
+    engine = GameEngine()
+    generator = ProceduralWorldGenerator()
+
+    print(f"orjson available: {HAS_ORJSON}")
+    header = f"{'locations':>10} {'KB':>8} {'response std':>13} {'response fast':>14} {'save std':>9} {'save fast':>10} {'load std':>9} {'load fast':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        game_state = engine.init_game_state(generator.generate(seed=size, num_locations=size), trusted=True)
+        engine.process_command("look", game_state)
+        state = game_state.dict()
+        payload = {
+            "response": "You look around.",
+            "game_state": state,
+            "chat_history": [{"role": "user", "content": "look"}, {"role": "assistant", "content": "You look around."}]
+        }
+
+        encoded = fast_response(payload)
+        assert loads(encoded) == loads(standard_response(payload))
+
+        save_data = {"state": state, "chat_history": payload["chat_history"]}
+        saved_std = json.dumps(jsonable_encoder(save_data), indent=2)
+        saved_fast = dumps(save_data, indent=True)
+
+        timings = [
+            best_of(args.repeat, standard_response, payload),
+            best_of(args.repeat, fast_response, payload),
+            best_of(args.repeat, lambda: json.dumps(jsonable_encoder(save_data), indent=2)),
+            best_of(args.repeat, dumps, save_data, indent=True),
+            best_of(args.repeat, json.loads, saved_std),
+            best_of(args.repeat, loads, saved_fast),
+        ]
+        print(f"{size:>10} {len(encoded) // 1024:>8} " + " ".join(
+            f"{t:>{w}.1f}" for t, w in zip(timings, (13, 14, 9, 10, 9, 10))
+        ) + "  (ms)")
+
+
+if __name__ == "__main__":
+    main()
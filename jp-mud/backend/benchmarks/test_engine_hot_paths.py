@@ -0,0 +1,158 @@
+"""
+Benchmarks for the JP-MUD engine hot paths.
+
+Each benchmark runs on small, medium and huge generated worlds (50, 1k and
+10k locations; BENCHMARK_HUGE_WORLD changes the last). Run from jp-mud/backend:
+
+    # Record a baseline
+    python -m pytest benchmarks --benchmark-save=baseline
+
+    # Compare against the latest stored run; fails on a >25% median regression
+    python -m pytest benchmarks --benchmark-compare
+
+    # A different threshold
+    BENCHMARK_REGRESSION_THRESHOLD=mean:10% python -m pytest benchmarks --benchmark-compare
+
+Runs are stored under benchmarks/baselines/<machine id>/, so only compare
+against a baseline recorded on comparable hardware. On shared machines the
+microsecond benchmarks vary by more than the default threshold from run to
+run; record the baseline and the comparison back to back on a quiet machine.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip("pytest_benchmark")
+
+from app.models.game import Direction
+from app.models.quest import QuestState
+from app.services.serialization import dumps, loads
+from app.services.state_loader import load_game_state
+
+# Expensive whole-world operations run a fixed number of rounds
+WHOLE_WORLD_ROUNDS = int(os.getenv("BENCHMARK_WORLD_ROUNDS", "5"))
+
+
+def _round_trip_direction(game_state):
+    """A direction out of the start location and the direction back"""
+    location = game_state.world.locations[game_state.player.current_location]
+    for direction, target in location.connections.items():
+        back = game_state.world.locations[target].connections
+        for return_direction, source in back.items():
+            if source == location.id:
+                return Direction(direction), Direction(return_direction)
+    pytest.skip("start location has no two-way exit")
+
+
+def test_process_command_dispatch(benchmark, engine, game_state):
+    """Parsing and dispatching a cheap command"""
+    response, _ = benchmark(engine.process_command, "inventory", game_state)
+    assert response
+
+
+def test_process_command_unknown(benchmark, engine, game_state):
+    """Falling through every command table"""
+    response, _ = benchmark(engine.process_command, "dance wildly", game_state)
+    assert "don't understand" in response
+
+
+def test_move_player(benchmark, engine, game_state):
+    out, back = _round_trip_direction(game_state)
+    start = game_state.player.current_location
+
+    def there_and_back():
+        engine.move_player(out, game_state)
+        engine.move_player(back, game_state)
+
+    benchmark(there_and_back)
+    assert game_state.player.current_location == start
+
+
+def test_location_description_cached(benchmark, engine, game_state):
+    engine.get_location_description(game_state)
+    assert benchmark(engine.get_location_description, game_state)
+
+
+def test_location_description_uncached(benchmark, engine, game_state):
+    def render():
+        engine.description_cache.clear()
+        return engine.get_location_description(game_state)
+
+    assert benchmark(render)
+
+
+def test_look(benchmark, engine, game_state):
+    response, _ = benchmark(engine.process_command, "look", game_state)
+    assert response
+
+
+def test_take_and_drop(benchmark, engine, game_state):
+    location = game_state.world.locations[game_state.player.current_location]
+    item_id = location.items[0] if location.items else next(iter(game_state.world.items))
+    if item_id not in location.items:
+        location.items.append(item_id)
+    name = game_state.world.items[item_id].name.lower()
+
+    def take_and_drop():
+        engine.process_command(f"take {name}", game_state)
+        engine.process_command(f"drop {name}", game_state)
+
+    benchmark(take_and_drop)
+    assert item_id in game_state.world.locations[location.id].items
+
+
+def test_update_quest_progress(benchmark, engine, game_state):
+    """Scanning every active quest for an action that completes nothing"""
+    for quest in game_state.world.quests.values():
+        quest.state = QuestState.IN_PROGRESS
+        game_state.quest_log.active_quests[quest.id] = quest
+
+    messages, _ = benchmark(
+        engine.quest_handler.update_quest_progress, game_state, "visit_location", "__nowhere__"
+    )
+    assert messages == []
+
+
+def test_validate_world_structure(benchmark, engine, game_state):
+    """Validating an already valid world (the common case on load)"""
+    world = benchmark.pedantic(
+        engine.validate_world_structure, args=(game_state.world,),
+        rounds=WHOLE_WORLD_ROUNDS, iterations=1
+    )
+    assert len(world.locations) == len(game_state.world.locations)
+
+
+def test_init_game_state(benchmark, engine, world_data):
+    game_state = benchmark.pedantic(
+        engine.init_game_state, args=(world_data,), rounds=WHOLE_WORLD_ROUNDS, iterations=1
+    )
+    assert game_state.world.locations
+
+
+def test_init_game_state_trusted(benchmark, engine, world_data):
+    game_state = benchmark.pedantic(
+        engine.init_game_state, args=(world_data,), kwargs={"trusted": True},
+        rounds=WHOLE_WORLD_ROUNDS, iterations=1
+    )
+    assert game_state.world.locations
+
+
+def test_serialize_state(benchmark, game_state):
+    """GameState.dict() plus JSON encoding, as on every /process-input response"""
+    encoded = benchmark.pedantic(
+        lambda: dumps(game_state.dict()), rounds=WHOLE_WORLD_ROUNDS, iterations=1
+    )
+    assert encoded
+
+
+def test_deserialize_state(benchmark, game_state):
+    """JSON decoding plus hydration, as on every request"""
+    encoded = dumps(game_state.dict())
+    restored = benchmark.pedantic(
+        lambda: load_game_state(loads(encoded)), rounds=WHOLE_WORLD_ROUNDS, iterations=1
+    )
+    assert restored.player == game_state.player
@@ -0,0 +1,76 @@
+"""
+World load benchmark for JP-MUD.
+
+Measures, for procedural worlds of 100, 1k and 10k locations:
+  - init_game_state with full validation and with the trusted bulk path
+  - per-request hydration of a GameState.dict() with full validation and
+    with the validation-light state loader
+
+Run from jp-mud/backend:
+    python -m benchmarks.world_load [--sizes 100 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loguru import logger
+
+from app.models.game import GameState
+from app.services.game_engine import GameEngine
+from app.services.state_loader import load_game_state
+from app.services.world_generator import ProceduralWorldGenerator
+
+
+def best_of(repeat, func, *args, **kwargs):
+    """Best wall-clock time in milliseconds over several runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def validated_hydration(data):
+    return GameState(
+        world=data["world"],
+        player=data["player"],
+        visited_locations=set(data.get("visited_locations", [])),
+        flags=data.get("flags", {}),
+        metadata=data.get("metadata", {}),
+        quest_log=data.get("quest_log", {})
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark world construction and hydration")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # World validation logs every fix it makes; keep the output readable
+    logger.remove()
+
+    engine = GameEngine()
+    generator = ProceduralWorldGenerator()
+
+    print(f"{'locations':>10} {'init (ms)':>10} {'init trusted':>13} {'hydrate (ms)':>13} {'hydrate fast':>13}")
+    for size in args.sizes:
+        world_data = generator.generate(num_locations=size, seed=size)
+
+        init_ms = best_of(args.repeat, engine.init_game_state, world_data)
+        trusted_ms = best_of(args.repeat, engine.init_game_state, world_data, trusted=True)
+
+        state_dict = engine.init_game_state(world_data).dict()
+        hydrate_ms = best_of(args.repeat, validated_hydration, state_dict)
+        fast_ms = best_of(args.repeat, load_game_state, state_dict)
+
+        print(f"{size:>10} {init_ms:>10.1f} {trusted_ms:>13.1f} {hydrate_ms:>13.1f} {fast_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chat_history import ChatHistoryPolicy, estimate_tokens
+
+
+def make_history(turns, start=0):
+    history = []
+    for i in range(start, start + turns):
+        history.append({"role": "user", "content": f"command {i}"})
+        history.append({"role": "assistant", "content": f"response {i}"})
+    return history
+
+
+def test_short_history_is_untouched():
+    policy = ChatHistoryPolicy(window_turns=5, summary_chunk_turns=2)
+    history = make_history(6)
+    assert policy.apply(history) is history
+
+
+def test_overflow_is_folded_into_summary():
+    """Once a chunk overflows the window it is replaced by one summary message"""
+    policy = ChatHistoryPolicy(window_turns=5, summary_chunk_turns=2)
+    trimmed = policy.apply(make_history(8))
+
+    assert len(trimmed) == 1 + 10
+    assert trimmed[0]["role"] == "system"
+    assert trimmed[0]["content"] == "[Summary of 6 earlier messages] Player commands: command 0; command 1; command 2"
+    assert trimmed[1] == {"role": "user", "content": "command 3"}
+
+    # A later fold merges into the existing summary instead of adding another
+    trimmed = policy.apply(trimmed + make_history(2, start=8))
+    assert len(trimmed) == 1 + 10
+    assert trimmed[0]["content"].startswith("[Summary of 10 earlier messages] Player commands: command 0;")
+    assert trimmed[0]["content"].endswith("command 4")
+
+
+def test_prompt_context_respects_token_budget():
+    policy = ChatHistoryPolicy(window_turns=50, summary_chunk_turns=2)
+    history = make_history(40)
+
+    context = policy.prompt_context(history, token_budget=30)
+    assert estimate_tokens(context) <= 30
+    assert context.endswith("assistant: response 39")
+    assert "command 0" not in context
@@ -0,0 +1,110 @@
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.game_engine import GameEngine
+from app.services.world_templates import DEFAULT_WORLD
+from app.services.quest_templates import HIDDEN_LOCATIONS
+
+
+@pytest.fixture
+def engine():
+    return GameEngine()
+
+
+@pytest.fixture
+def game_state(engine):
+    world_data = copy.deepcopy(DEFAULT_WORLD)
+    world_data["locations"].extend(copy.deepcopy(HIDDEN_LOCATIONS))
+    return engine.init_game_state(world_data)
+
+
+def test_location_description_is_cached(engine, game_state):
+    """Repeated looks render once and return the identical text"""
+    first = engine.get_location_description(game_state)
+    assert len(engine.description_cache) == 1
+
+    assert engine.get_location_description(game_state) == first
+    assert len(engine.description_cache) == 1
+
+
+def test_location_description_invalidated_by_take_and_drop(engine, game_state):
+    before = engine.get_location_description(game_state)
+    assert "Village Map" in before
+
+    _, game_state = engine.process_command("take map", game_state)
+    assert "Village Map" not in engine.get_location_description(game_state)
+
+    _, game_state = engine.process_command("置く 村の地図", game_state)
+    assert "Village Map" in engine.get_location_description(game_state)
+
+
+def test_location_description_invalidated_when_neighbour_revealed(engine, game_state):
+    """Revealing a hidden location adds it to its neighbours' exit lists"""
+    game_state.player.current_location = "forest"
+    assert "Hidden Forest Path" not in engine.get_location_description(game_state)
+
+    game_state.world.locations["hidden_path"].hidden = False
+    engine.mark_location_changed(game_state, "hidden_path")
+
+    assert "Hidden Forest Path" in engine.get_location_description(game_state)
+
+
+def test_location_description_not_shared_by_diverging_forks(engine, game_state):
+    """Forks of one save that change a location differently render their own text"""
+    fork = game_state.copy(deep=True)
+
+    engine.process_command("take map", game_state)
+    for command in ["east", "take compass", "west", "drop compass"]:
+        engine.process_command(command, fork)
+
+    assert "Village Map" not in engine.get_location_description(game_state)
+    description = engine.get_location_description(fork)
+    assert "Village Map" in description
+    assert "Ancient Compass" in description
+
+
+def test_location_description_invalidated_through_one_way_exit(engine, game_state):
+    """A location that only has an exit into the changed one is bumped too"""
+    forest = game_state.world.locations["forest"]
+    engine.get_route_index(game_state)
+    forest.connections["down"] = "cave"
+    engine.mark_location_changed(game_state, "forest")
+    version = forest.version
+
+    engine.mark_location_changed(game_state, "cave")
+
+    assert "forest" not in game_state.world.locations["cave"].connections.values()
+    assert forest.version != version
+
+
+def test_commands_starting_with_direction_letters_are_not_moves(engine, game_state):
+    """"drop", "use" and "examine" used to be read as down, up and east"""
+    start = game_state.player.current_location
+    engine.process_command("take map", game_state)
+
+    for command in ["examine map", "use map", "speak", "drop map"]:
+        engine.process_command(command, game_state)
+        assert game_state.player.current_location == start, command
+    assert "map" not in game_state.player.inventory
+
+    engine.process_command("n", game_state)
+    assert game_state.player.current_location == "forest"
+
+
+def test_directions_and_actions_match_whole_first_word(engine, game_state):
+    response, _ = engine.process_command("   ", game_state)
+    assert response == "What would you like to do?"
+
+    engine.process_command("northward", game_state)
+    assert game_state.player.current_location == "start"
+
+    response, _ = engine.process_command("見る", game_state)
+    assert "Village Square" in response
+
+    engine.process_command("north", game_state)
+    assert game_state.player.current_location == "forest"
@@ -0,0 +1,79 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.quest import QuestState
+from app.services.game_engine import GameEngine
+from app.services.grammar_matcher import GrammarMatcher, fold_pattern, get_matcher, normalize_answer
+from app.services.llm_service import LLMService
+from app.services.world_templates import DEFAULT_WORLD
+
+
+def test_normalize_folds_width_kana_and_punctuation():
+    assert normalize_answer("ＡＢＣ　ｶﾀｶﾅ。") == "abcかたかな"
+    assert normalize_answer("私は コーヒーを 飲みます!") == normalize_answer("私はこーひーを飲みます")
+
+
+def test_matcher_accepts_variants_and_patterns():
+    exact = GrammarMatcher("私は本を読みます")
+    assert exact.matches("私は本を読みます。")
+    assert exact.matches(" 私は本を読みます ")
+    assert not exact.matches("私が本を読みます")
+
+    pattern = GrammarMatcher("(私|わたし)は.+を読みます", use_pattern=True)
+    assert pattern.matches("わたしは マンガを読みます！")
+    assert pattern.matches("ワタシはまんがを読みます")
+    assert not pattern.matches("わたしがマンガを読みます")
+
+    # An invalid regex falls back to a literal match instead of raising
+    broken = GrammarMatcher("私は(本", use_pattern=True)
+    assert broken.matches("私は(本")
+
+    assert get_matcher("私は本を読みます") is get_matcher("私は本を読みます")
+
+
+def test_pattern_syntax_survives_normalization():
+    """Only literal text is folded; escapes, anchors and lookaheads keep their meaning"""
+    assert fold_pattern("ワタシ[ハが]コーヒー。?を") == "わたし[はが]こーひー。?を"
+    assert fold_pattern("（ｶﾞｯｺｳ）+") == r"\(がっこう\)+"
+
+    not_digit = GrammarMatcher(r"\Dです\Z", use_pattern=True)
+    assert not_digit.matches("本です")
+    assert not not_digit.matches("1です")
+
+    lookahead = GrammarMatcher(r"^(?!だめ).+です", use_pattern=True)
+    assert lookahead.matches("本です")
+    assert not lookahead.matches("だめです")
+
+    assert GrammarMatcher(r"I am \w+", use_pattern=True).matches("I AM Ken")
+
+
+def test_grammar_challenges_use_session_index():
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().add_template_content(DEFAULT_WORLD))
+    quest = game_state.world.quests["quest_particle_practice"]
+    quest.state = QuestState.IN_PROGRESS
+    game_state.quest_log.active_quests[quest.id] = quest
+    engine.quest_handler.mark_quests_changed(game_state)
+
+    response, _ = engine.process_command("grammar", game_state)
+    assert "grammar wa_ga_challenge" in response
+
+    engine.process_command("grammar wa_ga_challenge", game_state)
+    response, _ = engine.process_command("私は　日本語を勉強しています。", game_state)
+    assert "Grammar challenge completed" in response
+
+    response, _ = engine.process_command("grammar", game_state)
+    assert "wa_ga_challenge" not in response
+    assert "grammar wo_challenge" in response
+
+
+def test_pattern_sees_whitespace_and_punctuation():
+    """Patterns that matched the raw answer still match the folded one"""
+    assert GrammarMatcher(r"\w+\s\w+", use_pattern=True).matches("hello world")
+    assert GrammarMatcher(r"^I am\b", use_pattern=True).matches("I am here")
+    assert not GrammarMatcher(r"^I am\b", use_pattern=True).matches("I amble")
+    assert GrammarMatcher(r"[。]$", use_pattern=True).matches("です。")
+    assert not GrammarMatcher(r"[。]$", use_pattern=True).matches("です")
+    assert GrammarMatcher(r"^ｶﾞｯｺｳ\sへ", use_pattern=True).matches("ガッコウ　へ行きます")
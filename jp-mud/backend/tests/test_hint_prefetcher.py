@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.game_engine import GameEngine
+from app.services.hint_prefetcher import HintPrefetcher
+from app.services.llm_service import LLMService
+from app.services.world_templates import DEFAULT_WORLD
+
+
+class FakeModel:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return f"[New Words] for {text}"
+        finally:
+            self.running -= 1
+
+
+def test_prefetched_hint_is_a_cache_hit():
+    model = FakeModel()
+    prefetcher = HintPrefetcher(model, max_concurrency=2, enabled=True)
+
+    async def main():
+        prefetcher.schedule("session", ["north text", "south text", "east text"])
+        # An interactive request for a text being prefetched waits for it instead of calling again
+        hint = await prefetcher.get("north text")
+        await asyncio.gather(*prefetcher.session_tasks["session"].values())
+        return hint
+
+    assert asyncio.run(main()) == "[New Words] for north text"
+    assert sorted(model.calls) == ["east text", "north text", "south text"]
+    assert model.max_running <= 2
+    assert prefetcher.hits == 1 and prefetcher.misses == 0
+
+
+def test_moving_on_cancels_pending_prefetches():
+    model = FakeModel(delay=0.05)
+    prefetcher = HintPrefetcher(model, max_concurrency=1, enabled=True)
+
+    async def main():
+        prefetcher.schedule("session", ["a", "b", "c"])
+        await asyncio.sleep(0.01)
+        prefetcher.schedule("session", ["d"])
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    # "a" had started when the player moved on; "b" and "c" never ran
+    assert model.calls == ["a", "d"]
+    assert "b" not in prefetcher.cache and "d" in prefetcher.cache
+
+
+def test_predicted_move_responses_match_actual_moves():
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().add_template_content(DEFAULT_WORLD))
+    predicted = engine.predicted_move_responses(game_state)
+
+    direction = next(
+        d for d, target in game_state.world.locations["start"].connections.items()
+        if not game_state.world.locations[target].hidden
+    )
+    response, _ = engine.move_player(direction, game_state)
+    assert response.split("\n\n")[0] in predicted
+
+
+def test_empty_hints_are_not_cached():
+    replies = ["", "[New Words] later"]
+
+    async def flaky_model(text):
+        return replies.pop(0)
+
+    prefetcher = HintPrefetcher(flaky_model, enabled=True)
+
+    async def main():
+        return await prefetcher.get("text"), await prefetcher.get("text")
+
+    assert asyncio.run(main()) == ("", "[New Words] later")
+    assert prefetcher.cache["text"] == "[New Words] later"
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_scheduler import LLMScheduler, LoadShedError, Priority
+from app.services.llm_service import LLMService
+
+
+def make_scheduler(max_concurrency=1):
+    limits = {
+        Priority.INTERACTIVE: (1, 0),
+        Priority.VALIDATION: (1, 0),
+        Priority.HINTS: (1, 0),
+        Priority.BACKGROUND: (1, 2),
+    }
+    return LLMScheduler(max_concurrency=max_concurrency, limits=limits)
+
+
+def test_interactive_jobs_jump_the_queue():
+    scheduler = make_scheduler()
+    order = []
+
+    async def job(name, priority):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.ensure_future(job("background-1", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        await asyncio.gather(
+            first,
+            job("background-2", Priority.BACKGROUND),
+            job("hints", Priority.HINTS),
+            job("interactive", Priority.INTERACTIVE),
+        )
+
+    asyncio.run(main())
+    assert order == ["background-1", "interactive", "hints", "background-2"]
+    metrics = scheduler.metrics()
+    assert metrics["interactive"]["completed"] == 1
+    assert metrics["background"]["max_wait_ms"] > metrics["interactive"]["max_wait_ms"]
+
+
+def test_class_cap_leaves_room_for_interactive_work():
+    scheduler = make_scheduler(max_concurrency=2)
+    started = []
+
+    async def job(name, priority, delay=0.02):
+        async with scheduler.slot(priority):
+            started.append(name)
+            await asyncio.sleep(delay)
+
+    async def main():
+        background = [asyncio.ensure_future(job(f"bg{i}", Priority.BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0.005)
+        # Background is capped at one slot, so the interactive job starts immediately
+        assert started == ["bg0"]
+        await job("interactive", Priority.INTERACTIVE, delay=0)
+        assert started == ["bg0", "interactive"]
+        await asyncio.gather(*background)
+
+    asyncio.run(main())
+
+
+def test_low_priority_work_is_shed_when_queue_is_full():
+    scheduler = make_scheduler()
+
+    async def job(priority):
+        async with scheduler.slot(priority):
+            await asyncio.sleep(0.02)
+
+    async def main():
+        results = await asyncio.gather(*[job(Priority.BACKGROUND) for _ in range(5)], return_exceptions=True)
+        return [type(result) for result in results]
+
+    results = asyncio.run(main())
+    # One runs, two wait, the rest are shed
+    assert results.count(LoadShedError) == 2
+    assert scheduler.metrics()["background"]["shed"] == 2
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    scheduler = make_scheduler()
+
+    async def main():
+        async def hold():
+            async with scheduler.slot(Priority.INTERACTIVE):
+                await asyncio.sleep(0.02)
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await holder
+        async with scheduler.slot(Priority.INTERACTIVE):
+            pass
+
+    asyncio.run(main())
+    assert scheduler.running[Priority.INTERACTIVE] == 0
+
+
+def test_shed_world_generation_falls_back_to_procedural_world():
+    service = LLMService()
+    service.scheduler = make_scheduler()
+
+    async def main():
+        # Fill the background queue so the next world generation is shed
+        service.scheduler.queues[Priority.BACKGROUND].append(asyncio.get_running_loop().create_future())
+        service.scheduler.shed_thresholds[Priority.BACKGROUND] = 1
+        return await service.generate_world("a quiet mountain village")
+
+    world_data = asyncio.run(main())
+    assert any(location["id"].startswith("loc_") for location in world_data["locations"])
@@ -0,0 +1,141 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+from app.services.region_store import RegionStore, WorldExpiredError
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = GameEngine()
+    engine.region_store = RegionStore(root=str(tmp_path), region_size=20)
+    engine.max_resident_locations = 100
+    return engine
+
+
+@pytest.fixture
+def sharded_state(engine):
+    world_data = LLMService().generate_procedural_world(seed=4, num_locations=1000)
+    game_state = engine.init_game_state(world_data)
+    engine.shard_world(game_state)
+    return game_state
+
+
+def test_shard_keeps_only_player_surroundings(engine, sharded_state):
+    world = sharded_state.world
+    assert len(world.locations) < 100
+    assert "start" in world.locations
+    # Every exit from the start is resident
+    for target_id in world.locations["start"].connections.values():
+        assert target_id in world.locations
+    # Items travel with their region
+    for location in world.locations.values():
+        for item_id in location.items:
+            assert item_id in world.items
+
+
+def test_walking_pages_regions_in_and_out(engine, sharded_state):
+    """A long walk stays within the resident budget and every exit stays resident"""
+    world = sharded_state.world
+    visited = set()
+    for _ in range(300):
+        current = world.locations[sharded_state.player.current_location]
+        options = [d for d, target in current.connections.items() if not world.locations[target].hidden]
+        unvisited = [d for d in options if current.connections[d] not in visited]
+        direction = (unvisited or options)[0]
+        engine.move_player(direction, sharded_state)
+        visited.add(sharded_state.player.current_location)
+
+        current = world.locations[sharded_state.player.current_location]
+        assert all(target in world.locations for target in current.connections.values())
+        assert len(world.locations) <= engine.max_resident_locations + engine.region_store.region_size * 4
+
+    assert len(visited) > 50
+
+
+def test_evicted_changes_come_back_from_overlay(engine, sharded_state):
+    world = sharded_state.world
+    start = world.locations["start"]
+    item_id = start.items[0]
+    engine.process_command(f"take {world.items[item_id].name}", sharded_state)
+    assert item_id in sharded_state.player.inventory
+
+    start_region = engine._region_of(sharded_state, "start")
+    sharded_state.player.current_location = "loc_999"  # anywhere far away
+    engine.evict_region(sharded_state, start_region)
+    assert "start" not in world.locations
+    assert item_id in world.items  # still held by the player
+
+    location = engine.ensure_valid_location("start", sharded_state)
+    assert item_id not in location.items
+    assert location.name == "Village Square"  # the real location, not a fallback
+
+
+def test_same_world_reuses_stored_regions(engine, sharded_state):
+    world_data = LLMService().generate_procedural_world(seed=4, num_locations=1000)
+    other = engine.init_game_state(world_data)
+    engine.shard_world(other)
+
+    assert other.metadata["world_id"] != sharded_state.metadata["world_id"]
+    assert other.metadata["region_world"] == sharded_state.metadata["region_world"]
+    assert os.listdir(engine.region_store.root) == [other.metadata["region_world"]]
+
+
+def test_unused_worlds_and_overlays_are_collected(engine, sharded_state):
+    store = engine.region_store
+    world_key = sharded_state.metadata["region_world"]
+    start_region = engine._region_of(sharded_state, "start")
+    sharded_state.player.current_location = "loc_999"
+    engine.evict_region(sharded_state, start_region)
+    session_dir = os.path.join(store.root, world_key, "sessions", sharded_state.metadata["world_id"])
+    assert os.path.isdir(session_dir)
+    older = sharded_state.copy(deep=True)
+
+    assert store.collect_garbage() == 0
+    old = os.path.getmtime(session_dir) - 2 * store.max_age
+    os.utime(session_dir, (old, old))
+    assert store.collect_garbage() == 1
+    assert not os.path.exists(session_dir)
+    assert os.path.isdir(os.path.join(store.root, world_key))
+    # The state's evicted changes are gone with its overlays, so it cannot go on
+    with pytest.raises(WorldExpiredError):
+        engine.ensure_valid_location("start", older)
+
+    world_dir = os.path.join(store.root, world_key)
+    os.utime(world_dir, (old, old))
+    assert store.collect_garbage() == 1
+    assert not os.path.exists(world_dir)
+    # A state still pointing at the collected world fails instead of inventing locations
+    with pytest.raises(WorldExpiredError):
+        engine.ensure_valid_location("loc_500", sharded_state)
+
+
+def test_evicting_a_region_changes_the_graph_version(engine, sharded_state):
+    version = sharded_state.metadata["graph_version"]
+    sharded_state.player.current_location = "loc_999"
+    engine.evict_region(sharded_state, engine._region_of(sharded_state, "start"))
+    assert sharded_state.metadata["graph_version"] > version
+
+
+def test_states_only_read_the_overlays_they_wrote(engine, sharded_state):
+    """An older save of the session does not see regions evicted by later requests"""
+    world = sharded_state.world
+    item_id = world.locations["start"].items[0]
+    start_region = engine._region_of(sharded_state, "start")
+    sharded_state.player.current_location = "loc_999"
+    engine.evict_region(sharded_state, start_region)
+    saved = sharded_state.copy(deep=True)
+
+    sharded_state.player.current_location = "start"
+    engine.ensure_valid_location("start", sharded_state)
+    engine.process_command(f"take {world.items[item_id].name}", sharded_state)
+    sharded_state.player.current_location = "loc_999"
+    engine.evict_region(sharded_state, start_region)
+
+    assert item_id in engine.ensure_valid_location("start", saved).items
+    assert item_id not in engine.ensure_valid_location("start", sharded_state).items
@@ -0,0 +1,94 @@
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.game_engine import GameEngine
+from app.services.world_templates import DEFAULT_WORLD
+from app.services.quest_templates import HIDDEN_LOCATIONS
+
+
+@pytest.fixture
+def engine():
+    return GameEngine()
+
+
+@pytest.fixture
+def game_state(engine):
+    """Default world plus the hidden quest locations"""
+    world_data = copy.deepcopy(DEFAULT_WORLD)
+    world_data["locations"].extend(copy.deepcopy(HIDDEN_LOCATIONS))
+    return engine.init_game_state(world_data)
+
+
+def test_find_route_shortest_path(engine, game_state):
+    """Routes follow the fewest moves and never pass through hidden locations"""
+    route_index = engine.get_route_index(game_state)
+
+    assert route_index.find_route("start", "start") == []
+    assert route_index.find_route("start", "mountain") == [("south", "river"), ("south", "mountain")]
+    assert route_index.find_route("shrine", "mountain") == [
+        ("west", "forest"), ("south", "start"), ("south", "river"), ("south", "mountain")
+    ]
+    assert route_index.find_route("start", "cave") is None
+
+
+def test_route_index_updates_when_location_unhidden(engine, game_state):
+    """Revealing a location reroutes through it without rebuilding the index"""
+    route_index = engine.get_route_index(game_state)
+    assert len(route_index.find_route("forest", "mountain")) == 3
+
+    game_state.world.locations["hidden_path"].hidden = False
+    engine.mark_location_changed(game_state, "hidden_path")
+
+    assert engine.get_route_index(game_state) is route_index
+    assert route_index.find_route("forest", "mountain") == [("north", "hidden_path"), ("north", "mountain")]
+
+
+def test_travel_command_moves_along_route(engine, game_state):
+    """'go to <place>' walks every step and marks intermediate locations visited"""
+    response, game_state = engine.process_command("go to misty mountain", game_state)
+
+    assert game_state.player.current_location == "mountain"
+    assert {"river", "mountain"} <= game_state.visited_locations
+    assert "You travel south to Flowing River, then south to Misty Mountain." in response
+
+
+def test_travel_command_japanese_and_unknown_place(engine, game_state):
+    response, game_state = engine.process_command("竹林に行く", game_state)
+    assert game_state.player.current_location == "forest"
+
+    response, game_state = engine.process_command("go to atlantis", game_state)
+    assert game_state.player.current_location == "forest"
+    assert "don't know how to get to" in response
+
+
+def test_diverging_forks_do_not_share_route_index(engine, game_state):
+    """Two saves of one game that change the graph differently never share an index"""
+    engine.get_route_index(game_state)
+    fork = game_state.copy(deep=True)
+
+    game_state.world.locations["hidden_path"].hidden = False
+    engine.mark_location_changed(game_state, "hidden_path")
+    fork.world.locations["forest"].connections.pop("north", None)
+    engine.mark_location_changed(fork, "forest")
+
+    assert game_state.metadata["graph_version"] == fork.metadata["graph_version"]
+    assert engine.get_route_index(game_state) is not engine.get_route_index(fork)
+    assert len(engine.get_route_index(game_state).find_route("forest", "mountain")) == 2
+    assert len(engine.get_route_index(fork).find_route("forest", "mountain")) == 3
+
+
+def test_inbound_exits_follow_updates(engine, game_state):
+    route_index = engine.get_route_index(game_state)
+    assert route_index.sources_of("hidden_path") == {"forest", "mountain"}
+
+    mountain = game_state.world.locations["mountain"]
+    del mountain.connections["south"]
+    engine.mark_location_changed(game_state, "mountain")
+
+    assert engine.get_route_index(game_state) is route_index
+    assert route_index.sources_of("hidden_path") == {"forest"}
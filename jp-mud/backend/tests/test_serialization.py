@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.game import ItemType
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+from app.services.serialization import FastJSONResponse, dump_file, dumps, load_file, loads
+from app.services.state_loader import load_game_state
+
+
+def test_game_state_round_trips_through_fast_serializer():
+    """Sets come out as sorted lists, enums as values, and the state hydrates back unchanged"""
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().generate_procedural_world(seed=4, num_locations=40))
+    engine.process_command("look", game_state)
+    game_state.visited_locations.update(list(game_state.world.locations)[:5])
+    state = game_state.dict()
+
+    decoded = loads(dumps(state))
+    assert decoded["visited_locations"] == sorted(game_state.visited_locations)
+    assert decoded["world"]["items"]["offering"]["item_type"] == ItemType.QUEST.value
+    assert decoded == json.loads(json.dumps(state, default=lambda o: sorted(o) if isinstance(o, set) else o.value))
+    assert load_game_state(decoded) == game_state
+
+    body = FastJSONResponse({"game_state": state}).body
+    assert loads(body)["game_state"] == decoded
+
+
+def test_save_file_round_trip(tmp_path):
+    save_data = {"state": {"visited_locations": {"b", "a"}, "name": "村の広場"}, "chat_history": []}
+    path = str(tmp_path / "save.json")
+    dump_file(save_data, path)
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert "村の広場" in text and "\n" in text
+    assert load_file(path) == {"state": {"visited_locations": ["a", "b"], "name": "村の広場"}, "chat_history": []}
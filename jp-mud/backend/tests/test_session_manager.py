@@ -0,0 +1,49 @@
+import asyncio
+import copy
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_service import LLMService
+from app.services.session_manager import SessionManager, StaleStateError
+from app.services.world_templates import DEFAULT_WORLD
+
+
+def test_session_lock_serializes_commands():
+    """Commands for one session never interleave across awaits"""
+    sessions = SessionManager()
+    events = []
+
+    async def command(name):
+        async with sessions.lock("world-1"):
+            events.append(f"{name}-start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name}-end")
+
+    async def main():
+        await asyncio.gather(command("a"), command("b"))
+
+    asyncio.run(main())
+
+    assert events == ["a-start", "a-end", "b-start", "b-end"]
+    # Locks are released once nobody is waiting on them
+    assert sessions._locks == {}
+
+
+def test_stale_state_is_rejected():
+    """Replaying a request built on an already-superseded state raises a conflict"""
+    service = LLMService()
+    game_state = service.game_engine.init_game_state(copy.deepcopy(DEFAULT_WORLD)).dict()
+
+    _, first = asyncio.run(service.process_game_input("inventory", game_state, []))
+    assert first["metadata"]["state_version"] == 1
+
+    # Same base state again, e.g. a second tab that missed the first update
+    with pytest.raises(StaleStateError):
+        asyncio.run(service.process_game_input("inventory", game_state, []))
+
+    _, second = asyncio.run(service.process_game_input("inventory", first, []))
+    assert second["metadata"]["state_version"] == 2
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.session_manager import SessionManager, StaleStateError
+from app.services.shared_store import SharedStore
+
+
+def test_workers_sharing_a_store_cannot_both_commit(tmp_path):
+    """Two workers applying a command to the same state: the second commit is rejected"""
+    path = str(tmp_path / "shared.db")
+    worker_a = SessionManager(store=SharedStore(path))
+    worker_b = SessionManager(store=SharedStore(path))
+
+    async def apply(sessions):
+        async with sessions.lock("world"):
+            await sessions.check_version("world", 3)
+            await sessions.commit_version("world", 4)
+
+    asyncio.run(apply(worker_a))
+    assert asyncio.run(worker_b.current_version("world")) == 4
+
+    # Worker B started from the same version-3 state and lost the race
+    with pytest.raises(StaleStateError):
+        asyncio.run(apply(worker_b))
+    with pytest.raises(StaleStateError):
+        asyncio.run(worker_b.check_version("world", 3))
+
+    asyncio.run(worker_b.forget("world"))
+    asyncio.run(apply(worker_a))
+
+
+def test_llm_cache_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = SharedStore(path)
+    reader = SharedStore(path)
+
+    writer.cache_set("key", "[New Words]\n- 森 (もり)")
+    assert reader.cache_get("key") == "[New Words]\n- 森 (もり)"
+    assert reader.cache_get("missing") is None
+
+    expired = SharedStore(path, cache_ttl=-1)
+    expired.cache_set("old", "stale")
+    assert reader.cache_get("old") is None
+
+    small = SharedStore(path, max_cache_entries=1)
+    small.prune_cache()
+    assert reader.cache_get("key") == "[New Words]\n- 森 (もり)"
+    assert reader.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 1
+
+
+def test_store_calls_do_not_block_the_event_loop(tmp_path):
+    """A commit waiting on another worker's write lock lets other requests run"""
+    path = str(tmp_path / "shared.db")
+    sessions = SessionManager(store=SharedStore(path))
+    other_worker = SharedStore(path).connection
+    other_worker.execute("BEGIN IMMEDIATE")
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        commit = asyncio.ensure_future(sessions.commit_version("world", 1))
+        await ticker()
+        # Blocking sqlite calls would have stalled the ticker until the busy timeout
+        assert not commit.done()
+        other_worker.execute("COMMIT")
+        await commit
+
+    asyncio.run(main())
+    assert len(ticks) == 5
+    assert asyncio.run(sessions.current_version("world")) == 1
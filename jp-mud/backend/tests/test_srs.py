@@ -0,0 +1,110 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.game import LearnedVocabulary
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+from app.services.srs import DAY, ReviewQueue, SRSScheduler, parse_time, sm2_review
+
+
+def test_sm2_intervals_and_lapse():
+    entry = LearnedVocabulary(vocabulary_id="vocab_0")
+    now = 1_700_000_000.0
+
+    intervals = []
+    for _ in range(4):
+        due = sm2_review(entry, 5, now)
+        intervals.append(entry.interval_days)
+        now = due
+    assert intervals[:2] == [1.0, 6.0]
+    assert intervals[2] > 6.0 and intervals[3] > intervals[2]
+    assert entry.mastery_level == 5 and entry.review_count == 4
+
+    ease = entry.ease_factor
+    due = sm2_review(entry, 1, now)
+    assert entry.repetitions == 0 and entry.interval_days == 1.0
+    assert entry.ease_factor < ease
+    assert abs(due - (now + DAY)) < 1e-3
+    assert parse_time(entry.next_review_time) == due
+
+
+def test_review_queue_returns_due_words_in_order():
+    queue = ReviewQueue()
+    for number in range(1000):
+        queue.schedule(f"vocab_{number}", float(number))
+    # Rescheduling supersedes the old entry
+    queue.schedule("vocab_0", 5000.0)
+
+    due = queue.due_items(now=10.0, limit=5)
+    assert [vocab_id for _, vocab_id in due] == ["vocab_1", "vocab_2", "vocab_3", "vocab_4", "vocab_5"]
+    # Fetching a batch leaves it queued
+    assert queue.due_items(now=10.0, limit=5) == due
+    assert len(queue) == 1000
+    assert queue.due_items(now=0.5, limit=5) == []
+
+
+def test_encounters_schedule_and_count_as_exposures():
+    engine = GameEngine()
+    engine.srs = SRSScheduler(learning_step=60)
+    game_state = engine.init_game_state(LLMService().generate_procedural_world(seed=3, num_locations=20))
+    engine.ensure_world_id(game_state)
+    location = game_state.world.locations[game_state.player.current_location]
+    location.vocabulary = [{"japanese": "広場", "english": "square"}, {"japanese": "村", "english": "village"}]
+
+    engine.process_vocabulary(game_state, location.vocabulary, location.id)
+    learned = dict(game_state.player.learned_vocabulary)
+    assert len(learned) == 2
+    assert all(entry.next_review_time for entry in learned.values())
+    assert engine.review_batch(game_state) == []
+
+    # Meeting the words again before they are due changes nothing and adds no duplicates
+    engine.process_vocabulary(game_state, location.vocabulary, location.id)
+    assert len(game_state.player.learned_vocabulary) == 2
+    assert all(entry.review_count == 0 for entry in game_state.player.learned_vocabulary.values())
+
+    later = max(parse_time(entry.next_review_time) for entry in learned.values()) + 1
+    due = engine.srs.due_batch(game_state, now=later)
+    assert {entry.vocabulary_id for entry in due} == set(learned)
+
+    vocab_id = engine.get_vocabulary_id(game_state, "広場")
+    assert engine.srs.record_exposure(game_state, vocab_id, now=later)
+    entry = game_state.player.learned_vocabulary[vocab_id]
+    assert entry.review_count == 1 and entry.interval_days == 1.0
+    assert vocab_id not in {e.vocabulary_id for e in engine.srs.due_batch(game_state, now=later)}
+
+
+def test_cached_queue_not_reused_for_a_different_schedule():
+    """A same-size state with other due times (an older save, another worker) rebuilds the queue"""
+    srs = SRSScheduler(learning_step=60)
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().generate_procedural_world(seed=3, num_locations=20))
+    for number in range(3):
+        srs.introduce(game_state, LearnedVocabulary(vocabulary_id=f"vocab_{number}"), now=1_000.0)
+    saved = game_state.copy(deep=True)
+
+    srs.record_answer(game_state, "vocab_0", 5, now=2_000.0)
+    due = srs.due_batch(game_state, now=2_000.0)
+    assert sorted(entry.vocabulary_id for entry in due) == ["vocab_1", "vocab_2"]
+
+    # The older save has the same words but vocab_0 is still due
+    due = srs.due_batch(saved, now=2_000.0)
+    assert sorted(entry.vocabulary_id for entry in due) == ["vocab_0", "vocab_1", "vocab_2"]
+    assert saved.metadata["srs_digest"] != game_state.metadata["srs_digest"]
+
+
+def test_forks_with_equal_vocabulary_sizes_keep_their_own_ids():
+    """Two forks that each learned a different word must not share a vocabulary index"""
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().generate_procedural_world(seed=3, num_locations=20))
+    engine.ensure_world_id(game_state)
+    fork = game_state.copy(deep=True)
+
+    engine.process_vocabulary(game_state, [{"japanese": "猫", "english": "cat"}], "start")
+    engine.process_vocabulary(fork, [{"japanese": "犬", "english": "dog"}], "start")
+    engine.process_vocabulary(game_state, [{"japanese": "猫", "english": "cat"}], "start")
+
+    assert [entry.japanese for entry in game_state.world.vocabulary.values()].count("猫") == 1
+    assert len(game_state.player.learned_vocabulary) == 1
+    assert game_state.metadata["vocabulary_digest"] != fork.metadata["vocabulary_digest"]
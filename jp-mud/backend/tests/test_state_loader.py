@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models.game import ItemType
+from app.models.quest import QuestState, ObjectiveType
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+from app.services.state_loader import load_game_state
+
+
+def test_trusted_init_matches_validated_init():
+    world_data = LLMService().generate_procedural_world(seed=5, num_locations=200)
+    engine = GameEngine()
+
+    validated = engine.init_game_state(world_data)
+    trusted = engine.init_game_state(world_data, trusted=True)
+
+    assert trusted.world == validated.world
+    assert trusted.world.items["offering"].item_type == ItemType.QUEST
+    objective = trusted.world.quests["quest_village_map"].objectives[0]
+    assert isinstance(objective.type, ObjectiveType)
+
+
+def test_load_game_state_round_trips_client_state():
+    """A state sent back by the client hydrates to the same models, sets and enums"""
+    engine = GameEngine()
+    game_state = engine.init_game_state(LLMService().generate_procedural_world(seed=2, num_locations=50))
+    engine.process_command("look", game_state)
+    game_state.visited_locations.add("start")
+    game_state.player.stats.locations_visited.add("start")
+
+    loaded = load_game_state(game_state.dict())
+
+    assert loaded.world == game_state.world
+    assert loaded.player == game_state.player
+    assert loaded.visited_locations == {"start"}
+    assert isinstance(loaded.player.stats.locations_visited, set)
+    assert loaded.metadata["world_id"] == game_state.metadata["world_id"]
+    quest = loaded.world.quests["quest_village_map"]
+    assert quest.state == QuestState.NOT_STARTED
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.game_engine import GameEngine
+from app.services.llm_service import LLMService
+from app.services.world_generator import ProceduralWorldGenerator, OPPOSITE_DIRECTIONS
+
+
+def test_generation_is_deterministic():
+    generator = ProceduralWorldGenerator()
+    assert generator.generate(500, seed=7) == generator.generate(500, seed=7)
+    assert generator.generate(500, seed=7) != generator.generate(500, seed=8)
+
+
+def test_generated_connections_are_bidirectional_and_connected():
+    world_data = ProceduralWorldGenerator().generate(2000, seed=3, branching=3)
+    locations = {location["id"]: location for location in world_data["locations"]}
+    assert len(locations) == 2000
+
+    for location_id, location in locations.items():
+        for direction, target_id in location["connections"].items():
+            assert locations[target_id]["connections"][OPPOSITE_DIRECTIONS[direction]] == location_id
+
+    # Every location is reachable from the start
+    seen, stack = {"start"}, ["start"]
+    while stack:
+        for target_id in locations[stack.pop()]["connections"].values():
+            if target_id not in seen:
+                seen.add(target_id)
+                stack.append(target_id)
+    assert seen == set(locations)
+
+
+def test_generated_world_loads_into_engine():
+    """Template quests and hidden locations are added and the engine can play it"""
+    service = LLMService()
+    world_data = service.generate_procedural_world(seed=11, num_locations=300)
+    game_state = GameEngine().init_game_state(world_data)
+
+    assert len(game_state.world.locations) == 300 + 2  # plus the hidden quest locations
+    assert "quest_village_map" in game_state.world.quests
+    assert game_state.world.locations["start"].items == ["map"]
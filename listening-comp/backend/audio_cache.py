@@ -0,0 +1,110 @@
+from typing import Optional
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+def segment_key(text: str, model: str, speed: float) -> str:
+    """Stable cache key for a synthesized segment (unlike hash(), the same in every process)
+
+    Keyed on the voice actually synthesized (model and speed), so speakers
+    that map to the same voice share segments.
+    """
+    payload = json.dumps([text.strip(), model, round(float(speed), 3)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _link_or_copy(source_path: str, destination: str):
+    """Hard-link source_path to destination, copying instead across filesystems"""
+    try:
+        os.link(source_path, destination)
+    except OSError:
+        shutil.copyfile(source_path, destination)
+
+class SegmentCache:
+    """Content-addressed, size-bounded cache of synthesized audio segments on disk
+
+    Files are stored as <directory>/<key[:2]>/<key>.wav. A hit refreshes the
+    file's modification time, and when the cache grows past max_bytes the
+    least recently used files are deleted until it is back under 90% of it.
+    Callers get their own hard link (or copy) of a segment, so eviction by
+    another thread can't remove a file while ffmpeg is reading it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        # Absolute, since ffmpeg resolves concat list entries relative to the list file
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path, _ in self._files())
+
+    def _files(self):
+        """(path, mtime) of every cached file"""
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".wav"):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.path.getmtime(path)
+                    except OSError:
+                        continue
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def get(self, key: str, destination: str) -> Optional[str]:
+        """Link the cached segment to destination and return it, or None on a miss"""
+        path = self.path_for(key)
+        # Under the lock, so _evict can't delete the file between the check and the link
+        with self._lock:
+            try:
+                os.utime(path)
+                _link_or_copy(path, destination)
+            except OSError:
+                return None
+        return destination
+
+    def put(self, key: str, source_path: str) -> str:
+        """Add a synthesized file to the cache (source_path stays the caller's) and return its cached path"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Link next to the destination, then rename, so readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        _link_or_copy(source_path, temp_path)
+        with self._lock:
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self._size += os.path.getsize(path) - replaced
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        target = self.max_bytes * 0.9
+        for path, _ in sorted(self._files(), key=lambda item: item[1]):
+            if self._size <= target:
+                break
+            if path == keep:
+                continue
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                continue
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_segment_cache() -> Optional[SegmentCache]:
+    """The process-wide segment cache (TTS_CACHE_DIR, TTS_CACHE_MAX_MB), or None when TTS_CACHE is false"""
+    if os.getenv("TTS_CACHE", "true").lower() != "true":
+        return None
+    directory = os.getenv("TTS_CACHE_DIR", "./tts_cache")
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = SegmentCache(directory, int(float(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024))
+            _caches[directory] = cache
+    return cache
@@ -1,27 +1,59 @@
 import os
 import json
 import re
+import shutil
 import subprocess
 import tempfile
-from typing import Dict, List, Tuple
+import time
+import requests
+from typing import Dict, List, Optional, Tuple
 
 # Import LLM for conversation formatting
 from backend.chat import LocalLLMChat
+from backend.audio_cache import get_segment_cache, segment_key
 
 class JapaneseAudioGenerator:
     def __init__(self):
         """Initialize the audio generator with Docker TTS capabilities"""
         self.llm = LocalLLMChat()
-        self.temp_dir = tempfile.mkdtemp()
+        # Removed when the generator is garbage collected or the process exits
+        self._temp_dir = tempfile.TemporaryDirectory(prefix="jlpt-audio-")
+        self.temp_dir = self._temp_dir.name
+        
+        # Synthesized segments, shared across questions and runs (None if TTS_CACHE=false)
+        self.segment_cache = get_segment_cache()
         
         # We'll use a Docker container for TTS
         self.docker_container = "tts-service"
         self.shared_volume = "/app/data"
         
-        # Check if Docker and the TTS container are available
-        self.tts_available = self._check_tts_available()
+        # Prefer the container's TTS server (tts_server.py), which keeps models loaded;
+        # `docker exec` per segment is the fallback for containers without it
+        self.tts_server_url = os.getenv("TTS_SERVER_URL", "http://localhost:5002").rstrip("/")
+        self.tts_timeout = float(os.getenv("TTS_REQUEST_TIMEOUT", "60"))
+        # Seconds between re-checks while the server is down (it may start or come back later)
+        self.tts_recheck_interval = float(os.getenv("TTS_RECHECK_INTERVAL", "30"))
+        
+        # Check if the TTS server, or Docker and the TTS container, are available
+        self._refresh_tts()
         
-        print(f"TTS {'available' if self.tts_available else 'not available - run the TTS Docker container first'}")
+        print(f"TTS {'available' if self.tts_available else 'not available - run the TTS Docker container first'}"
+              f"{' (server)' if self.tts_server_available else ''}")
+    
+    def _check_tts_server(self) -> bool:
+        """Check if the TTS server answers its health check (503 means it is still loading models)"""
+        try:
+            response = requests.get(f"{self.tts_server_url}/health", timeout=2)
+            return response.status_code in (200, 503)
+        except requests.RequestException:
+            return False
+    
+    def _refresh_tts(self) -> None:
+        """Re-check the TTS server and the container (at startup and after the server fails)"""
+        self._tts_checked_at = time.monotonic()
+        self.tts_server_available = self._check_tts_server()
+        self.docker_exec_available = self._check_tts_available()
+        self.tts_available = self.tts_server_available or self.docker_exec_available
     
     def _check_tts_available(self) -> bool:
         """Check if Docker TTS is available"""
@@ -35,33 +67,40 @@ class JapaneseAudioGenerator:
         except Exception:
             return False
     
-    def generate_audio_for_question(self, question: Dict) -> str:
-        """Generate audio file for a question and return the path"""
+    def generate_audio_for_question(self, question: Dict, output_path: Optional[str] = None) -> str:
+        """Generate audio file for a question and return the path (output_path, if given)"""
         # Extract content based on question type
         practice_type = question.get("practice_type", "Dialogue Practice")
         
         # Parse into speakers and text
         audio_parts = self._parse_question_to_audio_parts(question, practice_type)
         
+        if not self.tts_server_available and time.monotonic() - self._tts_checked_at >= self.tts_recheck_interval:
+            self._refresh_tts()
+        
         if not self.tts_available:
             print("TTS Docker container not available - falling back to text script")
             return self._generate_text_script(audio_parts)
             
-        # Generate audio files for each part
+        # Generate audio files for each part, in a directory of this render's own:
+        # cached segments are linked in, so cache eviction can't pull them from under ffmpeg
+        job_dir = tempfile.mkdtemp(prefix="job-", dir=self.temp_dir)
         audio_files = []
         for speaker, text, gender in audio_parts:
             # Generate audio file for this part
-            audio_path = self._generate_audio_segment(text, gender, speaker)
+            audio_path = self._generate_audio_segment(text, gender, speaker, job_dir)
             if audio_path:
                 audio_files.append(audio_path)
         
         if not audio_files:
+            shutil.rmtree(job_dir, ignore_errors=True)
             return self._generate_text_script(audio_parts)
             
         # Combine audio files with ffmpeg if available
         try:
-            output_path = os.path.join(self.temp_dir, "combined_audio.mp3")
+            output_path = output_path or os.path.join(self.temp_dir, "combined_audio.mp3")
             self._combine_audio_files(audio_files, output_path)
+            shutil.rmtree(job_dir, ignore_errors=True)
             return output_path
         except Exception as e:
             print(f"Error combining audio: {e}")
@@ -136,8 +175,8 @@ class JapaneseAudioGenerator:
                 ("Announcer", question_text, "announcer")
             ]
     
-    def _generate_audio_segment(self, text: str, gender: str, speaker: str) -> str:
-        """Generate audio for a text segment using Docker TTS"""
+    def _generate_audio_segment(self, text: str, gender: str, speaker: str, job_dir: str) -> str:
+        """Generate audio for a text segment in job_dir using the TTS server (or Docker exec without one)"""
         # Add natural context to short text
         original_text = text
         if len(text) < 10:  # Conservative minimum threshold
@@ -153,10 +192,71 @@ class JapaneseAudioGenerator:
             
             print(f"Text was too short, extended from '{original_text}' to '{text}'")
         
-        # Generate a unique filename
-        safe_filename = re.sub(r'[^\w\-_]', '_', speaker) + "_" + str(abs(hash(text)))
-        output_file = os.path.join(self.temp_dir, f"{safe_filename}.wav")
+        # Identical lines (announcer phrases especially) are synthesized once per voice
+        model, speed = self._voice_for(speaker, gender)
+        key = segment_key(text, model, speed)
         
+        # Name the file after the content, so it is the same in every run
+        safe_filename = re.sub(r'[^\w\-_]', '_', speaker) + "_" + key[:16]
+        output_file = os.path.join(job_dir, f"{safe_filename}.wav")
+        if os.path.exists(output_file):
+            # The same line earlier in this question
+            return output_file
+        if self.segment_cache is not None:
+            cached = self.segment_cache.get(key, output_file)
+            if cached:
+                return cached
+        
+        synthesized = None
+        if self.tts_server_available:
+            if self._synthesize_with_server(text, model, speed, output_file):
+                synthesized = output_file
+            else:
+                # The server may have gone down since it was checked; fall back to docker exec
+                self._refresh_tts()
+        if synthesized is None and self.docker_exec_available:
+            synthesized = self._synthesize_with_docker_exec(text, model, speed, safe_filename, output_file)
+        
+        if synthesized and self.segment_cache is not None:
+            self.segment_cache.put(key, synthesized)
+        return synthesized
+    
+    def _voice_for(self, speaker: str, gender: str) -> Tuple[str, float]:
+        """Select model and speed based on speaker and gender - using only kokoro model with different parameters"""
+        model = "tts_models/ja/kokoro/tacotron2-DDC"
+        if speaker.lower() == "announcer":
+            # Distinct announcer voice - slower, more formal
+            return model, 0.85
+        elif gender.lower() == "female":
+            # Female voice - slightly higher speed for female voice effect
+            return model, 1.1
+        elif gender.lower() == "male":
+            # Male voice - slightly lower speed for male voice effect
+            return model, 0.95
+        # Default voice
+        return model, 1.0
+    
+    def _synthesize_with_server(self, text: str, model: str, speed: float, output_file: str) -> bool:
+        """Synthesize a segment with the TTS server, writing the WAV to output_file"""
+        try:
+            response = requests.post(
+                f"{self.tts_server_url}/synthesize",
+                json={"text": text, "model": model, "speed": speed},
+                timeout=self.tts_timeout + 5
+            )
+            if response.status_code != 200:
+                print(f"TTS server error {response.status_code}: {response.text[:200]}")
+                return False
+            with open(output_file, "wb") as f:
+                f.write(response.content)
+            return True
+        except requests.RequestException as e:
+            print(f"TTS server request failed: {e}")
+            return False
+    
+    def _synthesize_with_docker_exec(self, text: str, model: str, speed: float,
+                                     safe_filename: str, output_file: str) -> str:
+        """Synthesize a segment by running patched_tts.py in the container (loads the model every time)"""
         try:
             # Prepare a text file with the content (to handle quotes, special chars)
             escaped_text = text.replace('\\', '\\\\').replace('"', '\\"').replace('$', '\\$')
@@ -171,23 +271,7 @@ class JapaneseAudioGenerator:
             # Create text file in container
             subprocess.run(cmd_create_text, check=True)
             
-            # Select model based on speaker and gender - using only kokoro model with different parameters
-            if speaker.lower() == "announcer":
-                # Distinct announcer voice - slower, more formal
-                model = "tts_models/ja/kokoro/tacotron2-DDC"
-                params = ["--speed", "0.85"]  # Slightly slower
-            elif gender.lower() == "female":
-                # Female voice - slightly higher speed for female voice effect
-                model = "tts_models/ja/kokoro/tacotron2-DDC" 
-                params = ["--speed", "1.1"]  # Slightly faster for female effect
-            elif gender.lower() == "male":
-                # Male voice - slightly lower speed for male voice effect
-                model = "tts_models/ja/kokoro/tacotron2-DDC"
-                params = ["--speed", "0.95"]  # Slightly slower
-            else:
-                # Default voice
-                model = "tts_models/ja/kokoro/tacotron2-DDC"
-                params = []
+            params = ["--speed", str(speed)] if speed != 1.0 else []
             
             # Setup shared directory paths
             shared_dir = os.path.join(os.getcwd(), "../audio_data")
@@ -256,7 +340,8 @@ class JapaneseAudioGenerator:
     def _combine_audio_files(self, audio_files: List[str], output_path: str) -> None:
         """Combine multiple audio files into one using ffmpeg"""
         # Create a file list for ffmpeg
-        list_file = os.path.join(self.temp_dir, "files.txt")
+        # One list per output, so concurrent renders (e.g. the question pool) don't clash
+        list_file = f"{output_path}.files.txt"
         with open(list_file, "w") as f:
             for audio_file in audio_files:
                 f.write(f"file '{audio_file}'\n")
@@ -0,0 +1,74 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from backend.rag import JLPTQuestionStore
+
+PLACES = ["駅", "レストラン", "学校", "図書館", "病院", "郵便局", "デパート", "公園"]
+ITEMS = ["切符", "ラーメン", "本", "薬", "切手", "かばん", "コーヒー", "傘"]
+SECTIONS = ["問題1", "問題2", "問題3"]
+
+def write_synthetic_corpus(directory: str, num_files: int, questions_per_file: int, seed: int = 0) -> int:
+    """Write structured question files that look like the real transcripts"""
+    rng = random.Random(seed)
+    count = 0
+    for n in range(num_files):
+        section = SECTIONS[n % len(SECTIONS)]
+        blocks = []
+        for i in range(questions_per_file):
+            place, item = rng.choice(PLACES), rng.choice(ITEMS)
+            options = "\n".join(f"{k + 1}. {rng.choice(ITEMS)}をください" for k in range(4))
+            blocks.append(
+                f"<question>\nSetup: {place}で男の人と女の人が話しています。\n"
+                f"Dialogue: 女：{item}はどこですか。 男：{place}の前にあります。({n}-{i})\n"
+                f"Question: 男の人は何を買いますか。\nOptions:\n{options}\n</question>"
+            )
+            count += 1
+        Path(directory, f"video{n:05d}_{section}.txt").write_text("\n".join(blocks), encoding="utf-8")
+    return count
+
+def main():
+    """Measure ingestion throughput (questions/sec) on a synthetic corpus"""
+    parser = argparse.ArgumentParser(description="Benchmark JLPTQuestionStore.add_questions")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--questions-per-file", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--embedding-model", default=None,
+                        help="e.g. intfloat/multilingual-e5-small for a quicker run")
+    parser.add_argument("--backend", default=None, choices=["chroma", "numpy", "numpy-int8"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir, tempfile.TemporaryDirectory() as db_dir:
+        total = write_synthetic_corpus(corpus_dir, args.files, args.questions_per_file)
+        store = JLPTQuestionStore(persist_dir=db_dir, embedding_model=args.embedding_model,
+                                  backend=args.backend)
+        # Keep model loading out of the measurement
+        store.backend.embedding_function(["warmup"])
+
+        start = time.perf_counter()
+        parsed = store._parse_files(sorted(Path(corpus_dir).glob("*.txt")), args.workers)
+        parse_time = time.perf_counter() - start
+        parsed_count = sum(len(q or []) for q in parsed)
+        print(f"Parse: {parsed_count} questions in {parse_time:.2f}s ({parsed_count / parse_time:.0f} questions/sec)")
+
+        start = time.perf_counter()
+        store.add_questions(corpus_dir, batch_size=args.batch_size, max_workers=args.workers,
+                            progress=lambda done, count: None)
+        cold = time.perf_counter() - start
+        print(f"Cold ingest: {total} questions in {cold:.2f}s ({total / cold:.1f} questions/sec)")
+
+        start = time.perf_counter()
+        store.add_questions(corpus_dir, batch_size=args.batch_size, max_workers=args.workers,
+                            progress=lambda done, count: None)
+        warm = time.perf_counter() - start
+        print(f"Unchanged re-ingest: {total} questions in {warm:.2f}s ({total / warm:.1f} questions/sec)")
+
+if __name__ == "__main__":
+    main()
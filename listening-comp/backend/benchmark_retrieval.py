@@ -0,0 +1,93 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Set
+
+import numpy as np
+
+from backend.benchmark_ingest import ITEMS, PLACES, write_synthetic_corpus
+from backend.embeddings import get_embedding_function
+from backend.rag import JLPTQuestionStore
+
+def make_queries(count: int, seed: int = 1) -> List[str]:
+    """Practice-style queries about the same places and items as the corpus"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(PLACES)}で{rng.choice(ITEMS)}を買います。" for _ in range(count)]
+
+def exact_neighbours(corpus_dir: str, queries: List[str], k: int, embedding_model: str = None) -> List[Set[str]]:
+    """Ground truth: exact float32 cosine top-k over every question in the corpus"""
+    documents, ids = [], []
+    with tempfile.TemporaryDirectory() as db_dir:
+        # Only used to parse the files; constructing a store does not load the model
+        parser = JLPTQuestionStore(persist_dir=db_dir, embedding_model=embedding_model, backend="numpy")
+        for file_path in sorted(Path(corpus_dir).glob('*.txt')):
+            for i, q in enumerate(parser.process_question_file(str(file_path)) or []):
+                documents.append(q['content'])
+                ids.append(f"{q['metadata']['video_id']}_{q['metadata']['section']}_{i}")
+
+    embed = get_embedding_function(embedding_model)
+    vectors = np.asarray(embed(documents), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query_vectors = np.asarray(embed(queries), dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    scores = query_vectors @ vectors.T
+    return [{ids[i] for i in np.argsort(-row)[:k]} for row in scores]
+
+def measure(backend: str, corpus_dir: str, queries: List[str], truth: List[Set[str]], k: int,
+            embedding_model: str = None):
+    """Ingest the corpus into a fresh store and report recall@k and query latency"""
+    with tempfile.TemporaryDirectory() as db_dir:
+        store = JLPTQuestionStore(persist_dir=db_dir, embedding_model=embedding_model, backend=backend)
+        store.add_questions(corpus_dir, progress=lambda done, total: None)
+        # With the embedding cache on (the default) query vectors are reused, so this mostly times the search
+        store.backend.query(queries[:1], k)
+
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            results = store.backend.query([query], k)[0]
+            latencies.append(time.perf_counter() - start)
+            hits += len(expected & {r['id'] for r in results})
+
+        start = time.perf_counter()
+        store.backend.query(queries, k)
+        batch_time = time.perf_counter() - start
+
+        latencies = np.array(latencies) * 1000
+        print(f"{backend:>11}: recall@{k} {hits / (k * len(queries)):.3f}  "
+              f"p50 {np.percentile(latencies, 50):.2f}ms  p95 {np.percentile(latencies, 95):.2f}ms  "
+              f"batch of {len(queries)} {batch_time * 1000:.1f}ms")
+
+def main():
+    """Compare the vector store backends for recall and latency on a synthetic corpus"""
+    parser = argparse.ArgumentParser(description="Benchmark JLPTQuestionStore retrieval backends")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--questions-per-file", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "numpy-int8", "chroma"],
+                        choices=["chroma", "numpy", "numpy-int8"])
+    parser.add_argument("--embedding-model", default=None,
+                        help="e.g. intfloat/multilingual-e5-small for a quicker run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        total = write_synthetic_corpus(corpus_dir, args.files, args.questions_per_file)
+        queries = make_queries(args.queries)
+        print(f"{total} questions, {len(queries)} queries")
+        truth = exact_neighbours(corpus_dir, queries, args.k, args.embedding_model)
+        for backend in args.backends:
+            try:
+                measure(backend, corpus_dir, queries, truth, args.k, args.embedding_model)
+            except ImportError as e:
+                print(f"{backend:>11}: skipped ({str(e)})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import numpy as np
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+try:
+    from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+    from chromadb.utils import embedding_functions
+except ImportError:
+    # The NumPy vector store (backend/vector_store.py) works without Chroma installed
+    Documents = Embeddings = List
+    EmbeddingFunction = object
+    embedding_functions = None
+
+# multilingual-e5-large is ~2GB; intfloat/multilingual-e5-small is a much lighter alternative
+DEFAULT_MODEL = "intfloat/multilingual-e5-large"
+
+def normalize_text(text: str) -> str:
+    """Fold full-width/half-width variants and whitespace so trivially different texts share a vector"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+class EmbeddingCache:
+    """On-disk cache of embedding vectors keyed by model name + normalized text
+
+    Vectors are stored as float32 blobs in SQLite, with a small in-memory LRU
+    in front for hot texts such as the fixed practice queries.
+    """
+
+    def __init__(self, path: str, memory_size: int = 1024):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                else:
+                    missing.append(key)
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember(key, found[key])
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()]
+            )
+            self._connection.commit()
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+class SharedEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function that loads its SentenceTransformer model on first use
+
+    One instance per model is shared by every question store and Streamlit
+    session in the process (see get_embedding_function), so the model is
+    loaded once rather than once per store. With a cache, documents and
+    queries that were embedded before (in any run) are not embedded again.
+    """
+
+    def __init__(self, model_name: str, device: Optional[str] = None, cache: Optional[EmbeddingCache] = None):
+        self.model_name = model_name
+        self.device = device
+        self.cache = cache
+        self._function = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._function is not None
+
+    def load(self):
+        """Load the model if it has not been loaded yet (thread-safe)"""
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    print(f"Loading embedding model {self.model_name}...")
+                    kwargs = {"model_name": self.model_name}
+                    if self.device:
+                        kwargs["device"] = self.device
+                    if embedding_functions is not None:
+                        self._function = embedding_functions.SentenceTransformerEmbeddingFunction(**kwargs)
+                    else:
+                        from sentence_transformers import SentenceTransformer
+                        model = SentenceTransformer(self.model_name, device=self.device)
+                        self._function = lambda texts: model.encode(list(texts), convert_to_numpy=True)
+                    print(f"Embedding model {self.model_name} loaded")
+        return self._function
+
+    def warmup(self, background: bool = True) -> Optional[threading.Thread]:
+        """Load the model now, or in a background thread so the first query does not wait for it"""
+        if self.loaded:
+            return None
+        if not background:
+            self.load()
+            return None
+        thread = threading.Thread(target=self._warmup, name="embedding-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def _warmup(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Error warming up embedding model: {str(e)}")
+
+    def __call__(self, input: Documents) -> Embeddings:
+        """Embed texts, computing only those not already in the cache (in one batch)"""
+        if self.cache is None:
+            return [np.asarray(vector, dtype=np.float32).tolist() for vector in self.load()(input)]
+        
+        keys = [EmbeddingCache.key(self.model_name, text) for text in input]
+        vectors = self.cache.get_many(keys)
+        
+        missing = {}
+        for key, text in zip(keys, input):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            computed = self.load()(list(missing.values()))
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32).tolist()
+                for key, vector in zip(missing, computed)
+            }
+            self.cache.put_many(new_vectors)
+            vectors.update(new_vectors)
+        
+        return [vectors[key] for key in keys]
+
+_shared_functions = {}
+_shared_lock = threading.Lock()
+
+def get_embedding_function(model_name: Optional[str] = None) -> SharedEmbeddingFunction:
+    """Get the process-wide embedding function for a model (EMBEDDING_MODEL by default)"""
+    model_name = model_name or os.getenv("EMBEDDING_MODEL", DEFAULT_MODEL)
+    with _shared_lock:
+        function = _shared_functions.get(model_name)
+        if function is None:
+            cache = None
+            if os.getenv("EMBEDDING_CACHE", "true").lower() == "true":
+                cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite"))
+            function = SharedEmbeddingFunction(model_name, device=os.getenv("EMBEDDING_DEVICE") or None, cache=cache)
+            _shared_functions[model_name] = function
+    return function
+
+def warmup_embeddings(model_name: Optional[str] = None, background: bool = True) -> Optional[threading.Thread]:
+    """Start loading the shared embedding model, e.g. when the app starts"""
+    if os.getenv("EMBEDDING_WARMUP", "true").lower() != "true":
+        return None
+    return get_embedding_function(model_name).warmup(background)
@@ -3,28 +3,37 @@ import torch
 # Force initialization 
 _ = torch.zeros(1)
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from backend.rag import JLPTQuestionStore
 from backend.chat import LocalLLMChat
+from backend.question_pool import QuestionPool, get_question_pool
 import re
 import random
 import os
+import threading
 
 class InteractivePracticeGenerator:
-    def __init__(self):
-        """Initialize the practice generator with RAG capabilities"""
+    def __init__(self, use_pool: bool = True):
+        """
+        Initialize the practice generator with RAG capabilities
+
+        Unless use_pool is False or QUESTION_POOL is "false", questions are
+        generated ahead of time by a background QuestionPool
+        (QUESTION_POOL_SIZE per practice type), so generate_question usually
+        returns at once. The pool generates with a generator of its own (see
+        generate_pool_questions), not this one. With QUESTION_POOL_AUDIO=true
+        it also prerenders audio.
+        """
         print("Initializing InteractivePracticeGenerator...")
         self.question_store = JLPTQuestionStore()
         
         # Check current collection state
-        count = len(self.question_store.collection.get()["ids"])
+        count = self.question_store.count()
         print(f"Initial collection size: {count} documents")
         
-        # Force reset collection and add questions
+        # Make sure the seed questions are present; the persistent collection
+        # is kept, and questions that are already stored are not re-embedded
         try:
-            # Delete and recreate collection to ensure clean start
-            self._reset_collection()
-            
             # Add hardcoded questions
             success = self._add_hardcoded_questions()
             
@@ -37,7 +46,7 @@ class InteractivePracticeGenerator:
             traceback.print_exc()
         
         # Final verification
-        count = len(self.question_store.collection.get()["ids"])
+        count = self.question_store.count()
         print(f"Final collection size: {count} documents")
         
         self.llm = LocalLLMChat()
@@ -48,29 +57,46 @@ class InteractivePracticeGenerator:
             "Vocabulary Quiz": "問題2",    # Situation questions
             "Listening Exercise": "問題3"  # Action response questions
         }
+        
+        self.pool: Optional[QuestionPool] = None
+        if use_pool and os.getenv("QUESTION_POOL", "true").lower() == "true":
+            self.pool = get_question_pool(generate_pool_questions, list(self.practice_to_section),
+                                          audio_generator_factory=create_audio_generator)
     
     def generate_question(self, practice_type: str) -> Dict:
+        """Get a practice question of the selected type, from the pool when one is ready"""
+        if self.pool is not None:
+            question = self.pool.take(practice_type)
+            if question is not None:
+                return question
+        return self._generate_new_question(practice_type)
+    
+    def _generate_new_question(self, practice_type: str) -> Dict:
         """Generate a practice question based on selected type using RAG"""
+        return next(self._generate_questions(practice_type, 1))
+    
+    def _generate_questions(self, practice_type: str, count: int) -> Iterator[Dict]:
+        """Generate several questions, retrieving distinct examples for all of them in one batch"""
         section_type = self.practice_to_section[practice_type]
         
         # Create context-appropriate query
         query = self._create_query_for_practice_type(practice_type)
         
-        # Retrieve similar questions
-        similar_questions = self.question_store.query_questions(
-            query_text=query,
+        # Retrieve similar questions, distinct ones for each new question
+        example_sets = self.question_store.query_questions_batch(
+            [query] * count,
             section_type=section_type,
             n_results=2
         )
         
-        # Generate new question using retrieved examples
-        new_question = self._generate_with_examples(practice_type, similar_questions)
-        
-        # Add metadata
-        new_question["similar_questions"] = similar_questions
-        new_question["correct_index"] = random.randint(0, 3)  # Randomly select a correct answer
-        
-        return new_question
+        # Yield each question as soon as it's generated, so the pool can serve it
+        for similar_questions in example_sets:
+            new_question = self._generate_with_examples(practice_type, similar_questions)
+            
+            # Add metadata
+            new_question["similar_questions"] = similar_questions
+            new_question["correct_index"] = random.randint(0, 3)  # Randomly select a correct answer
+            yield new_question
     
     def _create_query_for_practice_type(self, practice_type: str) -> str:
         """Create appropriate query based on practice type"""
@@ -317,26 +343,28 @@ class InteractivePracticeGenerator:
         }
     
     def _create_fallback_question(self, practice_type: str) -> Dict:
-        """Create a fallback question if parsing fails"""
+        """Create a fallback question if parsing fails, tagged "fallback" so it is never pooled"""
         if practice_type == "Dialogue Practice":
-            return {
+            question = {
                 "setup": "男の人と女の人がレストランで話しています。",
                 "question": "男の人は何を注文しますか。",
                 "options": ["コーヒー", "紅茶", "ラーメン", "カレー"]
             }
         elif practice_type == "Vocabulary Quiz":
-            return {
+            question = {
                 "setup": "レストランで食事をしています。",
                 "question": "「お会計お願いします」は英語で何ですか。",
                 "options": ["Check, please", "Menu, please", "Water, please", "Thank you"]
             }
         else:  # Listening Exercise
-            return {
+            question = {
                 "setup": "レストランで注文します。",
                 "question": "何と言いますか。",
                 "options": ["メニューをください", "お勘定をお願いします", "水をください", "ありがとうございます"]
             }
-
+        question["fallback"] = True
+        return question
+    
     def _add_fallback_questions(self):
         """Add some minimal fallback questions directly to ChromaDB"""
         print("Adding fallback questions...")
@@ -358,13 +386,12 @@ class InteractivePracticeGenerator:
         ]
         
         try:
-            # Add directly to ChromaDB
-            self.question_store.collection.add(
-                documents=[q['content'] for q in questions],
-                metadatas=[q['metadata'] for q in questions],
-                ids=[f"fallback_{i}" for i in range(len(questions))]
+            # Add to ChromaDB unless already stored
+            added = self.question_store.upsert_questions(
+                questions,
+                [f"fallback_{i}" for i in range(len(questions))]
             )
-            print(f"Added {len(questions)} fallback questions")
+            print(f"Added {added} fallback questions")
             return True
         except Exception as e:
             print(f"Error adding fallback questions: {str(e)}")
@@ -391,38 +418,23 @@ class InteractivePracticeGenerator:
         ]
         
         try:
-            # Add directly to ChromaDB
-            self.question_store.collection.add(
-                documents=[q['content'] for q in hardcoded],
-                metadatas=[q['metadata'] for q in hardcoded],
-                ids=[f"hardcoded_{i}" for i in range(len(hardcoded))]
+            # Add to ChromaDB unless already stored
+            added = self.question_store.upsert_questions(
+                hardcoded,
+                [f"hardcoded_{i}" for i in range(len(hardcoded))]
             )
-            print(f"Added {len(hardcoded)} hardcoded questions")
-            print(f"Collection now has {len(self.question_store.collection.get()['ids'])} documents")
+            print(f"Added {added} hardcoded questions")
+            print(f"Collection now has {self.question_store.count()} documents")
             return True
         except Exception as e:
             print(f"Error adding hardcoded questions: {str(e)}")
             return False
 
     def _reset_collection(self):
-        """Reset the collection to ensure clean state"""
+        """Reset the collection to a clean state (forces every question to be re-embedded)"""
         print("Resetting collection...")
-        collection_name = self.question_store.collection.name
-        
-        # Try to delete the collection
-        try:
-            self.question_store.client.delete_collection(collection_name)
-            print(f"Deleted collection: {collection_name}")
-        except Exception as e:
-            print(f"Error deleting collection (may not exist yet): {str(e)}")
-        
-        # Recreate the collection with the same embedding function
-        embedding_func = self.question_store.collection._embedding_function
-        self.question_store.collection = self.question_store.client.create_collection(
-            name=collection_name,
-            embedding_function=embedding_func
-        )
-        print(f"Recreated collection: {collection_name}")
+        self.question_store.reset()
+        print("Collection reset")
 
     def generate_answer_feedback(self, question: Dict, selected_index: int) -> Dict:
         """Generate detailed feedback for the user's answer"""
@@ -468,3 +480,24 @@ class InteractivePracticeGenerator:
             "correct_option": correct_option,
             "feedback": feedback
         }
+
+_pool_generator: Optional[InteractivePracticeGenerator] = None
+_pool_generator_lock = threading.Lock()
+
+def generate_pool_questions(practice_type: str, count: int) -> Iterator[Dict]:
+    """Generate questions for the shared QuestionPool
+
+    The pool outlives the Streamlit session that created it, so it gets a
+    process-wide generator of its own (created on first use) instead of a
+    session's.
+    """
+    global _pool_generator
+    with _pool_generator_lock:
+        if _pool_generator is None:
+            _pool_generator = InteractivePracticeGenerator(use_pool=False)
+    return _pool_generator._generate_questions(practice_type, count)
+
+def create_audio_generator():
+    """Audio generator for the shared QuestionPool's prerendered audio"""
+    from backend.audio_generator import JapaneseAudioGenerator
+    return JapaneseAudioGenerator()
@@ -0,0 +1,170 @@
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import math
+import re
+import threading
+import numpy as np
+
+from backend.embeddings import normalize_text
+
+# Structural markup shared by every stored question; indexing it only adds noise
+_MARKUP = re.compile(r"</?question>|\b(?:Setup|Dialogue|Situation|Action|Question|Options)\s*:", re.IGNORECASE)
+_SEPARATORS = re.compile(r"[\s、。，．,.!?！？「」『』（）()・:：\-\d]+")
+
+def bigrams(text: str) -> List[str]:
+    """Character bigrams of each run of text (a run of one character is kept as a unigram)
+
+    Japanese has no spaces to split words on, so overlapping character pairs
+    stand in for terms: 切符を買います -> 切符, 符を, を買, 買い, いま, ます.
+    """
+    text = _MARKUP.sub(" ", normalize_text(text)).lower()
+    terms = []
+    for run in _SEPARATORS.split(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+class BigramIndex:
+    """Incremental inverted index over character bigrams with BM25 scoring
+
+    Documents can be added, replaced and removed one at a time. Each document
+    gets an integer slot; postings map a bigram to {slot: term frequency} and
+    are converted to NumPy arrays (cached per bigram until it changes) so a
+    query scores every matching document with a few vectorized operations.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.documents: Dict[str, str] = {}
+        self.metadatas: Dict[str, Dict] = {}
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._terms: Dict[str, Counter] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._total_length = 0
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        """Index documents, replacing any already stored under the same IDs"""
+        with self._lock:
+            for id, document, metadata in zip(ids, documents, metadatas):
+                self._remove(id)
+                slot = self._free.pop() if self._free else self._new_slot()
+                terms = Counter(bigrams(document))
+                for term, count in terms.items():
+                    self.postings.setdefault(term, {})[slot] = count
+                    self._arrays.pop(term, None)
+                self._slots[id] = slot
+                self._ids[slot] = id
+                self.documents[id] = document
+                self.metadatas[id] = metadata or {}
+                self._terms[id] = terms
+                self._lengths[slot] = sum(terms.values())
+                self._total_length += int(self._lengths[slot])
+            self._columns = {}
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            for id in ids:
+                self._remove(id)
+            self._columns = {}
+
+    def clear(self):
+        with self._lock:
+            self.__init__(self.k1, self.b)
+
+    def _new_slot(self) -> int:
+        slot = len(self._ids)
+        self._ids.append(None)
+        if slot >= len(self._lengths):
+            # Grow geometrically so adding documents one at a time stays cheap
+            self._lengths = np.concatenate([self._lengths, np.zeros(max(1024, len(self._lengths)), dtype=np.float32)])
+        return slot
+
+    def _remove(self, id: str):
+        terms = self._terms.pop(id, None)
+        if terms is None:
+            return
+        slot = self._slots.pop(id)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[slot]
+            self._arrays.pop(term, None)
+            if not posting:
+                del self.postings[term]
+        self._total_length -= int(self._lengths[slot])
+        self._lengths[slot] = 0
+        self._ids[slot] = None
+        self._free.append(slot)
+        del self.documents[id]
+        del self.metadatas[id]
+
+    def _posting_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            posting = self.postings.get(term)
+            if not posting:
+                return None
+            arrays = (np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                      np.fromiter(posting.values(), dtype=np.float32, count=len(posting)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def _mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Slots whose metadata equals every value in where"""
+        if not where:
+            return None
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, value in where.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = np.array([self.metadatas[id].get(key) if id is not None else None
+                                   for id in self._ids], dtype=object)
+                self._columns[key] = column
+            mask &= column == value
+        return mask
+
+    def search(self, query: str, n_results: int, where: Optional[Dict] = None) -> List[Tuple[str, float]]:
+        """Top n_results (id, BM25 score) pairs, best first; where is {key: value} equality"""
+        with self._lock:
+            if not self.documents:
+                return []
+            count = len(self.documents)
+            slots = len(self._ids)
+            lengths = self._lengths[:slots]
+            norms = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / count))
+            scores = np.zeros(slots, dtype=np.float32)
+            for term, query_count in Counter(bigrams(query)).items():
+                arrays = self._posting_arrays(term)
+                if arrays is None:
+                    continue
+                term_slots, frequencies = arrays
+                idf = math.log(1 + (count - len(term_slots) + 0.5) / (len(term_slots) + 0.5))
+                scores[term_slots] += query_count * idf * frequencies * (self.k1 + 1) / (frequencies + norms[term_slots])
+            
+            mask = self._mask(where)
+            if mask is not None:
+                scores[~mask] = 0
+            matches = np.flatnonzero(scores > 0)
+            if len(matches) > n_results:
+                matches = matches[np.argpartition(-scores[matches], n_results - 1)[:n_results]]
+            matches = matches[np.argsort(-scores[matches])]
+            return [(self._ids[slot], float(scores[slot])) for slot in matches]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists: each list contributes 1 / (k + rank) to an ID's score"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            fused[id] = fused.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
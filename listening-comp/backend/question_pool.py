@@ -0,0 +1,253 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from collections import deque
+import hashlib
+import json
+import os
+import re
+import threading
+
+def question_fingerprint(question: Dict) -> str:
+    """Stable identity of a generated question (setup, question and options, whitespace-insensitive)"""
+    parts = [question.get("setup", ""), question.get("question", "")] + list(question.get("options", []))
+    text = "\n".join(re.sub(r"\s+", "", str(part)) for part in parts)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class QuestionPool:
+    """Ready-made practice questions per practice type, filled by a background worker
+
+    take() hands out a pooled question immediately, and the worker tops the
+    pool back up to `size` with generate(practice_type, count). The pool is
+    saved to disk after every change so ready questions survive restarts.
+    Questions already in the question history file, already pooled or among
+    the last served_limit served are rejected as duplicates, and so are
+    fallback questions (tagged "fallback") that stand in when generation
+    fails. The pool outlives any one caller, so generate should not be bound
+    to one (e.g. a Streamlit session's object), and audio comes from an
+    audio generator made by audio_generator_factory on first use. When its
+    TTS is available, audio is rendered while the question is pooled.
+    """
+
+    def __init__(self,
+                 generate: Callable[[str, int], Iterable[Dict]],
+                 practice_types: List[str],
+                 path: str = "./question_pool.json",
+                 size: int = 5,
+                 history_path: str = "question_history.json",
+                 audio_generator_factory: Optional[Callable[[], Any]] = None,
+                 audio_dir: str = "./question_pool_audio",
+                 retry_delay: float = 30.0,
+                 served_limit: int = 1000):
+        self.generate = generate
+        self.practice_types = list(practice_types)
+        self.path = path
+        self.size = size
+        self.history_path = history_path
+        self.audio_generator_factory = audio_generator_factory
+        self.audio_generator = None
+        self.audio_dir = audio_dir
+        self.retry_delay = retry_delay
+        self.pools: Dict[str, List[Dict]] = {practice_type: [] for practice_type in self.practice_types}
+        # Served fingerprints, oldest first; older ones are usually in the history file by then
+        self._served_order = deque(maxlen=served_limit)
+        self._served = set()
+        self._history = set()
+        self._history_mtime = None
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            for practice_type, questions in stored.items():
+                if practice_type in self.pools:
+                    self.pools[practice_type] = [
+                        q for q in questions[:self.size]
+                        if not q.get("audio_path") or os.path.exists(q["audio_path"])
+                    ]
+            print(f"Loaded question pool: {', '.join(f'{t} {len(q)}' for t, q in self.pools.items())}")
+        except Exception as e:
+            print(f"Error loading question pool: {str(e)}")
+        self._prune_audio()
+
+    def _prune_audio(self):
+        """Delete prerendered audio that no pooled question refers to (served questions' audio from earlier runs)"""
+        if not os.path.isdir(self.audio_dir):
+            return
+        referenced = {os.path.abspath(q["audio_path"]) for questions in self.pools.values()
+                      for q in questions if q.get("audio_path")}
+        for name in os.listdir(self.audio_dir):
+            path = os.path.abspath(os.path.join(self.audio_dir, name))
+            if path not in referenced:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _save(self):
+        # Write then rename, so a crash mid-write never leaves a truncated pool file
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.pools, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Error saving question pool: {str(e)}")
+
+    def _known(self) -> set:
+        """Fingerprints of questions in the history file (re-read when it changes), pooled or served"""
+        try:
+            mtime = os.path.getmtime(self.history_path)
+        except OSError:
+            mtime = None
+        if mtime != self._history_mtime:
+            self._history_mtime = mtime
+            self._history = set()
+            if mtime is not None:
+                try:
+                    with open(self.history_path, "r", encoding="utf-8") as f:
+                        self._history = {question_fingerprint(q) for q in json.load(f)}
+                except Exception as e:
+                    print(f"Error reading question history: {str(e)}")
+        pooled = {question_fingerprint(q) for questions in self.pools.values() for q in questions}
+        return self._history | pooled | self._served
+
+    def start(self) -> "QuestionPool":
+        """Start the background worker (once)"""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def take(self, practice_type: str) -> Optional[Dict]:
+        """A ready question for practice_type, or None if the pool is empty"""
+        with self._condition:
+            questions = self.pools.get(practice_type)
+            if not questions:
+                self._condition.notify_all()
+                return None
+            question = questions.pop(0)
+            self._remember_served(question_fingerprint(question))
+            self._save()
+            # Wake the worker to replace it
+            self._condition.notify_all()
+        return question
+
+    def _remember_served(self, fingerprint: str):
+        if fingerprint in self._served:
+            return
+        if len(self._served_order) == self._served_order.maxlen:
+            self._served.discard(self._served_order[0])
+        self._served_order.append(fingerprint)
+        self._served.add(fingerprint)
+
+    def available(self, practice_type: str) -> int:
+        with self._condition:
+            return len(self.pools.get(practice_type, []))
+
+    def _next_deficit(self):
+        for practice_type in self.practice_types:
+            missing = self.size - len(self.pools[practice_type])
+            if missing > 0:
+                return practice_type, missing
+        return None, 0
+
+    def _run(self):
+        while True:
+            with self._condition:
+                practice_type, missing = self._next_deficit()
+                while practice_type is None and not self._stopped:
+                    self._condition.wait()
+                    practice_type, missing = self._next_deficit()
+                if self._stopped:
+                    return
+
+            try:
+                added = self._fill(practice_type, missing)
+            except Exception as e:
+                print(f"Error filling question pool for {practice_type}: {str(e)}")
+                added = 0
+            if not added:
+                # Generation failed or only produced duplicates; don't spin on it
+                with self._condition:
+                    self._condition.wait(self.retry_delay)
+
+    def _fill(self, practice_type: str, missing: int) -> int:
+        """Generate up to `missing` new questions for practice_type, returning how many were pooled"""
+        added = 0
+        for question in self.generate(practice_type, missing):
+            if question.get("fallback"):
+                # Generation failed; take() returning None lets the caller generate on demand
+                print(f"Not pooling a fallback {practice_type} question")
+                continue
+            question.setdefault("practice_type", practice_type)
+            fingerprint = question_fingerprint(question)
+            with self._condition:
+                if fingerprint in self._known():
+                    print(f"Skipping duplicate pooled question {fingerprint}")
+                    continue
+            self._render_audio(question, fingerprint)
+            with self._condition:
+                if len(self.pools[practice_type]) >= self.size:
+                    break
+                self.pools[practice_type].append(question)
+                self._save()
+            added += 1
+        print(f"Question pool for {practice_type}: added {added}, now {self.available(practice_type)}")
+        return added
+
+    def _render_audio(self, question: Dict, fingerprint: str):
+        if self.audio_generator_factory is None:
+            return
+        try:
+            if self.audio_generator is None:
+                self.audio_generator = self.audio_generator_factory()
+            if not getattr(self.audio_generator, "tts_available", False):
+                return
+            os.makedirs(self.audio_dir, exist_ok=True)
+            audio_path = self.audio_generator.generate_audio_for_question(
+                question, output_path=os.path.join(self.audio_dir, f"{fingerprint}.mp3")
+            )
+            if audio_path and audio_path.endswith((".mp3", ".wav")):
+                question["audio_path"] = audio_path
+        except Exception as e:
+            print(f"Error prerendering audio for pooled question: {str(e)}")
+
+_pools: Dict[str, QuestionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_question_pool(generate: Callable[[str, int], Iterable[Dict]],
+                      practice_types: List[str],
+                      audio_generator_factory: Optional[Callable[[], Any]] = None) -> QuestionPool:
+    """The process-wide pool for QUESTION_POOL_PATH, created and started on first use
+
+    Streamlit builds a practice generator per browser session; sharing one
+    pool (and one worker) per file keeps sessions from racing on it. Only the
+    first call's arguments are used, so pass module-level functions rather
+    than methods of a session's objects.
+    """
+    path = os.getenv("QUESTION_POOL_PATH", "./question_pool.json")
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            prerender = os.getenv("QUESTION_POOL_AUDIO", "false").lower() == "true"
+            pool = QuestionPool(
+                generate,
+                practice_types,
+                path=path,
+                size=int(os.getenv("QUESTION_POOL_SIZE", "5")),
+                audio_generator_factory=audio_generator_factory if prerender else None,
+                audio_dir=os.getenv("QUESTION_POOL_AUDIO_DIR", "./question_pool_audio")
+            ).start()
+            _pools[path] = pool
+    return pool
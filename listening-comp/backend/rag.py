@@ -1,34 +1,82 @@
-from typing import List, Dict, Optional
-import chromadb
-from chromadb.utils import embedding_functions
+from typing import Callable, List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 import os
+import threading
 from pathlib import Path
+from backend.embeddings import get_embedding_function
+from backend.lexical_index import BigramIndex, reciprocal_rank_fusion
+from backend.vector_store import QuestionBackend, create_backend
+
+def content_hash(content: str, metadata: Dict) -> str:
+    """Hash of a question's text and metadata, used to skip re-embedding unchanged questions"""
+    payload = json.dumps([content, metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 class JLPTQuestionStore:
-    def __init__(self, persist_dir: str = "./chroma_db"):
-        """Initialize ChromaDB with persistence and Japanese embeddings"""
-        self.client = chromadb.PersistentClient(path=persist_dir)
-        
-        # Delete existing collection if it exists
-        try:
-            self.client.delete_collection("jlpt-n5-listening")
-        except:
-            pass  # Collection might not exist yet
+    def __init__(self,
+                 persist_dir: str = "./chroma_db",
+                 embedding_model: Optional[str] = None,
+                 backend: Optional[str] = None,
+                 retrieval_mode: Optional[str] = None):
+        """
+        Initialize the question store with persistence and Japanese embeddings
+
+        The store is kept between runs; add_questions only embeds
+        questions that are new or have changed since they were stored.
+        embedding_model defaults to the EMBEDDING_MODEL environment variable
+        (intfloat/multilingual-e5-large); the model itself is only loaded
+        when something is first embedded or queried.
+        backend (VECTOR_STORE, default "chroma") picks where vectors live:
+        "chroma" for a Chroma collection, or "numpy"/"numpy-int8" for exact
+        search over a memory-mapped matrix, which needs no Chroma install.
+        retrieval_mode (RETRIEVAL_MODE, default "hybrid") is "hybrid" to fuse
+        vector search with a bigram BM25 index, or "vector" for vector only.
+        """
+        # Japanese-capable embedding model, loaded once per process and shared by all stores
+        japanese_embeddings = get_embedding_function(embedding_model)
         
-        # Use Japanese-optimized embedding function
-        japanese_embeddings = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="intfloat/multilingual-e5-large"
+        self.backend: QuestionBackend = create_backend(
+            backend or os.getenv("VECTOR_STORE", "chroma"), persist_dir, japanese_embeddings
         )
+        # The Chroma collection, for callers that need it directly (None for other backends)
+        self.collection = getattr(self.backend, "collection", None)
         
-        self.collection = self.client.get_or_create_collection(
-            name="jlpt-n5-listening",
-            metadata={"description": "JLPT N5 Listening Questions"},
-            embedding_function=japanese_embeddings
-        )
+        self.retrieval_mode = retrieval_mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+        # Built from the stored questions on the first hybrid query, then kept in sync
+        self._lexical: Optional[BigramIndex] = None
+        self._lexical_lock = threading.Lock()
+
+    @property
+    def lexical_index(self) -> BigramIndex:
+        """Bigram BM25 index over the stored questions"""
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    index = BigramIndex()
+                    index.add(*self.backend.all_questions())
+                    self._lexical = index
+        return self._lexical
+
+    def count(self) -> int:
+        """Number of stored questions"""
+        return self.backend.count()
+
+    def reset(self):
+        """Remove every stored question"""
+        self.backend.reset()
+        self.collection = getattr(self.backend, "collection", None)
+        self._lexical = None
 
-    def process_question_file(self, file_path: str) -> List[Dict]:
-        """Process a structured question file into individual questions with metadata"""
+    def delete_questions(self, ids: List[str]):
+        """Remove questions from the store"""
+        self.backend.delete(ids)
+        if self._lexical is not None:
+            self._lexical.remove(ids)
+
+    def process_question_file(self, file_path: str) -> Optional[List[Dict]]:
+        """Process a structured question file into individual questions with metadata (None if it can't be read)"""
         try:
             # Extract metadata from filename (e.g., sY7L5cfCWno_問題1.txt)
             file_name = Path(file_path).stem
@@ -76,25 +124,94 @@ class JLPTQuestionStore:
             return questions
         except Exception as e:
             print(f"Error processing file {file_path}: {str(e)}")
-            return []
+            return None
+
+    def upsert_questions(self,
+                         questions: List[Dict],
+                         ids: List[str],
+                         batch_size: Optional[int] = None,
+                         progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Store questions under the given IDs, embedding only new or changed ones
+
+        Each question's metadata gets a content_hash; questions whose stored
+        hash matches are skipped. Changed questions are embedded and upserted
+        in batches of batch_size (EMBEDDING_BATCH_SIZE, default 256), and
+        progress(done, total) is called after each batch. Returns the number
+        of questions embedded.
+        """
+        if not questions:
+            return 0
+        batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+        
+        hashes = [content_hash(q['content'], q['metadata']) for q in questions]
+        stored = self.backend.get_hashes(ids)
+        
+        changed = [i for i, id in enumerate(ids) if stored.get(id) != hashes[i]]
+        for start in range(0, len(changed), batch_size):
+            batch = changed[start:start + batch_size]
+            batch_ids = [ids[i] for i in batch]
+            documents = [questions[i]['content'] for i in batch]
+            metadatas = [{**questions[i]['metadata'], 'content_hash': hashes[i]} for i in batch]
+            self.backend.upsert(ids=batch_ids, documents=documents, metadatas=metadatas)
+            if self._lexical is not None:
+                self._lexical.add(batch_ids, documents, metadatas)
+            if progress:
+                progress(start + len(batch), len(changed))
+        self.backend.flush()
+        return len(changed)
+
+    def _parse_files(self, file_paths: List[Path], max_workers: Optional[int] = None) -> List[Optional[List[Dict]]]:
+        """Parse question files concurrently, returning each file's questions (None if it failed) in input order"""
+        max_workers = max_workers or int(os.getenv("INGEST_WORKERS", str(min(8, (os.cpu_count() or 1) + 4))))
+        if len(file_paths) <= 1 or max_workers <= 1:
+            return [self.process_question_file(str(path)) for path in file_paths]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda path: self.process_question_file(str(path)), file_paths))
+
+    def add_questions(self,
+                      structured_dir: str = "./structured",
+                      batch_size: Optional[int] = None,
+                      max_workers: Optional[int] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> bool:
+        """
+        Sync structured question files into the store
 
-    def add_questions(self, structured_dir: str = "./structured") -> bool:
-        """Add all structured questions to ChromaDB"""
+        All files are parsed concurrently, then new and edited questions are
+        embedded and upserted in large batches; unchanged ones are skipped, and
+        questions from files (or parts of files) that no longer exist are deleted.
+        A file that fails to parse keeps the questions stored from it before.
+        """
         try:
-            for file_path in Path(structured_dir).glob('*.txt'):
-                questions = self.process_question_file(str(file_path))
-                
-                if not questions:
+            file_paths = sorted(Path(structured_dir).glob('*.txt'))
+            questions = []
+            ids = []
+            failed = []
+            for file_path, file_questions in zip(file_paths, self._parse_files(file_paths, max_workers)):
+                if file_questions is None:
+                    failed.append(file_path)
                     continue
-                
-                # Add to ChromaDB
-                self.collection.add(
-                    documents=[q['content'] for q in questions],
-                    metadatas=[q['metadata'] for q in questions],
-                    ids=[f"{q['metadata']['video_id']}_{q['metadata']['section']}_{i}" 
-                         for i, q in enumerate(questions)]
-                )
-                
+                for i, q in enumerate(file_questions):
+                    q['metadata']['source_file'] = file_path.name
+                    questions.append(q)
+                    ids.append(f"{q['metadata']['video_id']}_{q['metadata']['section']}_{i}")
+            print(f"Parsed {len(questions)} questions from {len(file_paths) - len(failed)} files"
+                  + (f", {len(failed)} failed and were left as stored" if failed else ""))
+            
+            # Only questions ingested from files are candidates for deletion. IDs start
+            # with the file's stem (video_id_section), which is how a failed file's are kept
+            current = set(ids)
+            kept = tuple(f"{path.stem}_" for path in failed)
+            removed = [id for id in self.backend.source_file_ids()
+                       if id not in current and not (kept and id.startswith(kept))]
+            if removed:
+                self.delete_questions(removed)
+            
+            if progress is None:
+                progress = lambda done, total: print(f"Embedded {done}/{total} questions")
+            embedded = self.upsert_questions(questions, ids, batch_size, progress)
+            print(f"Questions synced: {embedded} embedded, "
+                  f"{len(questions) - embedded} unchanged, {len(removed)} removed")
             return True
         except Exception as e:
             print(f"Error adding questions: {str(e)}")
@@ -103,31 +220,101 @@ class JLPTQuestionStore:
     def query_questions(self, 
                        query_text: str, 
                        section_type: Optional[str] = None,
-                       n_results: int = 3) -> List[Dict]:
-        """Query questions with optional filters"""
+                       n_results: int = 3,
+                       question_type: Optional[str] = None,
+                       hybrid: Optional[bool] = None) -> List[Dict]:
+        """
+        Query questions with optional section (問題1-3) and type filters
+
+        In hybrid mode (the default, see retrieval_mode) the top candidates of
+        vector search and of the bigram BM25 index are fused by reciprocal
+        rank, so exact vocabulary and grammar matches surface even when the
+        embedding ranks them lower. Results then carry 'rank_score', the fused
+        score (higher is better), with 'vector_score' (distance) and
+        'lexical_score' alongside, and no 'score'. In vector mode 'score' is
+        the vector distance (lower is better).
+        """
+        return self.query_questions_batch([query_text], section_type, n_results,
+                                          question_type=question_type, hybrid=hybrid)[0]
+
+    def query_questions_batch(self,
+                              queries: List[str],
+                              section_type: Optional[str] = None,
+                              n_results: int = 3,
+                              question_type: Optional[str] = None,
+                              hybrid: Optional[bool] = None,
+                              deduplicate: bool = True) -> List[List[Dict]]:
+        """
+        Run several queries at once, returning each query's results in order
+
+        All queries are embedded in one batch and looked up in one
+        multi-query call. With deduplicate, a question already returned for
+        an earlier query is skipped for later ones (which take their next
+        best match instead), so a practice set draws on distinct examples.
+        """
+        if not queries:
+            return []
         try:
-            where = {"section": section_type} if section_type else None
+            filters = {key: value for key, value in
+                       (("section", section_type), ("type", question_type)) if value}
+            hybrid = self.retrieval_mode == "hybrid" if hybrid is None else hybrid
             
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=n_results,
-                where=where
-            )
+            candidates = max(n_results * 4, 20) if hybrid else n_results
+            if deduplicate:
+                # Room for later queries to skip what earlier ones took
+                candidates += n_results * (len(queries) - 1)
+            candidates = min(candidates, max(self.count(), 1))
+            vector_results = self.backend.query(queries, candidates, self._where(filters))
+            if hybrid:
+                ranked = [self._fuse(results, self.lexical_index.search(query, candidates, filters), candidates)
+                          for query, results in zip(queries, vector_results)]
+            else:
+                ranked = vector_results
             
-            return [{
-                'question': doc,
-                'metadata': meta,
-                'id': id,
-                'score': score
-            } for doc, meta, id, score in zip(
-                results['documents'][0],
-                results['metadatas'][0],
-                results['ids'][0],
-                results['distances'][0]
-            )]
+            if not deduplicate:
+                return [results[:n_results] for results in ranked]
+            seen = set()
+            batches = []
+            for results in ranked:
+                batch = []
+                for result in results:
+                    if result['id'] in seen:
+                        continue
+                    seen.add(result['id'])
+                    batch.append(result)
+                    if len(batch) == n_results:
+                        break
+                batches.append(batch)
+            return batches
         except Exception as e:
             print(f"Error querying questions: {str(e)}")
-            return []
+            return [[] for _ in queries]
+
+    @staticmethod
+    def _where(filters: Dict) -> Optional[Dict]:
+        """Metadata filters in the vector store's where syntax"""
+        if len(filters) > 1:
+            return {"$and": [{key: value} for key, value in filters.items()]}
+        return filters or None
+
+    def _fuse(self, vector_results: List[Dict], lexical_results: List, n_results: int) -> List[Dict]:
+        """Reciprocal rank fusion of vector results and (id, BM25 score) pairs"""
+        by_id = {r['id']: r for r in vector_results}
+        lexical_scores = dict(lexical_results)
+        fused = reciprocal_rank_fusion([[r['id'] for r in vector_results], [id for id, _ in lexical_results]])
+        results = []
+        for id, rank_score in fused[:n_results]:
+            vector_result = by_id.get(id)
+            results.append({
+                'question': vector_result['question'] if vector_result else self.lexical_index.documents[id],
+                'metadata': vector_result['metadata'] if vector_result else self.lexical_index.metadatas[id],
+                'id': id,
+                # Not 'score': that is a distance, and this orders the other way
+                'rank_score': rank_score,
+                'vector_score': vector_result['score'] if vector_result else None,
+                'lexical_score': lexical_scores.get(id)
+            })
+        return results
 
 def main():
     """Test the question store"""
@@ -144,7 +331,10 @@ def main():
         )
         
         for result in results:
-            print(f"\nScore: {result['score']}")
+            if 'rank_score' in result:
+                print(f"\nRank score: {result['rank_score']} (distance: {result['vector_score']})")
+            else:
+                print(f"\nDistance: {result['score']}")
             print(f"Question: {result['question']}")
             print(f"Metadata: {result['metadata']}")
 
@@ -0,0 +1,369 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import numpy as np
+
+COLLECTION_NAME = "jlpt-n5-listening"
+
+class QuestionBackend(ABC):
+    """Storage and nearest-neighbour search behind JLPTQuestionStore
+
+    Questions are stored by ID with their text and metadata (including the
+    content_hash used for incremental ingestion). query() takes a batch of
+    query texts and returns, per query, up to n_results matches as
+    {'question', 'metadata', 'id', 'score'} dicts, lowest score first.
+    where filters use Chroma's syntax: {"key": value}, {"key": {"$ne": value}}
+    and {"$and": [filter, ...]}.
+    """
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_hashes(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        """Stored content_hash for each of the given IDs that exists"""
+
+    @abstractmethod
+    def source_file_ids(self) -> List[str]:
+        """IDs of questions that were ingested from structured files"""
+
+    @abstractmethod
+    def all_questions(self) -> Tuple[List[str], List[str], List[Dict]]:
+        """Every stored question as (ids, documents, metadatas)"""
+
+    @abstractmethod
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def query(self, query_texts: List[str], n_results: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        ...
+
+    def flush(self):
+        """Persist pending writes (a no-op for stores that write through)"""
+
+    @abstractmethod
+    def reset(self):
+        """Remove every stored question"""
+
+class ChromaQuestionBackend(QuestionBackend):
+    """Questions in a persistent Chroma collection (HNSW index)"""
+
+    def __init__(self, persist_dir: str, embedding_function):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=persist_dir)
+        self.embedding_function = embedding_function
+        self.collection = self._open_collection()
+
+        # Vectors from a different model can't be compared with ours; start over once
+        stored_model = (self.collection.metadata or {}).get("embedding_model")
+        if stored_model and stored_model != embedding_function.model_name:
+            print(f"Collection was embedded with {stored_model}, re-creating it for {embedding_function.model_name}")
+            self.reset()
+
+    def _open_collection(self):
+        return self.client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            metadata={"description": "JLPT N5 Listening Questions",
+                      "embedding_model": self.embedding_function.model_name},
+            embedding_function=self.embedding_function
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_hashes(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        hashes = {}
+        # Large id lists are looked up in chunks to keep each query small
+        for start in range(0, len(ids), 5000):
+            existing = self.collection.get(ids=ids[start:start + 5000], include=["metadatas"])
+            for id, meta in zip(existing['ids'], existing['metadatas']):
+                hashes[id] = (meta or {}).get('content_hash')
+        return hashes
+
+    def source_file_ids(self) -> List[str]:
+        return self.collection.get(where={"source_file": {"$ne": ""}}, include=[])['ids']
+
+    def all_questions(self) -> Tuple[List[str], List[str], List[Dict]]:
+        stored = self.collection.get(include=["documents", "metadatas"])
+        return stored['ids'], stored['documents'], stored['metadatas']
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        self.collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_texts: List[str], n_results: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        results = self.collection.query(query_texts=query_texts, n_results=n_results, where=where)
+        return [[{
+            'question': doc,
+            'metadata': meta,
+            'id': id,
+            'score': score
+        } for doc, meta, id, score in zip(docs, metas, ids, distances)]
+            for docs, metas, ids, distances in zip(
+                results['documents'], results['metadatas'], results['ids'], results['distances'])]
+
+    def reset(self):
+        try:
+            self.client.delete_collection(COLLECTION_NAME)
+        except Exception as e:
+            print(f"Error deleting collection (may not exist yet): {str(e)}")
+        self.collection = self._open_collection()
+
+class NumpyQuestionBackend(QuestionBackend):
+    """Exact (brute-force) search over a matrix of normalized embeddings
+
+    Vectors live in a .npy file that is memory-mapped on load, next to a JSON
+    file of ids, documents and metadata. A batch of queries is one matrix
+    product against every stored question, so results are exact and, for
+    tens of thousands of questions, faster than an HNSW round-trip. With
+    quantize="int8" vectors are stored as int8 (4x smaller on disk and in
+    memory) and dequantized block by block while scoring.
+    Scores are cosine distances (1 - cosine similarity).
+    """
+
+    BLOCK_ROWS = 8192
+
+    def __init__(self, persist_dir: str, embedding_function, quantize: Optional[str] = None):
+        self.directory = os.path.join(persist_dir, "numpy_store")
+        self.embedding_function = embedding_function
+        self.quantize = quantize
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self._rows: Dict[str, int] = {}
+        self._pending: List[np.ndarray] = []
+        self._columns: Dict[str, np.ndarray] = {}
+        self._dirty = False
+        self._load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors_int8.npy" if self.quantize == "int8" else "vectors.npy")
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "questions.json")
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("embedding_model") != self.embedding_function.model_name:
+            print(f"Vector store was embedded with {index.get('embedding_model')}, starting over")
+            return
+        if not index["ids"]:
+            # An empty store has no vectors file; its dimension comes from the first upsert
+            return
+        if not os.path.exists(self._vectors_path):
+            print("Vector store is missing its vectors file, starting over")
+            return
+        vectors = np.load(self._vectors_path, mmap_mode="r")
+        if vectors.ndim != 2 or len(vectors) != len(index["ids"]):
+            print(f"Vector store has {len(vectors)} vectors for {len(index['ids'])} questions, starting over")
+            return
+        self.ids = index["ids"]
+        self.documents = index["documents"]
+        self.metadatas = index["metadatas"]
+        self.vectors = vectors
+        self._rows = {id: row for row, id in enumerate(self.ids)}
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Normalize embeddings (and quantize them if configured)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        if self.quantize == "int8":
+            return np.clip(np.rint(vectors * 127), -127, 127).astype(np.int8)
+        return vectors
+
+    def _matrix(self) -> Optional[np.ndarray]:
+        """All stored vectors, with appended batches merged in"""
+        if self._pending:
+            parts = ([self.vectors] if self.vectors is not None else []) + self._pending
+            self.vectors = np.concatenate(parts)
+            self._pending = []
+        return self.vectors
+
+    def _writable(self) -> np.ndarray:
+        matrix = self._matrix()
+        if matrix is not None and not matrix.flags.writeable:
+            # Copy the memory map before modifying rows in place
+            self.vectors = matrix = np.array(matrix)
+        return matrix
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            column = np.array([meta.get(key) for meta in self.metadatas], dtype=object)
+            self._columns[key] = column
+        return column
+
+    def _mask(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+                continue
+            column = self._column(key)
+            if isinstance(condition, dict) and "$ne" in condition:
+                mask &= (column != condition["$ne"]) & (column != None)  # noqa: E711
+            else:
+                mask &= column == condition
+        return mask
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get_hashes(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        return {id: self.metadatas[self._rows[id]].get('content_hash') for id in ids if id in self._rows}
+
+    def source_file_ids(self) -> List[str]:
+        mask = self._mask({"source_file": {"$ne": ""}})
+        return [id for id, keep in zip(self.ids, mask) if keep]
+
+    def all_questions(self) -> Tuple[List[str], List[str], List[Dict]]:
+        return list(self.ids), list(self.documents), list(self.metadatas)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict]):
+        vectors = self._encode(self.embedding_function(documents))
+        matrix = self._matrix()
+        if matrix is not None and vectors.shape[1:] != matrix.shape[1:]:
+            raise ValueError(f"Embeddings have shape {vectors.shape[1:]}, the store holds {matrix.shape[1:]}")
+
+        # The last occurrence wins when an ID repeats within the batch
+        positions = {id: position for position, id in enumerate(ids)}
+        replaced = [(self._rows[id], position) for id, position in positions.items() if id in self._rows]
+        added = [position for id, position in positions.items() if id not in self._rows]
+
+        # Vectors first, so a failure leaves ids, documents and metadata untouched
+        if replaced:
+            self._writable()[[row for row, _ in replaced]] = vectors[[position for _, position in replaced]]
+        if added:
+            self._pending.append(vectors[added])
+
+        for row, position in replaced:
+            self.documents[row] = documents[position]
+            self.metadatas[row] = metadatas[position]
+        for position in added:
+            self._rows[ids[position]] = len(self.ids)
+            self.ids.append(ids[position])
+            self.documents.append(documents[position])
+            self.metadatas.append(metadatas[position])
+        self._columns = {}
+        self._dirty = True
+
+    def delete(self, ids: List[str]):
+        doomed = {self._rows[id] for id in ids if id in self._rows}
+        if not doomed:
+            return
+        keep = np.array([row not in doomed for row in range(len(self.ids))], dtype=bool)
+        self.vectors = np.array(self._matrix()[keep])
+        self.ids = [id for id, k in zip(self.ids, keep) if k]
+        self.documents = [doc for doc, k in zip(self.documents, keep) if k]
+        self.metadatas = [meta for meta, k in zip(self.metadatas, keep) if k]
+        self._rows = {id: row for row, id in enumerate(self.ids)}
+        self._columns = {}
+        self._dirty = True
+
+    def flush(self):
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = self._matrix() if self.ids else None
+        # Write under temporary names and rename, so a reader never sees half a store
+        vectors_tmp = self._vectors_path + ".tmp.npy"
+        if matrix is not None:
+            np.save(vectors_tmp, np.ascontiguousarray(matrix))
+        index_tmp = self._index_path + ".tmp"
+        with open(index_tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "embedding_model": self.embedding_function.model_name,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas
+            }, f, ensure_ascii=False)
+        if matrix is None:
+            # No rows, no vectors file: an empty matrix has no dimension to check upserts against
+            os.replace(index_tmp, self._index_path)
+            if os.path.exists(self._vectors_path):
+                os.remove(self._vectors_path)
+            self.vectors = None
+        else:
+            os.replace(vectors_tmp, self._vectors_path)
+            os.replace(index_tmp, self._index_path)
+            self.vectors = np.load(self._vectors_path, mmap_mode="r")
+        self._dirty = False
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each query against every stored question"""
+        matrix = self._matrix()
+        if self.quantize != "int8":
+            return queries @ matrix.T
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), self.BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + self.BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores / 127.0
+
+    def query(self, query_texts: List[str], n_results: int, where: Optional[Dict] = None) -> List[List[Dict]]:
+        if not self.ids or not query_texts:
+            return [[] for _ in query_texts]
+
+        queries = np.asarray(self.embedding_function(query_texts), dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = self._scores(queries)
+
+        mask = self._mask(where)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+            available = int(mask.sum())
+        else:
+            available = len(self.ids)
+        k = min(n_results, available)
+        if k <= 0:
+            return [[] for _ in query_texts]
+
+        # Partial sort for the top k, then order just those
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([{
+                'question': self.documents[i],
+                'metadata': self.metadatas[i],
+                'id': self.ids[i],
+                'score': float(1.0 - scores[row, i])
+            } for i in ordered])
+        return results
+
+    def reset(self):
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.vectors = None
+        self._rows, self._pending, self._columns = {}, [], {}
+        self._dirty = True
+        self.flush()
+
+def create_backend(kind: str, persist_dir: str, embedding_function) -> QuestionBackend:
+    """Create the storage backend named by kind ("chroma", "numpy" or "numpy-int8")"""
+    if kind == "chroma":
+        return ChromaQuestionBackend(persist_dir, embedding_function)
+    if kind == "numpy":
+        return NumpyQuestionBackend(persist_dir, embedding_function)
+    if kind == "numpy-int8":
+        return NumpyQuestionBackend(persist_dir, embedding_function, quantize="int8")
+    raise ValueError(f"Unknown vector store backend: {kind}")
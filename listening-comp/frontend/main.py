@@ -22,6 +22,11 @@ import backend.interactive
 from backend.chat import LocalLLMChat
 from backend.get_transcript import YouTubeTranscriptDownloader
 from backend.audio_generator import JapaneseAudioGenerator
+from backend.embeddings import warmup_embeddings
+
+# Start loading the shared embedding model in the background so the first
+# practice question doesn't wait for it (no-op once it is loaded)
+warmup_embeddings()
 
 
 # Page config
@@ -348,6 +353,12 @@ def render_interactive_stage():
                     
                     st.session_state.current_question = question_data
                     
+                    # Pooled questions may come with their audio already rendered
+                    if question_data.get("audio_path"):
+                        st.session_state.current_audio_path = question_data["audio_path"]
+                    else:
+                        st.session_state.pop('current_audio_path', None)
+                    
                     # Add to history (limited to last 10 questions)
                     st.session_state.question_history.append(question_data)
                     if len(st.session_state.question_history) > 10:
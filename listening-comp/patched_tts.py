@@ -27,6 +27,54 @@ except Exception as e:
     except Exception as sub_e:
         print(f"Error inspecting TTS modules: {sub_e}")
 
+_models = {}
+
+def load_model(model_name):
+    """Load a TTS model, reusing it if this process has loaded it before"""
+    tts = _models.get(model_name)
+    if tts is None:
+        print(f"Loading TTS model: {model_name}")
+        tts = TTS(model_name=model_name)
+        _models[model_name] = tts
+    return tts
+
+def synthesize_to_file(tts, text_content, output_file, speaker_id=None, speed=1.0):
+    """Synthesize text with a loaded model, then adjust its speed with ffmpeg if needed"""
+    # Apply voice modification parameters if provided
+    kwargs = {}
+    if speaker_id is not None:
+        kwargs["speaker_id"] = speaker_id
+    
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    # Generate speech with speed control
+    tts.tts_to_file(text=text_content, file_path=output_file, **kwargs)
+    
+    # If speed is not 1.0, process with ffmpeg to adjust speed
+    if speed != 1.0:
+        import subprocess
+        temp_file = output_file + ".temp.wav"
+        os.replace(output_file, temp_file)
+        
+        # Use ffmpeg's atempo filter for speed adjustment
+        # atempo valid range is 0.5 to 2.0, use multiple filters for more extreme values
+        atempo_param = str(speed)
+        if speed < 0.5:
+            atempo_param = "0.5,0.5,0.5,0.5"  # Multiply effects for very slow
+        elif speed > 2.0:
+            atempo_param = "2.0,2.0,2.0,2.0"  # Multiply effects for very fast
+            
+        subprocess.run([
+            "ffmpeg", "-i", temp_file, 
+            "-filter:a", f"atempo={atempo_param}", 
+            "-y", output_file
+        ], capture_output=True)
+        
+        # Clean up temp file
+        os.remove(temp_file)
+
 def synthesize_speech(text, output_file, model_name, speaker_id=None, speed=1.0):
     """
     Convert text to speech using the specified TTS model and save to output file.
@@ -39,16 +87,7 @@ def synthesize_speech(text, output_file, model_name, speaker_id=None, speed=1.0)
         speed (float): Speaking speed (0.5-2.0)
     """
     try:
-        print(f"Loading TTS model: {model_name}")
-        tts = TTS(model_name=model_name)
-        
-        # Apply voice modification parameters if provided
-        kwargs = {}
-        if speaker_id is not None:
-            kwargs["speaker_id"] = speaker_id
-        
-        print(f"Creating output directory: {os.path.dirname(output_file)}")
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        tts = load_model(model_name)
         
         print(f"Generating speech from {'text file' if text.startswith('/app/') else 'direct text'}")
         
@@ -59,31 +98,7 @@ def synthesize_speech(text, output_file, model_name, speaker_id=None, speed=1.0)
         else:
             text_content = text
         
-        # Generate speech with speed control
-        tts.tts_to_file(text=text_content, file_path=output_file, **kwargs)
-        
-        # If speed is not 1.0, process with ffmpeg to adjust speed
-        if speed != 1.0:
-            import subprocess
-            temp_file = output_file + ".temp.wav"
-            subprocess.run(["mv", output_file, temp_file])
-            
-            # Use ffmpeg's atempo filter for speed adjustment
-            # atempo valid range is 0.5 to 2.0, use multiple filters for more extreme values
-            atempo_param = str(speed)
-            if speed < 0.5:
-                atempo_param = "0.5,0.5,0.5,0.5"  # Multiply effects for very slow
-            elif speed > 2.0:
-                atempo_param = "2.0,2.0,2.0,2.0"  # Multiply effects for very fast
-                
-            subprocess.run([
-                "ffmpeg", "-i", temp_file, 
-                "-filter:a", f"atempo={atempo_param}", 
-                "-y", output_file
-            ])
-            
-            # Clean up temp file
-            subprocess.run(["rm", temp_file])
+        synthesize_to_file(tts, text_content, output_file, speaker_id=speaker_id, speed=speed)
             
         print(f"Speech generated successfully. Output file: {output_file}")
         return True
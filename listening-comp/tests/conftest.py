@@ -0,0 +1,35 @@
+import os
+import sys
+import zlib
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class StubEmbeddingFunction:
+    """Deterministic stand-in for the SentenceTransformer model
+
+    Each text becomes a bag of its characters hashed into a small vector, so
+    texts sharing characters are close and no model has to be downloaded.
+    """
+
+    model_name = "stub-embedding"
+
+    def __init__(self, dimensions: int = 32):
+        self.dimensions = dimensions
+        self.calls = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        vectors = np.zeros((len(input), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(input):
+            for char in text:
+                vectors[row, zlib.crc32(char.encode("utf-8")) % self.dimensions] += 1.0
+        return vectors.tolist()
+
+
+@pytest.fixture
+def embedding_function():
+    return StubEmbeddingFunction()
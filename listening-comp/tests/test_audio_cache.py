@@ -0,0 +1,52 @@
+import os
+import time
+
+from backend.audio_cache import SegmentCache, segment_key
+
+MODEL = "tts_models/ja/kokoro/tacotron2-DDC"
+
+
+def synthesized(tmp_path, name, size=100):
+    path = tmp_path / f"{name}.wav"
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_segment_key_is_stable_and_normalized():
+    assert segment_key(" こんにちは ", MODEL, 1.0) == segment_key("こんにちは", MODEL, 1.0004)
+    assert segment_key("こんにちは", MODEL, 1.0) != segment_key("こんにちは", MODEL, 1.2)
+
+
+def test_hits_are_linked_to_the_callers_path(tmp_path):
+    cache = SegmentCache(str(tmp_path / "cache"), max_bytes=1000)
+    source = synthesized(tmp_path, "first")
+    cached = cache.put("aa01", source)
+    assert os.path.exists(source) and os.path.exists(cached)
+
+    job_copy = str(tmp_path / "job.wav")
+    assert cache.get("aa01", job_copy) == job_copy
+    assert cache.get("ff99", str(tmp_path / "missing.wav")) is None
+
+    # Evicting the cached file leaves the caller's copy readable
+    os.remove(cached)
+    assert open(job_copy, "rb").read() == b"\0" * 100
+
+
+def test_least_recently_used_segments_are_evicted(tmp_path):
+    cache = SegmentCache(str(tmp_path / "cache"), max_bytes=250)
+    first = cache.put("aa01", synthesized(tmp_path, "first"))
+    second = cache.put("bb02", synthesized(tmp_path, "second"))
+
+    # The first segment is older, but reading it again makes the second one the LRU
+    long_ago = time.time() - 3600
+    os.utime(first, (long_ago, long_ago))
+    os.utime(second, (long_ago + 10, long_ago + 10))
+    assert cache.get("aa01", str(tmp_path / "read.wav"))
+
+    cache.put("cc03", synthesized(tmp_path, "third"))
+    assert not os.path.exists(second)
+    assert os.path.exists(first) and os.path.exists(cache.path_for("cc03"))
+    assert cache._size == 200
+
+    # A new cache over the same directory counts what is already stored
+    assert SegmentCache(str(tmp_path / "cache"), max_bytes=250)._size == 200
@@ -0,0 +1,59 @@
+import pytest
+
+from backend.lexical_index import BigramIndex, bigrams, reciprocal_rank_fusion
+
+
+def test_bigrams_skip_markup_and_punctuation():
+    assert bigrams("<question>Setup: 切符を買います。</question>") == ["切符", "符を", "を買", "買い", "いま", "ます"]
+    assert bigrams("駅、はい") == ["駅", "はい"]
+
+
+def test_add_replace_and_remove():
+    index = BigramIndex()
+    index.add(["q1", "q2", "q3"], ["駅で切符を買います", "公園を散歩します", "切符がありません"],
+              [{"section": "問題1"}, {"section": "問題1"}, {"section": "問題2"}])
+    assert {id for id, _ in index.search("切符", 5)} == {"q1", "q3"}
+
+    # Replacing a document drops its old terms
+    index.add(["q1"], ["公園で走ります"], [{"section": "問題1"}])
+    assert [id for id, _ in index.search("切符", 5)] == ["q3"]
+    assert [id for id, _ in index.search("公園", 5)][0] in {"q1", "q2"}
+
+    index.remove(["q3", "missing"])
+    assert index.search("切符", 5) == []
+    assert len(index) == 2
+
+    # Freed slots are reused and their old terms do not come back
+    index.add(["q4"], ["電車に乗ります"], [{"section": "問題2"}])
+    assert [id for id, _ in index.search("電車", 5)] == ["q4"]
+    assert index.search("切符", 5) == []
+
+
+def test_search_filters_by_metadata():
+    index = BigramIndex()
+    index.add(["q1", "q2", "q3"], ["駅で切符を買います", "駅で切符を買いました", "駅で待ちます"],
+              [{"section": "問題1"}, {"section": "問題2"}, {"section": "問題1"}])
+
+    assert [id for id, _ in index.search("切符を買います", 5, {"section": "問題2"})] == ["q2"]
+    assert {id for id, _ in index.search("駅で", 5, {"section": "問題1"})} == {"q1", "q3"}
+
+    index.remove(["q2"])
+    assert index.search("切符を買います", 5, {"section": "問題2"}) == []
+
+
+def test_search_ranks_closer_matches_first():
+    index = BigramIndex()
+    index.add(["q1", "q2"], ["切符を買います", "本を買います"], [{}, {}])
+    scores = index.search("切符を買います", 2)
+    assert [id for id, _ in scores] == ["q1", "q2"]
+    assert scores[0][1] > scores[1][1] > 0
+
+
+def test_reciprocal_rank_fusion_orders_by_summed_reciprocal_rank():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "d"]], k=60)
+    # First and third beats second twice, and both beat a single appearance
+    assert [id for id, _ in fused] == ["c", "b", "a", "d"]
+    scores = dict(fused)
+    assert scores["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert scores["b"] == pytest.approx(2 / 62)
+    assert scores["a"] == pytest.approx(1 / 61) and scores["d"] == pytest.approx(1 / 63)
@@ -0,0 +1,60 @@
+from backend.question_pool import QuestionPool, question_fingerprint
+
+
+def numbered_questions(practice_type, count, start=0):
+    return [{"setup": f"{practice_type} {number}", "question": "何をしますか。", "options": ["a", "b", "c", "d"]}
+            for number in range(start, start + count)]
+
+
+def make_pool(tmp_path, generate, **kwargs):
+    return QuestionPool(generate, ["Dialogue Practice"], path=str(tmp_path / "pool.json"),
+                        history_path=str(tmp_path / "history.json"), audio_dir=str(tmp_path / "audio"), **kwargs)
+
+
+def test_pool_skips_fallbacks_and_duplicates(tmp_path):
+    def generate(practice_type, count):
+        questions = numbered_questions(practice_type, 2)
+        return questions + [dict(questions[0]), {**numbered_questions(practice_type, 1, 9)[0], "fallback": True}]
+
+    pool = make_pool(tmp_path, generate, size=5)
+    assert pool._fill("Dialogue Practice", 5) == 2
+
+    first = pool.take("Dialogue Practice")
+    assert first["practice_type"] == "Dialogue Practice"
+    # A served question is not pooled again
+    assert pool._fill("Dialogue Practice", 5) == 0
+    assert pool.available("Dialogue Practice") == 1
+
+    # The pool file brings ready questions back after a restart
+    assert make_pool(tmp_path, generate, size=5).available("Dialogue Practice") == 1
+
+
+def test_served_fingerprints_are_bounded(tmp_path):
+    batches = iter([numbered_questions("Dialogue Practice", 3, start) for start in range(0, 30, 3)])
+    pool = make_pool(tmp_path, lambda practice_type, count: next(batches), size=3, served_limit=4)
+
+    served = []
+    for _ in range(3):
+        pool._fill("Dialogue Practice", 3)
+        served += [question_fingerprint(pool.take("Dialogue Practice")) for _ in range(3)]
+
+    assert len(pool._served) == len(pool._served_order) == 4
+    assert pool._served == set(served[-4:])
+
+
+def test_audio_generator_is_created_on_first_render(tmp_path):
+    created = []
+
+    class SilentAudioGenerator:
+        tts_available = False
+
+    def factory():
+        created.append(SilentAudioGenerator())
+        return created[-1]
+
+    pool = make_pool(tmp_path, lambda practice_type, count: numbered_questions(practice_type, count),
+                     size=2, audio_generator_factory=factory)
+    assert created == []
+    assert pool._fill("Dialogue Practice", 2) == 2
+    assert len(created) == 1
+    assert all("audio_path" not in question for question in pool.pools["Dialogue Practice"])
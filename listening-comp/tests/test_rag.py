@@ -0,0 +1,72 @@
+import pytest
+
+import backend.rag as rag
+from backend.rag import JLPTQuestionStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, embedding_function):
+    monkeypatch.setattr(rag, "get_embedding_function", lambda model_name=None: embedding_function)
+    return JLPTQuestionStore(persist_dir=str(tmp_path), backend="numpy", retrieval_mode="hybrid")
+
+
+def questions(*contents, section="問題1"):
+    return [{"content": content, "metadata": {"video_id": "sY7L5cfCWno", "section": section}}
+            for content in contents]
+
+
+def test_unchanged_questions_are_not_embedded_again(store, embedding_function):
+    ids = ["q1", "q2"]
+    assert store.upsert_questions(questions("駅で切符を買います", "公園を散歩します"), ids) == 2
+
+    embedding_function.calls.clear()
+    assert store.upsert_questions(questions("駅で切符を買います", "公園を散歩します"), ids) == 0
+    assert embedding_function.calls == []
+
+    assert store.upsert_questions(questions("駅で切符を買います", "公園で走ります"), ids) == 1
+    assert embedding_function.calls == [["公園で走ります"]]
+    # Metadata is part of the hash too
+    assert store.upsert_questions(questions("駅で切符を買います", "公園で走ります", section="問題2"), ids) == 2
+
+
+def test_hybrid_query_follows_upserts_and_deletes(store):
+    store.upsert_questions(questions("駅で切符を買います", "公園を散歩します", "図書館で本を読みます"),
+                           ["q1", "q2", "q3"])
+    assert store.query_questions("切符", n_results=1)[0]["id"] == "q1"
+
+    store.upsert_questions(questions("駅で待ちます"), ["q1"])
+    store.delete_questions(["q3"])
+    assert "q3" not in store.lexical_index.documents
+    results = store.query_questions("切符", n_results=3)
+    assert {result["id"] for result in results} == {"q1", "q2"}
+    assert all(result["lexical_score"] is None for result in results)
+    assert store.query_questions("駅で待ちます", n_results=1)[0]["id"] == "q1"
+
+
+def test_files_that_fail_to_parse_keep_their_questions(store, tmp_path):
+    structured = tmp_path / "structured"
+    structured.mkdir()
+    (structured / "video1_問題1.txt").write_text("<question>駅で切符を買います</question><question>電車に乗ります</question>",
+                                               encoding="utf-8")
+    (structured / "video2_問題2.txt").write_text("<question>公園を散歩します</question>", encoding="utf-8")
+    assert store.add_questions(str(structured))
+    assert sorted(store.backend.source_file_ids()) == ["video1_問題1_0", "video1_問題1_1", "video2_問題2_0"]
+
+    # An unreadable file is left alone; a file that is gone still has its questions removed
+    (structured / "video1_問題1.txt").write_bytes(b"\xff\xfe<question>")
+    (structured / "video2_問題2.txt").unlink()
+    assert store.add_questions(str(structured))
+    assert sorted(store.backend.source_file_ids()) == ["video1_問題1_0", "video1_問題1_1"]
+
+
+def test_hybrid_results_rank_by_rank_score(store):
+    store.upsert_questions(questions("駅で切符を買います", "公園を散歩します", "図書館で本を読みます"),
+                           ["q1", "q2", "q3"])
+
+    hybrid = store.query_questions("切符を買います", n_results=3)
+    assert all("score" not in result for result in hybrid)
+    rank_scores = [result["rank_score"] for result in hybrid]
+    assert rank_scores == sorted(rank_scores, reverse=True)
+
+    distances = [result["score"] for result in store.query_questions("切符を買います", n_results=3, hybrid=False)]
+    assert distances == sorted(distances)
@@ -0,0 +1,82 @@
+import pytest
+
+from backend.vector_store import NumpyQuestionBackend, QuestionBackend, create_backend
+
+
+def question_metadata(section, source_file="sY7L5cfCWno_問題1.txt"):
+    return {"section": section, "type": "conversation", "source_file": source_file}
+
+
+def test_question_backend_is_abstract():
+    with pytest.raises(TypeError):
+        QuestionBackend()
+
+
+def test_upsert_adds_and_replaces(tmp_path, embedding_function):
+    backend = NumpyQuestionBackend(str(tmp_path), embedding_function)
+    backend.upsert(["q1", "q2"], ["駅で切符を買います", "公園を散歩します"],
+                   [question_metadata("問題1"), question_metadata("問題2")])
+    assert backend.count() == 2
+
+    backend.upsert(["q2", "q3"], ["図書館で本を読みます", "電車に乗ります"],
+                   [question_metadata("問題2"), question_metadata("問題3")])
+    assert backend.count() == 3
+
+    ids, documents, _ = backend.all_questions()
+    assert dict(zip(ids, documents))["q2"] == "図書館で本を読みます"
+    best = backend.query(["図書館で本を読みます"], 1)[0][0]
+    assert best["id"] == "q2" and best["score"] == pytest.approx(0.0, abs=1e-5)
+
+
+def test_delete_drops_rows(tmp_path, embedding_function):
+    backend = NumpyQuestionBackend(str(tmp_path), embedding_function)
+    backend.upsert(["q1", "q2", "q3"], ["駅で切符を買います", "公園を散歩します", "電車に乗ります"],
+                   [question_metadata("問題1")] * 3)
+    backend.delete(["q2", "missing"])
+
+    assert backend.all_questions()[0] == ["q1", "q3"]
+    assert {result["id"] for result in backend.query(["公園を散歩します"], 5)[0]} == {"q1", "q3"}
+    assert backend.get_hashes(["q1", "q2"]).keys() == {"q1"}
+
+
+def test_where_filters(tmp_path, embedding_function):
+    backend = NumpyQuestionBackend(str(tmp_path), embedding_function)
+    backend.upsert(["q1", "q2", "q3"], ["駅で切符を買います", "駅で切符を買いました", "駅で待ちます"],
+                   [question_metadata("問題1"), question_metadata("問題2"),
+                    question_metadata("問題1", source_file="")])
+
+    results = backend.query(["駅で切符を買います"], 5, where={"section": "問題1"})[0]
+    assert [result["id"] for result in results] == ["q1", "q3"]
+
+    where = {"$and": [{"section": "問題1"}, {"source_file": {"$ne": ""}}]}
+    assert [result["id"] for result in backend.query(["駅"], 5, where=where)[0]] == ["q1"]
+    assert backend.query(["駅"], 5, where={"section": "問題3"}) == [[]]
+    assert backend.source_file_ids() == ["q1", "q2"]
+
+
+@pytest.mark.parametrize("kind", ["numpy", "numpy-int8"])
+def test_flushed_store_round_trips(tmp_path, embedding_function, kind):
+    backend = create_backend(kind, str(tmp_path), embedding_function)
+    backend.upsert(["q1", "q2"], ["駅で切符を買います", "公園を散歩します"],
+                   [{**question_metadata("問題1"), "content_hash": "a"}, {**question_metadata("問題2"), "content_hash": "b"}])
+    backend.flush()
+    expected = backend.query(["公園"], 2)
+
+    reopened = create_backend(kind, str(tmp_path), embedding_function)
+    assert reopened.all_questions() == backend.all_questions()
+    assert reopened.get_hashes(["q1", "q2"]) == {"q1": "a", "q2": "b"}
+    assert [[result["id"] for result in results] for results in reopened.query(["公園"], 2)] == \
+        [[result["id"] for result in results] for results in expected]
+
+    reopened.delete(["q1", "q2"])
+    reopened.flush()
+    assert create_backend(kind, str(tmp_path), embedding_function).count() == 0
+
+
+def test_store_from_another_model_starts_over(tmp_path, embedding_function):
+    backend = NumpyQuestionBackend(str(tmp_path), embedding_function)
+    backend.upsert(["q1"], ["駅で切符を買います"], [question_metadata("問題1")])
+    backend.flush()
+
+    embedding_function.model_name = "another-model"
+    assert NumpyQuestionBackend(str(tmp_path), embedding_function).count() == 0
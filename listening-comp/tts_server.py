@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Long-running TTS service for the TTS Docker container.
+
+Models are loaded once and kept in memory (patched_tts.load_model), so a
+segment costs only its synthesis instead of a fresh model load per
+`docker exec`. Requests are queued to a single synthesis thread, since a
+TTS model is not safe to use from several threads at once.
+
+    GET  /health      -> {"status": "ok", "models": [...], "queued": n}
+    POST /synthesize  {"text", "model", "speed", "speaker_id"} -> audio/wav
+
+A full queue answers 503 and a request that waits longer than
+TTS_REQUEST_TIMEOUT answers 504, so clients can fall back instead of
+hanging. SIGTERM stops accepting requests and finishes the queued ones.
+"""
+
+import json
+import os
+import queue
+import signal
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from patched_tts import _models, load_model, synthesize_to_file
+
+DEFAULT_MODEL = "tts_models/ja/kokoro/tacotron2-DDC"
+
+class SynthesisWorker:
+    """Runs synthesis requests one at a time from a bounded queue"""
+
+    def __init__(self, max_queue: int, preload=()):
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.preload = list(preload)
+        self.thread = threading.Thread(target=self._run, name="tts-synthesis", daemon=True)
+        self.ready = threading.Event()
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, text, model, speed, speaker_id) -> Future:
+        """Queue a request; raises queue.Full when the queue is at capacity"""
+        future = Future()
+        self.requests.put_nowait((future, text, model, speed, speaker_id))
+        return future
+
+    def stop(self):
+        """Finish the queued requests, then exit"""
+        self.requests.put(None)
+        self.thread.join()
+
+    def _run(self):
+        for model in self.preload:
+            try:
+                load_model(model)
+            except Exception as e:
+                print(f"Error preloading TTS model {model}: {e}", file=sys.stderr)
+        self.ready.set()
+
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            future, text, model, speed, speaker_id = item
+            # The client may have given up already
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    output_file = os.path.join(work_dir, "segment.wav")
+                    synthesize_to_file(load_model(model), text, output_file, speaker_id=speaker_id, speed=speed)
+                    with open(output_file, "rb") as f:
+                        future.set_result(f.read())
+            except Exception as e:
+                future.set_exception(e)
+
+class TTSRequestHandler(BaseHTTPRequestHandler):
+    worker: SynthesisWorker = None
+    request_timeout = 60.0
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(200 if self.worker.ready.is_set() else 503, {
+            "status": "ok" if self.worker.ready.is_set() else "loading",
+            "models": sorted(_models),
+            "queued": self.worker.requests.qsize()
+        })
+
+    def do_POST(self):
+        if self.path != "/synthesize":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            text = request["text"].strip()
+            if not text:
+                raise ValueError("text is empty")
+            future = self.worker.submit(text, request.get("model", DEFAULT_MODEL),
+                                        float(request.get("speed", 1.0)), request.get("speaker_id"))
+        except queue.Full:
+            self._send_json(503, {"error": "synthesis queue is full"})
+            return
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": f"bad request: {e}"})
+            return
+
+        try:
+            audio = future.result(timeout=self.request_timeout)
+        except TimeoutError:
+            future.cancel()
+            self._send_json(504, {"error": "synthesis timed out"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        self.wfile.write(audio)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+def main():
+    host = os.getenv("TTS_HOST", "0.0.0.0")
+    port = int(os.getenv("TTS_PORT", "5002"))
+    preload = [model for model in os.getenv("TTS_PRELOAD_MODELS", DEFAULT_MODEL).split(",") if model]
+
+    worker = SynthesisWorker(max_queue=int(os.getenv("TTS_MAX_QUEUE", "32")), preload=preload)
+    worker.start()
+    TTSRequestHandler.worker = worker
+    TTSRequestHandler.request_timeout = float(os.getenv("TTS_REQUEST_TIMEOUT", "60"))
+
+    server = ThreadingHTTPServer((host, port), TTSRequestHandler)
+
+    def shutdown(signum, frame):
+        print("Shutting down TTS server...")
+        # shutdown() waits for serve_forever, so it must run on another thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"TTS server listening on {host}:{port}")
+    server.serve_forever()
+    server.server_close()
+    worker.stop()
+    print("TTS server stopped")
+
+if __name__ == "__main__":
+    main()